@@ -7,6 +7,57 @@ import os
 # OpenAI 모델 설정
 EMBED_MODEL = "text-embedding-3-small"
 CHAT_MODEL  = "gpt-4-1106-preview" # RAG 답변 생성에 사용할 모델
+# 임베딩 백엔드 (utils/embedders.py): openai(API), onnx(로컬 CPU 모델), hash(결정적 테스트용)
+# 인덱스마다 만든 백엔드/차원이 embedding.json에 남고, 다른 백엔드로는 검색/추가하지 않는다.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "openai")
+EMBED_MODEL_PATH = os.getenv("EMBED_MODEL_PATH", "")         # onnx: model.onnx와 tokenizer.json이 있는 디렉터리
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", 2))           # onnx: 배치를 병렬로 추론할 스레드 수
+EMBED_MAX_LENGTH = int(os.getenv("EMBED_MAX_LENGTH", 256))   # onnx: 청크당 최대 토큰 수 (넘으면 자른다)
+EMBED_HASH_DIM = int(os.getenv("EMBED_HASH_DIM", 384))       # hash: 벡터 차원
+# 2단계 검색 (utils/full_vectors.py): 새 로컬 세션 인덱스에는 앞 EMBED_SEARCH_DIM 차원만 넣고(0이면 끔),
+# 후보 max(top_k × RERANK_FACTOR, RERANK_CANDIDATES)개를 전체 차원 벡터(vectors.f32)로 다시 정렬한다.
+EMBED_SEARCH_DIM = int(os.getenv("EMBED_SEARCH_DIM", 0))
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 50))
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", 4))
+# 임베딩 API 호출 (utils/resilient_call.py): 시도별 timeout, 재시도(지수 백오프 + jitter), 질문 임베딩 헤징.
+# 재시도/헤지는 추가 부하 예산(원래 호출 1회당 EMBED_EXTRA_BUDGET_RATIO회, 최대 EMBED_EXTRA_BUDGET_BURST회 누적) 안에서만 보낸다.
+EMBED_TIMEOUT_SECONDS = float(os.getenv("EMBED_TIMEOUT_SECONDS", 10))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 2))
+EMBED_RETRY_BACKOFF_MS = float(os.getenv("EMBED_RETRY_BACKOFF_MS", 200))       # 재시도 대기 상한: 200, 400, 800…ms (jitter)
+EMBED_RETRY_BACKOFF_MAX_MS = float(os.getenv("EMBED_RETRY_BACKOFF_MAX_MS", 2000))
+EMBED_HEDGE = os.getenv("EMBED_HEDGE", "true").lower() in ("1", "true", "yes")
+EMBED_HEDGE_QUANTILE = float(os.getenv("EMBED_HEDGE_QUANTILE", 0.95))  # 최근 지연의 이 분위수를 넘기면 같은 요청을 하나 더 보낸다
+EMBED_HEDGE_MIN_MS = float(os.getenv("EMBED_HEDGE_MIN_MS", 50))
+EMBED_EXTRA_BUDGET_RATIO = float(os.getenv("EMBED_EXTRA_BUDGET_RATIO", 0.1))
+EMBED_EXTRA_BUDGET_BURST = float(os.getenv("EMBED_EXTRA_BUDGET_BURST", 10))
+EMBED_CALL_THREADS = int(os.getenv("EMBED_CALL_THREADS", 64))  # 임베딩 호출 시도(헤지 포함)를 동시에 보내는 스레드 수. 모자라면 시도가 줄을 선다
+# 질문 임베딩 마이크로 배치: 동시에 들어온 검색의 질문을 이 시간(ms) 동안 (최대 N개) 모아 한 번의 API 요청으로 보낸다.
+# 보내는 중인 요청이 없으면 기다리지 않는다 (0이면 모으지 않음, openai 백엔드만)
+EMBED_QUERY_BATCH_WINDOW_MS = float(os.getenv("EMBED_QUERY_BATCH_WINDOW_MS", 5))
+EMBED_QUERY_BATCH_MAX = int(os.getenv("EMBED_QUERY_BATCH_MAX", 32))
+SEARCH_REQUEST_THREADS = int(os.getenv("SEARCH_REQUEST_THREADS", 32))  # /search 검색·답변 생성을 동시에 돌리는 스레드 수
+# OpenAI 호출 입장 제어 (utils/admission.py): 업스트림(임베딩/채팅)별 동시 호출 한도를 지연과 429/5xx에 맞춰 AIMD로 조절한다.
+# 검색(interactive)이 업로드(bulk)보다 먼저 자리를 받고, bulk는 한도의 UPSTREAM_BULK_SHARE, 분당 예산의 1-UPSTREAM_RESERVE까지만 쓴다.
+UPSTREAM_INITIAL_CONCURRENCY = int(os.getenv("UPSTREAM_INITIAL_CONCURRENCY", 8))
+UPSTREAM_MIN_CONCURRENCY = int(os.getenv("UPSTREAM_MIN_CONCURRENCY", 1))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", 64))
+UPSTREAM_BULK_SHARE = float(os.getenv("UPSTREAM_BULK_SHARE", 0.5))
+UPSTREAM_RESERVE = float(os.getenv("UPSTREAM_RESERVE", 0.2))
+UPSTREAM_QUEUE_TIMEOUT_INTERACTIVE = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT_INTERACTIVE", 2))  # 넘기면 503
+UPSTREAM_QUEUE_TIMEOUT_BULK = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT_BULK", 60))
+# 계정의 분당 요청/토큰 한도 (0이면 제한 없음)
+OPENAI_EMBED_RPM = float(os.getenv("OPENAI_EMBED_RPM", 0))
+OPENAI_EMBED_TPM = float(os.getenv("OPENAI_EMBED_TPM", 0))
+OPENAI_CHAT_RPM = float(os.getenv("OPENAI_CHAT_RPM", 0))
+OPENAI_CHAT_TPM = float(os.getenv("OPENAI_CHAT_TPM", 0))
+CHAT_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("CHAT_COMPLETION_TOKENS_ESTIMATE", 500))  # 답변 토큰 예상치 (호출 전 tpm 차감용)
+# 회로 차단기: 과부하 신호가 연속 N번이거나 최근 호출의 비율 이상이면 열고, 열려 있는 동안은 바로 503
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_FAILURE_RATIO = float(os.getenv("CIRCUIT_FAILURE_RATIO", 0.5))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", 5))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", 60))
+# OpenAI 호환 서버 주소 (비우면 기본 api.openai.com). 부하 테스트에서는 experiments/fake_openai.py를 가리킨다.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
 # 데이터 및 인덱스 경로
 INDEX_PATH = "data/index.faiss"       # Faiss 벡터 인덱스 파일 경로
@@ -46,3 +97,79 @@ SEARCH_DAILY_LIMIT = int(os.getenv("SEARCH_DAILY_LIMIT", 300))
 SEARCH_BURST_LIMIT = int(os.getenv("SEARCH_BURST_LIMIT", 30))
 UPLOAD_DAILY_LIMIT = int(os.getenv("UPLOAD_DAILY_LIMIT", 30))
 ADDTEXT_DAILY_LIMIT = int(os.getenv("ADDTEXT_DAILY_LIMIT", 30))
+UPLOAD_BURST_LIMIT = int(os.getenv("UPLOAD_BURST_LIMIT", 5))
+ADDTEXT_BURST_LIMIT = int(os.getenv("ADDTEXT_BURST_LIMIT", 10))
+
+# 검색 모드 설정
+# vector: FAISS 임베딩 검색, lexical: BM25(문자 n-gram) 검색, hybrid: 두 결과를 RRF로 결합
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+DEFAULT_SEARCH_MODE = os.getenv("DEFAULT_SEARCH_MODE", "vector")
+LEXICAL_NGRAM = int(os.getenv("LEXICAL_NGRAM", 2))          # 한국어는 2글자(bigram)가 무난
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+LEXICAL_MAX_SEGMENTS = int(os.getenv("LEXICAL_MAX_SEGMENTS", 16))  # 초과 시 세그먼트 병합
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 20))        # hybrid에서 각 검색기가 가져올 후보 수
+RRF_K = int(os.getenv("RRF_K", 60))
+# MMR 다양화 (utils/mmr.py): 후보 top_k × MMR_FETCH_FACTOR개 중 관련성과 다양성을 함께 보고 top_k개를 고른다
+# (요청 body의 mmr, mmr_lambda로 덮어씀). λ=1이면 원래 순서, 작을수록 서로 다른 청크를 고른다.
+MMR_ENABLED = os.getenv("MMR_ENABLED", "false").lower() in ("1", "true", "yes")
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))
+MMR_FETCH_FACTOR = int(os.getenv("MMR_FETCH_FACTOR", 4))
+
+# 컨텍스트 조립 설정 (토큰 예산)
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")  # text-embedding-3 / GPT-4 계열 인코딩
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))  # 프롬프트에 넣을 참조 문단 최대 토큰 수
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.8))  # 이 이상 겹치면 중복으로 보고 제외
+
+# 업로드 시 근사 중복 청크 제거 (MinHash + LSH)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() in ("1", "true", "yes")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", 0.9))  # 추정 Jaccard가 이 이상이면 중복으로 보고 건너뜀
+MINHASH_PERMS = int(os.getenv("MINHASH_PERMS", 128))
+LSH_BANDS = int(os.getenv("LSH_BANDS", 16))  # 128/16 = 밴드당 8행 → 유사도 0.7 근처부터 후보가 됨
+MINHASH_SEED = int(os.getenv("MINHASH_SEED", 1))
+
+# 청킹 설정
+CHUNK_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+CHUNK_LENGTH_MODE = os.getenv("CHUNK_LENGTH_MODE", "chars")  # chars: 글자 수, tokens: tiktoken 토큰 수 기준
+
+# 공용 인덱스 백그라운드 구축
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 100))  # 임베딩 API 한 번에 보낼 청크 수
+
+# 워커 기동 시간 예산 (experiments/bench_import.py 가 main import 시간을 이 값과 비교)
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 1000))
+
+# 파일 카탈로그 (SQLite, WAL)
+CATALOG_PATH = os.getenv("CATALOG_PATH", "data/catalog.db")
+FILES_PAGE_MAX = int(os.getenv("FILES_PAGE_MAX", 1000))  # /files 한 페이지 최대 항목 수
+
+# 파일 삭제 (tombstone) 후 압축 조건: 인덱스에 남은 삭제 청크가 둘 다 넘으면 백그라운드 압축
+COMPACT_MIN_TOMBSTONES = int(os.getenv("COMPACT_MIN_TOMBSTONES", 64))
+COMPACT_TOMBSTONE_RATIO = float(os.getenv("COMPACT_TOMBSTONE_RATIO", 0.2))
+
+# 세션 수명 관리 (TTL, 디스크 할당량)
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 3 * 24 * 3600))  # 이 시간 동안 접근이 없으면 삭제
+SESSION_QUOTA_MB = int(os.getenv("SESSION_QUOTA_MB", 100))                  # 세션당 최대 사용량 (넘으면 업로드 413)
+SESSIONS_GLOBAL_QUOTA_MB = int(os.getenv("SESSIONS_GLOBAL_QUOTA_MB", 5 * 1024))  # 전체 세션 합계 한도
+SESSION_HOT_SECONDS = int(os.getenv("SESSION_HOT_SECONDS", 900))           # 최근 접근 세션은 할당량 정리에서 제외
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", 300))     # 정리 주기(초)
+
+# 오버레이 검색: 세션 검색 시 공용 말뭉치(data/index.faiss)도 함께 검색해 점수 순으로 합친다 (요청 body의 overlay로 덮어씀)
+OVERLAY_BASE_CORPUS = os.getenv("OVERLAY_BASE_CORPUS", "false").lower() in ("1", "true", "yes")
+SEARCH_THREADS = int(os.getenv("SEARCH_THREADS", 4))  # 여러 말뭉치를 동시에 검색할 스레드 수
+
+# 여러 세션 동시 검색 (관리 도구용 /admin/search). ADMIN_API_KEY가 비어 있으면 엔드포인트를 막는다.
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+SHARD_SEARCH_THREADS = int(os.getenv("SHARD_SEARCH_THREADS", 8))
+SHARD_TIMEOUT_SECONDS = float(os.getenv("SHARD_TIMEOUT_SECONDS", 2.0))  # 이 시간 안에 못 끝낸 세션은 빼고 부분 결과로 응답
+SHARD_MAX_SESSIONS = int(os.getenv("SHARD_MAX_SESSIONS", 200))
+
+# 세션 말뭉치 스냅샷 캐시: 버전 포인터(version.json)가 같으면 검색마다 인덱스/텍스트를 다시 읽지 않는다
+SNAPSHOT_CACHE_SESSIONS = int(os.getenv("SNAPSHOT_CACHE_SESSIONS", 16))
+
+# 그룹 커밋: 같은 세션에 동시에 들어온 업로드를 이 시간(ms) 동안 모아 인덱스 저장을 한 번만 한다 (0이면 모으지 않음)
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", 20))
+GROUP_COMMIT_MAX_REQUESTS = int(os.getenv("GROUP_COMMIT_MAX_REQUESTS", 64))
+
+# 벡터 로그: 로컬 세션은 새 벡터만 vectors.log에 덧붙이고, 로그가 base(index.faiss)의 이 비율을 넘으면 백그라운드에서 병합한다
+VECTOR_LOG_MERGE_RATIO = float(os.getenv("VECTOR_LOG_MERGE_RATIO", 0.5))
+VECTOR_LOG_MERGE_MIN_MB = float(os.getenv("VECTOR_LOG_MERGE_MIN_MB", 4))
@@ -5,6 +5,7 @@ Generate tuning_report_v1.md from grid search results
 """
 
 import os
+import json
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -31,17 +32,41 @@ def load_latest_results() -> pd.DataFrame:
     df = pd.read_csv(file_path)
     return df
 
+def quality_columns(df: pd.DataFrame) -> List[str]:
+    """Quality columns present in the results (mrr/ndcg are missing from older runs)"""
+    return [c for c in ['recall@5', 'f1', 'mrr', 'ndcg'] if c in df.columns]
+
+def quality_label(column: str) -> str:
+    return {'recall@5': 'Recall@5', 'f1': 'F1', 'mrr': 'MRR', 'ndcg': 'nDCG'}[column]
+
+def load_latest_index_eval() -> Dict[str, Any]:
+    """Load the most recent eval_retrieval JSON (experiments/eval_retrieval.py), or None"""
+    results_dir = os.path.join(os.path.dirname(__file__), "results")
+    json_files = [f for f in os.listdir(results_dir) if f.startswith("eval_retrieval_") and f.endswith(".json")]
+    if not json_files:
+        return None
+    with open(os.path.join(results_dir, max(json_files)), encoding="utf-8") as f:
+        return json.load(f)
+
 def get_best_parameters(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
     """Get top N parameter combinations by recall@5"""
-    best_params = df.nlargest(n, 'recall@5')[['chunk', 'k', 'temp', 'recall@5', 'f1', 'latency_ms', 'cost_cents']]
+    columns = ['chunk', 'k', 'temp'] + quality_columns(df) + ['latency_ms', 'cost_cents']
+    best_params = df.nlargest(n, 'recall@5')[columns]
     return best_params
 
+def quality_by_config(df: pd.DataFrame) -> pd.DataFrame:
+    """Mean quality next to mean latency and cost for every (chunk, k)"""
+    columns = quality_columns(df) + ['latency_ms', 'cost_cents']
+    return df.groupby(['chunk', 'k'])[columns].mean().reset_index()
+
 def create_performance_summary(df: pd.DataFrame) -> Dict[str, Any]:
     """Create performance summary statistics"""
     summary = {
         'total_experiments': len(df),
         'avg_recall': df['recall@5'].mean(),
         'avg_f1': df['f1'].mean(),
+        'avg_mrr': df['mrr'].mean() if 'mrr' in df.columns else None,
+        'avg_ndcg': df['ndcg'].mean() if 'ndcg' in df.columns else None,
         'avg_latency': df['latency_ms'].mean(),
         'avg_cost': df['cost_cents'].mean(),
         'best_recall': df['recall@5'].max(),
@@ -116,10 +141,51 @@ def create_visualizations(df: pd.DataFrame, output_dir: str):
     plt.savefig(os.path.join(output_dir, 'performance_analysis.png'), dpi=300, bbox_inches='tight')
     plt.close()
 
+def format_quality_tables(df: pd.DataFrame, index_eval: Dict[str, Any] = None) -> str:
+    """Markdown for quality vs latency/cost per (chunk, k) and the index type comparison"""
+    quality = quality_columns(df)
+    header = ['Chunk', 'Top-k'] + [quality_label(c) for c in quality] + ['Latency(ms)', 'Cost(cents)']
+    out = "| " + " | ".join(header) + " |\n|" + "|".join("---" for _ in header) + "|\n"
+    for _, row in quality_by_config(df).iterrows():
+        cells = [f"{int(row['chunk'])}", f"{int(row['k'])}"] + [f"{row[c]:.3f}" for c in quality]
+        cells += [f"{row['latency_ms']:.1f}", f"{row['cost_cents']:.4f}"]
+        out += "| " + " | ".join(cells) + " |\n"
+
+    if not index_eval:
+        return out
+    ks = index_eval.get('k', [])
+    k = 5 if 5 in ks else (ks[-1] if ks else 5)
+    out += f"""
+### Index Types (labelled retrieval, @{k})
+
+Source: eval_retrieval ({index_eval.get('embedder')} embeddings, {index_eval.get('questions')} questions, {index_eval.get('created')})
+
+| Chunk | Index | Recall | MRR | nDCG | ANN recall vs flat | Search(ms/query) | Bytes/vector |
+|-------|-------|--------|-----|------|--------------------|------------------|--------------|
+"""
+    def fmt(value, digits=3):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    for result in index_eval.get('results', []):
+        for kind, r in result.get('indexes', {}).items():
+            out += (f"| {result['chunk_size']} | {kind} ({r.get('factory', kind)}) | {fmt(r.get(f'recall@{k}'))} | "
+                    f"{fmt(r.get(f'mrr@{k}'))} | {fmt(r.get(f'ndcg@{k}'))} | {fmt(r.get(f'ann_recall@{k}'))} | "
+                    f"{fmt(r.get('search_ms_per_query'), 4)} | {fmt(r.get('bytes_per_vector'), 0)} |\n")
+    return out
+
 def generate_report(df: pd.DataFrame, best_params: pd.DataFrame, 
-                   summary: Dict[str, Any], insights: List[str]) -> str:
+                   summary: Dict[str, Any], insights: List[str],
+                   index_eval: Dict[str, Any] = None) -> str:
     """Generate the tuning report markdown"""
     
+    quality = quality_columns(df)
+    extra_summary = ""
+    if summary.get('avg_mrr') is not None:
+        extra_summary += f"- **Average MRR**: {summary['avg_mrr']:.3f}\n"
+    if summary.get('avg_ndcg') is not None:
+        extra_summary += f"- **Average nDCG**: {summary['avg_ndcg']:.3f}\n"
+    top_header = ['Rank', 'Chunk', 'Top-k', 'Temp'] + [quality_label(c) for c in quality] + ['Latency(ms)', 'Cost(cents)']
+    
     report = f"""# RAG Experiment Tuning Report v1
 
 **Generated**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
@@ -130,19 +196,25 @@ def generate_report(df: pd.DataFrame, best_params: pd.DataFrame,
 
 - **Best Average Recall@5**: {summary['avg_recall']:.3f}
 - **Best Average F1 Score**: {summary['avg_f1']:.3f}
-- **Average Latency**: {summary['avg_latency']:.1f}ms
+{extra_summary}- **Average Latency**: {summary['avg_latency']:.1f}ms
 - **Average Cost**: ${summary['avg_cost']:.4f}
 - **Perfect Scores**: {summary['perfect_recalls']} experiments
 - **Failed Experiments**: {summary['failed_recalls']} experiments
 
 ## Top 5 Parameter Combinations
 
-| Rank | Chunk | Top-k | Temp | Recall@5 | F1 | Latency(ms) | Cost(cents) |
-|------|-------|-------|------|----------|----|-------------|-------------|
+| {' | '.join(top_header)} |
+|{'|'.join('---' for _ in top_header)}|
 """
 
     for i, (_, row) in enumerate(best_params.iterrows(), 1):
-        report += f"| {i} | {row['chunk']} | {row['k']} | {row['temp']} | {row['recall@5']:.3f} | {row['f1']:.3f} | {row['latency_ms']:.1f} | {row['cost_cents']:.4f} |\n"
+        quality_cells = " | ".join(f"{row[c]:.3f}" for c in quality)
+        report += f"| {i} | {row['chunk']} | {row['k']} | {row['temp']} | {quality_cells} | {row['latency_ms']:.1f} | {row['cost_cents']:.4f} |\n"
+
+    report += f"""
+## Retrieval Quality vs Latency and Cost
+
+{format_quality_tables(df, index_eval)}"""
 
     report += f"""
 ## Key Insights
@@ -193,13 +265,14 @@ def main():
     best_params = get_best_parameters(df)
     summary = create_performance_summary(df)
     insights = generate_insights(df)
+    index_eval = load_latest_index_eval()
     
     print("Creating visualizations...")
     output_dir = os.path.join(os.path.dirname(__file__), "results")
     create_visualizations(df, output_dir)
     
     print("Generating report...")
-    report = generate_report(df, best_params, summary, insights)
+    report = generate_report(df, best_params, summary, insights, index_eval)
     
     # Save report
     report_path = os.path.join(output_dir, "tuning_report_v1.md")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Chunker throughput benchmark
+Compares utils.chunker.TextChunker (character mode, token mode, streaming) against
+LangChain's RecursiveCharacterTextSplitter on the sample documents and on large
+synthetic corpora, and reports MB/s. Character-mode outputs are checked for equality.
+
+    python -m experiments.bench_chunker --synthetic-mb 1 10 --chunk 512 --overlap 100
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chunker import TextChunker, token_length_function
+from utils.data_loader import load_chunks
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+def synthetic_corpus(size_mb: float, seed: int = 42) -> str:
+    """Shuffle paragraphs of data/text_chunks.txt until the corpus reaches size_mb."""
+    paragraphs = load_chunks(os.path.join(BASE_DIR, "data", "text_chunks.txt"))
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts, size = [], 0
+    while size < target:
+        p = rng.choice(paragraphs)
+        parts.append(p)
+        size += len(p.encode("utf-8")) + 2
+    return "\n\n".join(parts)
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def langchain_split(text: str, chunk: int, overlap: int):
+    # Import inside the timed call: the old main.chunk_text built a splitter on every request.
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk, chunk_overlap=overlap, length_function=len, separators=SEPARATORS
+    ).split_text(text)
+
+
+def stream_pieces(text: str, piece_size: int = 64 * 1024):
+    for i in range(0, len(text), piece_size):
+        yield text[i:i + piece_size]
+
+
+def bench(name: str, text: str, chunk: int, overlap: int, repeat: int, with_tokens: bool):
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    native = TextChunker(chunk, overlap, SEPARATORS)
+    row = {"corpus": name, "mb": round(mb, 3)}
+
+    t_native, native_chunks = timed(lambda: native.split_text(text), repeat)
+    t_stream, stream_chunks = timed(lambda: list(native.iter_chunks(stream_pieces(text))), repeat)
+    row["native_mb_s"] = round(mb / t_native, 2)
+    row["stream_mb_s"] = round(mb / t_stream, 2)
+    row["chunks"] = len(native_chunks)
+    row["stream_equal"] = stream_chunks == native_chunks
+
+    try:
+        t_lc, lc_chunks = timed(lambda: langchain_split(text, chunk, overlap), repeat)
+        row["langchain_mb_s"] = round(mb / t_lc, 2)
+        row["speedup"] = round(t_lc / t_native, 2)
+        row["equal"] = lc_chunks == native_chunks
+    except ImportError:
+        row["langchain_mb_s"] = None
+
+    if with_tokens:
+        token_chunker = TextChunker(chunk // 2, overlap // 2, SEPARATORS, length_function=token_length_function())
+        t_tok, tok_chunks = timed(lambda: token_chunker.split_text(text), 1)
+        row["token_mode_mb_s"] = round(mb / t_tok, 2)
+        row["token_mode_chunks"] = len(tok_chunks)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunker throughput benchmark")
+    parser.add_argument("--synthetic-mb", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--chunk", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tokens", action="store_true", help="Also measure token-length mode")
+    args = parser.parse_args()
+
+    corpora = []
+    for fname in ["test_document.txt", "test_story.txt"]:
+        with open(os.path.join(BASE_DIR, fname), encoding="utf-8") as f:
+            corpora.append((fname, f.read()))
+    for mb in args.synthetic_mb:
+        corpora.append((f"synthetic_{mb:g}mb", synthetic_corpus(mb)))
+
+    for name, text in corpora:
+        print(bench(name, text, args.chunk, args.overlap, args.repeat, args.tokens))
+
+
+if __name__ == "__main__":
+    main()
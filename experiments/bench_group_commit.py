@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Group-commit ingest benchmark
+Simulates bursty concurrent appends to one session index and compares the old write path
+(every request: read index.faiss, add vectors, rewrite index.faiss) with utils.group_commit,
+where concurrent requests share one index mutation and one persistence step per batch.
+Reports write amplification (index bytes written / new vector bytes), index rewrites and
+ingest throughput. Random vectors, no API calls.
+
+    python -m experiments.bench_group_commit --writers 16 --requests 8 --chunks 4
+    python -m experiments.bench_group_commit --base-chunks 20000 --window-ms 10
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.group_commit import GroupCommitter
+
+
+class SessionIndex:
+    """Append path of main._append_index_locked reduced to the index I/O it does per commit."""
+
+    def __init__(self, root: str, dim: int, base_chunks: int):
+        self.path = os.path.join(root, "index.faiss")
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.bytes_written = 0
+        self.rewrites = 0
+        rng = np.random.default_rng(0)
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        if base_chunks:
+            index.add_with_ids(rng.standard_normal((base_chunks, dim)).astype("float32"),
+                               np.arange(base_chunks, dtype="int64"))
+        faiss.write_index(index, self.path)
+        self.next_id = base_chunks
+
+    def commit(self, vector_batches):
+        with self.lock:
+            index = faiss.read_index(self.path)
+            xb = np.vstack(vector_batches)
+            index.add_with_ids(xb, np.arange(self.next_id, self.next_id + len(xb), dtype="int64"))
+            self.next_id += len(xb)
+            tmp = self.path + ".tmp"
+            faiss.write_index(index, tmp)
+            os.replace(tmp, self.path)
+            self.bytes_written += os.path.getsize(self.path)
+            self.rewrites += 1
+
+
+def run(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        session = SessionIndex(tmp, args.dim, args.base_chunks)
+        committer = GroupCommitter(lambda key, items: [session.commit(items)] * len(items),
+                                   window_seconds=args.window_ms / 1000, max_items=args.max_batch)
+        rng = np.random.default_rng(1)
+        payloads = [[rng.standard_normal((args.chunks, args.dim)).astype("float32") for _ in range(args.requests)]
+                    for _ in range(args.writers)]
+        latencies = []
+
+        def writer(batches):
+            for vectors in batches:
+                t0 = time.perf_counter()
+                if mode == "per-request":
+                    session.commit([vectors])
+                else:
+                    committer.submit("session", vectors)
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        threads = [threading.Thread(target=writer, args=(p,)) for p in payloads]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+    new_chunks = args.writers * args.requests * args.chunks
+    lat = np.array(latencies)
+    return {
+        "mode": mode,
+        "requests": args.writers * args.requests,
+        "index_rewrites": session.rewrites,
+        "mb_written": round(session.bytes_written / (1024 * 1024), 2),
+        "write_amplification": round(session.bytes_written / (new_chunks * args.dim * 4), 1),
+        "chunks_per_s": round(new_chunks / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group-commit ingest benchmark")
+    parser.add_argument("--writers", type=int, default=16, help="Concurrent requests in flight")
+    parser.add_argument("--requests", type=int, default=8, help="Appends per writer")
+    parser.add_argument("--chunks", type=int, default=4, help="Chunks per append")
+    parser.add_argument("--base-chunks", type=int, default=5000, help="Chunks already in the session index")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--window-ms", type=float, default=20)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    for mode in ("per-request", "group-commit"):
+        print(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
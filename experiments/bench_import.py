@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for worker cold start
+Runs `python -X importtime -c "import main"` in fresh interpreters, reports the
+cumulative import time of `main` (median of --repeat runs), the slowest top-level
+dependencies, and whether heavy optional modules were pulled in eagerly.
+Exits with status 1 when the median exceeds the budget (config.IMPORT_TIME_BUDGET_MS).
+
+    python -m experiments.bench_import --repeat 5 --budget-ms 1000
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules main.py must only load on first use.
+LAZY_MODULES = ["openai", "pandas", "PyPDF2", "docx", "boto3", "tiktoken", "langchain_text_splitters",
+                "onnxruntime", "tokenizers"]
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_once(module: str = "main"):
+    """Return ({top-level module: cumulative us}, cumulative us of `module`, eagerly loaded lazy modules)."""
+    probe = (f"import sys, json, {module}; "
+             f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))")
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "x")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                          cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    deps, total = {}, None
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        cumulative, depth, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        if name == module and depth == 1:
+            total = cumulative
+        elif depth == 3:
+            deps[name] = cumulative
+    return deps, total, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for main.py")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=config.IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=8, help="Number of slowest dependencies to report")
+    args = parser.parse_args()
+
+    totals, deps, eager = [], {}, []
+    for _ in range(args.repeat):
+        deps, total, eager = run_once()
+        totals.append(total / 1000)
+    median_ms = statistics.median(totals)
+    slowest = sorted(deps.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+    row = {
+        "module": "main",
+        "median_ms": round(median_ms, 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "budget_ms": args.budget_ms,
+        "eager_heavy_modules": eager,
+        "slowest_deps_ms": {name: round(us / 1000, 1) for name, us in slowest},
+    }
+    print(row)
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import main took {median_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Lexical (BM25) index benchmark
+Measures build time, on-disk size, load time and query latency of utils.lexical_index
+over data/text_chunks.txt replicated to the requested corpus sizes. No API calls.
+
+    python -m experiments.bench_lexical --docs 1000 10000 50000 --queries 200
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import lexical_index
+from utils.data_loader import load_chunks
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT_FILE = os.path.join(BASE_DIR, "data", "text_chunks.txt")
+
+QUERIES = [
+    "GPT가 왜 중요한 기술인가요?",
+    "딥러닝과 신경망의 차이",
+    "생성형 AI의 활용 사례",
+    "Who coined the term artificial intelligence?",
+    "What is the Turing Test?",
+]
+
+
+def make_corpus(seed_chunks, n_docs: int):
+    """Replicate the seed chunks with a numeric suffix so documents stay distinct."""
+    return [f"{seed_chunks[i % len(seed_chunks)]} #{i}" for i in range(n_docs)]
+
+
+def bench(n_docs: int, n_queries: int, segment_size: int, top_k: int):
+    corpus = make_corpus(load_chunks(TEXT_FILE), n_docs)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lexical.idx")
+
+        # Incremental build: one segment per simulated upload
+        t0 = time.perf_counter()
+        for base in range(0, n_docs, segment_size):
+            with open(path, "ab") as f:
+                f.write(lexical_index.encode_documents(corpus[base:base + segment_size], base))
+        build_s = time.perf_counter() - t0
+        size_bytes = os.path.getsize(path)
+        raw_bytes = sum(len(c.encode("utf-8")) for c in corpus)
+
+        t0 = time.perf_counter()
+        idx = lexical_index.LexicalIndex.load(path)
+        load_s = time.perf_counter() - t0
+
+        rng = random.Random(42)
+        latencies = []
+        for _ in range(n_queries):
+            q = rng.choice(QUERIES)
+            t0 = time.perf_counter()
+            idx.search(q, top_k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    lat = np.array(latencies)
+    return {
+        "docs": n_docs,
+        "segments": idx.segments,
+        "build_s": round(build_s, 3),
+        "index_mb": round(size_bytes / (1024 * 1024), 3),
+        "index_to_text_ratio": round(size_bytes / raw_bytes, 3),
+        "load_s": round(load_s, 3),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 lexical index benchmark")
+    parser.add_argument("--docs", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--segment-size", type=int, default=500,
+                        help="Chunks per appended segment (simulates one upload)")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.docs:
+        print(bench(n, args.queries, args.segment_size, args.top_k))
+
+
+if __name__ == "__main__":
+    main()
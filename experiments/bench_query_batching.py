@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Query-embedding micro-batching benchmark
+Starts experiments.fake_openai and drives OpenAIEmbedder.embed_text with open-loop arrivals at a
+fixed rate (one thread per in-flight question, as concurrent /search requests do), once without
+batching and once per --window-ms with utils.micro_batch. Reports upstream embedding requests per
+question (from the fake server's /stats), mean batch size and p50/p95/p99 latency measured from
+the scheduled arrival time.
+
+    python -m experiments.bench_query_batching --qps 50 100 200 --seconds 5
+    python -m experiments.bench_query_batching --window-ms 2 5 10 --max-batch 16 --embed-latency-ms 80
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from experiments.load_test import free_port, stop, wait_ready
+from utils.embedders import OpenAIEmbedder
+
+
+def start_fake(args):
+    port = free_port()
+    cmd = [sys.executable, "-m", "experiments.fake_openai", "--port", str(port), "--dim", str(args.dim),
+           "--embed-latency-ms", str(args.embed_latency_ms), "--jitter", str(args.jitter)]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    url = f"http://127.0.0.1:{port}"
+    wait_ready(url + "/health", proc=proc)
+    return url, proc
+
+
+def run(embedder, base_url: str, qps: float, seconds: float, threads: int) -> dict:
+    """Open-loop: question i is scheduled at i / qps and its latency counts from that moment."""
+    before = httpx.get(base_url + "/stats").json()["embeddings"]
+    latencies, errors, lock = [], [0], threading.Lock()
+    n = int(qps * seconds)
+    start = time.perf_counter() + 0.05
+
+    def one(i: int):
+        scheduled = start + i / qps
+        try:
+            embedder.embed_text(f"question {i} about the uploaded documents")
+        except Exception:
+            with lock:
+                errors[0] += 1
+            return
+        with lock:
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for i in range(n):
+            delay = start + i / qps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, i)
+    upstream = httpx.get(base_url + "/stats").json()["embeddings"] - before
+    ms = np.asarray(latencies) if latencies else np.zeros(1)
+    return {"questions": n, "errors": errors[0], "upstream": upstream,
+            **{f"p{q}": float(np.percentile(ms, q)) for q in (50, 95, 99)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-request batching of query embeddings")
+    parser.add_argument("--qps", type=float, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[5], help="Batching windows to compare with no batching")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=256, help="Max concurrent questions")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--embed-latency-ms", type=float, default=50)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from openai import OpenAI
+    base_url, proc = start_fake(args)
+    client = OpenAI(api_key="fake", base_url=base_url + "/v1", max_retries=0)
+    try:
+        print(f"fake embeddings latency {args.embed_latency_ms:.0f} ms, dim {args.dim}, {args.seconds:.0f} s per run")
+        print(f"{'qps':>6} {'window':>8} {'upstream':>9} {'req/q':>6} {'batch':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>4}")
+        for qps in args.qps:
+            for window in [0.0] + args.window_ms:
+                embedder = OpenAIEmbedder(lambda: client, "text-embedding-3-small",
+                                          query_window=window / 1000, query_batch_max=args.max_batch)
+                embedder.embed_text("warmup")
+                r = run(embedder, base_url, qps, args.seconds, args.threads)
+                label = f"{window:g} ms" if window else "off"
+                per_q = r["upstream"] / max(r["questions"], 1)
+                print(f"{qps:>6g} {label:>8} {r['upstream']:>9} {per_q:>6.2f} {1 / max(per_q, 1e-9):>6.1f} "
+                      f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['errors']:>4}")
+    finally:
+        stop([proc])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Offline retrieval benchmark suite
+Measures the retrieval path without API calls over synthetic corpora: chunking throughput
+(utils.chunker), local embedding throughput (utils.local_embedder, deterministic hashed n-grams),
+index build / write / load time for the index types the app uses (global IndexFlatIP and session
+IndexIDMap2), FAISS search QPS (batched) and single-query latency percentiles, chunk fetch cost
+(parsing text_chunks.txt as a snapshot miss does, plus looking up the top-k texts), and memory
+per vector. Results are written as JSON so runs can be compared across releases.
+
+    python -m experiments.bench_retrieval --sizes 1000 10000 100000
+    python -m experiments.bench_retrieval --sizes 1000000 --queries 100 --out results/bench_1m.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chunker import TextChunker
+from utils.data_loader import load_chunks
+from utils.local_embedder import HashingEmbedder
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_FILE = os.path.join(BASE_DIR, "data", "text_chunks.txt")
+RESULTS_DIR = os.path.join(BASE_DIR, "experiments", "results")
+EMBED_BATCH = 10000
+CHUNKING_SAMPLE_CHUNKS = 20000  # chunking is measured on at most this many chunks of text
+
+
+def vocabulary(extra: int = 20000) -> list:
+    """Words of the seed corpus plus synthetic words, so large corpora are not all near-duplicates."""
+    words = []
+    if os.path.exists(SEED_FILE):
+        with open(SEED_FILE, encoding="utf-8") as f:
+            words = sorted(set(re.findall(r"\w+", f.read())))
+    return words + [f"w{i:05d}" for i in range(extra)]
+
+
+def make_corpus(n_chunks: int, words: list, seed: int = 0, min_words: int = 40, max_words: int = 120) -> list:
+    """Deterministic Zipf-distributed synthetic chunks."""
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, len(words) + 1)
+    p = 1.0 / ranks
+    p /= p.sum()
+    order = rng.permutation(len(words))
+    vocab = np.array(words, dtype=object)[order]
+    lengths = rng.integers(min_words, max_words + 1, n_chunks)
+    ids = rng.choice(len(vocab), size=int(lengths.sum()), p=p)
+    chunks, pos = [], 0
+    for n in lengths:
+        chunks.append(" ".join(vocab[ids[pos:pos + n]]))
+        pos += n
+    return chunks
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource  # peak RSS only; deltas are approximate off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentiles(values_ms) -> dict:
+    arr = np.asarray(values_ms)
+    return {f"p{q}_ms": round(float(np.percentile(arr, q)), 3) for q in (50, 95, 99)}
+
+
+def bench_chunking(chunks: list, chunk_size: int) -> dict:
+    text = "\n\n".join(chunks[:CHUNKING_SAMPLE_CHUNKS])
+    chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_size // 4)
+    t0 = time.perf_counter()
+    out = chunker.split_text(text)
+    elapsed = time.perf_counter() - t0
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    return {"input_mb": round(mb, 2), "chunks": len(out), "mb_per_s": round(mb / elapsed, 2),
+            "chunks_per_s": round(len(out) / elapsed, 1)}
+
+
+def bench_embedding(embedder: HashingEmbedder, chunks: list) -> tuple:
+    vectors = np.empty((len(chunks), embedder.dim), dtype="float32")
+    t0 = time.perf_counter()
+    for start in range(0, len(chunks), EMBED_BATCH):
+        vectors[start:start + EMBED_BATCH] = embedder.embed_texts(chunks[start:start + EMBED_BATCH])
+    elapsed = time.perf_counter() - t0
+    return vectors, {"chunks_per_s": round(len(chunks) / elapsed, 1), "seconds": round(elapsed, 2)}
+
+
+def build_index(kind: str, vectors: np.ndarray):
+    if kind == "flat":
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+    else:
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+        index.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
+    return index
+
+
+def bench_index(kind: str, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, top_k: int, tmp: str) -> dict:
+    rss0 = rss_bytes()
+    t0 = time.perf_counter()
+    index = build_index(kind, vectors)
+    build_s = time.perf_counter() - t0
+    rss_delta = rss_bytes() - rss0
+
+    path = os.path.join(tmp, f"{kind}.faiss")
+    t0 = time.perf_counter()
+    faiss.write_index(index, path)
+    write_s = time.perf_counter() - t0
+    file_bytes = os.path.getsize(path)
+    t0 = time.perf_counter()
+    faiss.read_index(path)
+    load_s = time.perf_counter() - t0
+    os.remove(path)
+
+    t0 = time.perf_counter()
+    _, I = index.search(queries, top_k)
+    batch_s = time.perf_counter() - t0
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q.reshape(1, -1), top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    n = len(vectors)
+    return {
+        "build_s": round(build_s, 3),
+        "write_s": round(write_s, 3),
+        "load_s": round(load_s, 3),
+        "file_bytes_per_vector": round(file_bytes / n, 1),
+        "rss_bytes_per_vector": round(max(rss_delta, 0) / n, 1),
+        "batch_qps": round(len(queries) / batch_s, 1),
+        "single_query": percentiles(latencies),
+        # The query is a span of its source chunk, so the source should be retrieved.
+        f"self_hit@{top_k}": round(float(np.mean([truth[i] in I[i] for i in range(len(queries))])), 3),
+    }
+
+
+def bench_fetch(chunks: list, ids: np.ndarray, tmp: str) -> dict:
+    path = os.path.join(tmp, "text_chunks.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(c + "\n\n" for c in chunks))
+    t0 = time.perf_counter()
+    loaded = load_chunks(path=path)
+    load_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for row in ids:
+        [loaded[i] for i in row if 0 <= i < len(loaded)]
+    fetch_s = time.perf_counter() - t0
+    size = os.path.getsize(path)
+    os.remove(path)
+    return {"text_mb": round(size / (1024 * 1024), 2), "load_chunks_s": round(load_s, 3),
+            "fetch_us_per_query": round(fetch_s / len(ids) * 1e6, 2)}
+
+
+def make_queries(chunks: list, n_queries: int, words_per_query: int, seed: int = 1):
+    """A contiguous word span of a random chunk per query; the chunk is the expected hit."""
+    rng = np.random.default_rng(seed)
+    truth = rng.choice(len(chunks), size=min(n_queries, len(chunks)), replace=False)
+    queries = []
+    for i in truth:
+        words = chunks[i].split()
+        start = int(rng.integers(0, max(len(words) - words_per_query, 0) + 1))
+        queries.append(" ".join(words[start:start + words_per_query]))
+    return queries, truth
+
+
+def bench(n_chunks: int, args, embedder: HashingEmbedder, words: list) -> dict:
+    t0 = time.perf_counter()
+    chunks = make_corpus(n_chunks, words)
+    result = {"chunks": n_chunks, "corpus_s": round(time.perf_counter() - t0, 2)}
+    result["chunking"] = bench_chunking(chunks, args.chunk_size)
+    vectors, result["embedding"] = bench_embedding(embedder, chunks)
+    query_texts, truth = make_queries(chunks, args.queries, args.query_words)
+    queries = embedder.embed_texts(query_texts)
+    with tempfile.TemporaryDirectory() as tmp:
+        result["index"] = {kind: bench_index(kind, vectors, queries, truth, args.top_k, tmp) for kind in args.index}
+        _, top = build_index("flat", vectors).search(queries, args.top_k)
+        result["fetch"] = bench_fetch(chunks, top, tmp)
+    result["vector_bytes"] = vectors.shape[1] * 4
+    return result
+
+
+def environment() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    return {"git_rev": rev, "python": platform.python_version(), "numpy": np.__version__,
+            "faiss": getattr(faiss, "__version__", ""), "cpus": os.cpu_count(), "platform": platform.platform()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Synthetic corpus sizes in chunks (1000000 needs ~3 GB of RAM)")
+    parser.add_argument("--dim", type=int, default=384, help="Local embedder dimension")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-words", type=int, default=8, help="Words per query (a span of its source chunk)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--index", nargs="+", default=["flat", "idmap"], choices=["flat", "idmap"],
+                        help="flat = global IndexFlatIP, idmap = session IndexIDMap2")
+    parser.add_argument("--out", default=None, help="JSON output path (default: experiments/results/bench_retrieval_<ts>.json)")
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder(dim=args.dim)
+    words = vocabulary()
+    report = {
+        "benchmark": "retrieval",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": [],
+    }
+    for n in args.sizes:
+        result = bench(n, args, embedder, words)
+        print(json.dumps(result, ensure_ascii=False))
+        report["results"].append(result)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench_retrieval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved: {out}")
+
+
+if __name__ == "__main__":
+    main()
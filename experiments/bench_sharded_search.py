@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Cross-session (sharded) search benchmark
+Builds synthetic per-session FAISS indexes (IndexIDMap2 over IndexFlatIP, like session indexes)
+in a temp dir and measures query latency of utils.sharded_search.search_shards against a
+sequential loop, for a range of shard counts. Each shard task reads its index from disk and
+searches it, which is what /admin/search does per session. No API calls.
+
+    python -m experiments.bench_sharded_search --shards 1 2 4 8 16 32 --threads 8
+    python -m experiments.bench_sharded_search --preload   # search only, indexes already in memory
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sharded_search import search_shards
+
+
+def build_shards(root: str, n_shards: int, chunks_per_shard: int, dim: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for s in range(n_shards):
+        xb = rng.standard_normal((chunks_per_shard, dim)).astype("float32")
+        faiss.normalize_L2(xb)
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        index.add_with_ids(xb, np.arange(chunks_per_shard, dtype="int64"))
+        path = os.path.join(root, f"shard-{s}.faiss")
+        faiss.write_index(index, path)
+        paths.append(path)
+    return paths
+
+
+def make_shard_fns(paths, query, top_k: int, preload: bool):
+    loaded = {p: faiss.read_index(p) for p in paths} if preload else {}
+
+    def search(path):
+        index = loaded.get(path) or faiss.read_index(path)
+        D, I = index.search(query, top_k)
+        return [(int(i), float(d)) for i, d in zip(I[0], D[0]) if i >= 0]
+
+    return {p: (lambda p=p: search(p)) for p in paths}
+
+
+def bench(paths, n_queries: int, top_k: int, dim: int, threads: int, preload: bool):
+    rng = np.random.default_rng(7)
+    seq, par = [], []
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(n_queries):
+            q = rng.standard_normal((1, dim)).astype("float32")
+            faiss.normalize_L2(q)
+            fns = make_shard_fns(paths, q, top_k, preload)
+
+            t0 = time.perf_counter()
+            hits = [(sid, h) for sid, fn in fns.items() for h in fn()]
+            sorted(hits, key=lambda x: x[1][1], reverse=True)[:top_k]
+            seq.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            search_shards(fns, top_k, pool, timeout=60)
+            par.append((time.perf_counter() - t0) * 1000)
+
+    seq, par = np.array(seq), np.array(par)
+    return {
+        "shards": len(paths),
+        "seq_p50_ms": round(float(np.percentile(seq, 50)), 2),
+        "par_p50_ms": round(float(np.percentile(par, 50)), 2),
+        "par_p95_ms": round(float(np.percentile(par, 95)), 2),
+        "speedup": round(float(np.percentile(seq, 50) / np.percentile(par, 50)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded cross-session search benchmark")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--chunks", type=int, default=5000, help="Chunks per shard (session)")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--preload", action="store_true", help="Keep indexes in memory (search cost only)")
+    args = parser.parse_args()
+
+    # FAISS uses OpenMP inside a single search; pin it to one thread so the pool does the parallelism.
+    faiss.omp_set_num_threads(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = build_shards(tmp, max(args.shards), args.chunks, args.dim)
+        for n in args.shards:
+            print(bench(paths[:n], args.queries, args.top_k, args.dim, args.threads, args.preload))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Two-stage search benchmark: reduced-dimension index + full-dimension rerank
+Compares the flat full-dimension index the app uses today against session indexes that keep only the
+leading `dim` components of each embedding (re-normalized, utils.full_vectors.truncate) and rerank
+the top `candidates` with full vectors read from a memory-mapped side file (vectors.f32), as
+main.search_corpus does when EMBED_SEARCH_DIM is set. For every configuration it reports index bytes
+per vector, side-file bytes, single-query latency percentiles (search + rerank), batch QPS, and
+recall@k against the exact full-dimension top-k. "candidates = 0" rows are the truncated index alone.
+
+The local embedder has no Matryoshka ordering, so its vectors are PCA-rotated first (leading
+components carry the most variance), which approximates a text-embedding-3 prefix. --embedder openai
+measures the real thing on data/text_chunks.txt (+ synthetic distractors), through the embedding cache.
+
+    python -m experiments.bench_two_stage --chunks 50000 --dims 128 256 --candidates 20 50 100
+    python -m experiments.bench_two_stage --embedder openai --distractors 5000 --dims 256 512
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import full_vectors
+from utils.chunker import TextChunker
+from experiments.bench_retrieval import environment, make_corpus, make_queries, percentiles, vocabulary
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT_FILE = os.path.join(BASE_DIR, "data", "text_chunks.txt")
+RESULTS_DIR = os.path.join(BASE_DIR, "experiments", "results")
+EMBED_BATCH = 1000
+
+
+def pca_rotate(vectors: np.ndarray, queries: np.ndarray):
+    """Rotate both sets onto the corpus principal axes (descending variance); inner products are unchanged."""
+    _, _, vt = np.linalg.svd(vectors - vectors.mean(axis=0), full_matrices=False)
+    return np.ascontiguousarray(vectors @ vt.T, dtype="float32"), np.ascontiguousarray(queries @ vt.T, dtype="float32")
+
+
+def load_vectors(args):
+    """(corpus vectors, query vectors) — both L2-normalized float32."""
+    if args.embedder == "local":
+        from utils.local_embedder import HashingEmbedder
+        embedder = HashingEmbedder(dim=args.dim)
+        chunks = make_corpus(args.chunks, vocabulary())
+        embed = embedder.embed_texts
+    else:
+        from experiments.eval_retrieval import make_embed_fn, CACHE_PATH
+        with open(args.text, encoding="utf-8") as f:
+            chunks = TextChunker(chunk_size=args.chunk_size, chunk_overlap=args.chunk_size // 4).split_text(f.read())
+        chunks += make_corpus(args.distractors, vocabulary()) if args.distractors else []
+        embed = make_embed_fn("openai", CACHE_PATH)
+    query_texts, _ = make_queries(chunks, args.queries, args.query_words)
+    vectors = np.vstack([embed(chunks[i:i + EMBED_BATCH]) for i in range(0, len(chunks), EMBED_BATCH)])
+    queries = embed(query_texts)
+    if args.embedder == "local":
+        vectors, queries = pca_rotate(vectors, queries)
+    return vectors.astype("float32"), queries.astype("float32")
+
+
+def index_bytes(index, tmp: str) -> int:
+    path = os.path.join(tmp, "index.faiss")
+    faiss.write_index(index, path)
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size
+
+
+def run_config(index, queries, rows, top_k: int, candidates: int, search_dim: int):
+    """Returns (ids (n, top_k), single-query latencies ms, batch seconds)."""
+    def finish(q, row):
+        if candidates <= 0:
+            return row[:top_k]
+        return [i for i, _ in full_vectors.rerank(q, [int(i) for i in row if i >= 0], rows)[:top_k]]
+
+    coarse = full_vectors.truncate(queries, search_dim) if search_dim else queries
+    k = max(top_k, candidates)
+    latencies = []
+    for q, cq in zip(queries, coarse):
+        t0 = time.perf_counter()
+        _, I = index.search(cq.reshape(1, -1), k)
+        finish(q, I[0])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    _, I = index.search(coarse, k)
+    ids = [finish(q, row) for q, row in zip(queries, I)]
+    batch_s = time.perf_counter() - t0
+    ids = np.asarray([list(r) + [-1] * (top_k - len(r)) for r in ids], dtype="int64")
+    return ids, latencies, batch_s
+
+
+def recall(ids: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(ids.tolist(), truth.tolist())]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reduced-dimension index + full-dimension rerank benchmark")
+    parser.add_argument("--embedder", choices=["local", "openai"], default="local")
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic corpus size (local)")
+    parser.add_argument("--dim", type=int, default=1536, help="Local embedder dimension (full dimension)")
+    parser.add_argument("--text", default=TEXT_FILE, help="Corpus text (openai)")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--distractors", type=int, default=0, help="Synthetic chunks added to the corpus (openai)")
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 512], help="Reduced index dimensions")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[0, 20, 50, 100],
+                        help="Rerank candidates per query (0 = truncated index alone)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-words", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--out", default=None, help="JSON output path (default: experiments/results/bench_two_stage_<ts>.json)")
+    args = parser.parse_args()
+
+    vectors, queries = load_vectors(args)
+    n, full_dim = vectors.shape
+    report = {
+        "benchmark": "two_stage",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "corpus": {"chunks": n, "full_dim": full_dim, "queries": len(queries)},
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flat = faiss.IndexFlatIP(full_dim)
+        flat.add(vectors)
+        truth, latencies, batch_s = run_config(flat, queries, None, args.top_k, 0, 0)
+        full_bytes = index_bytes(flat, tmp)
+        baseline = {"config": f"flat{full_dim}", "dim": full_dim, "candidates": 0,
+                    "index_bytes_per_vector": round(full_bytes / n, 1), "side_file_bytes": 0,
+                    "resident_ratio": 1.0, "single_query": percentiles(latencies),
+                    "batch_qps": round(len(queries) / batch_s, 1), f"recall@{args.top_k}": 1.0}
+        print(json.dumps(baseline))
+        report["results"].append(baseline)
+
+        side = os.path.join(tmp, full_vectors.FILE_NAME)
+        full_vectors.write_rows(side, 0, vectors)
+        rows = full_vectors.open_rows(side, n, full_dim)
+        for dim in sorted(d for d in args.dims if d < full_dim):
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+            index.add_with_ids(full_vectors.truncate(vectors, dim), np.arange(n, dtype="int64"))
+            size = index_bytes(index, tmp)
+            for candidates in args.candidates:
+                ids, latencies, batch_s = run_config(index, queries, rows, args.top_k, candidates, dim)
+                result = {"config": f"idmap{dim}" + (f"+rerank{candidates}" if candidates > 0 else ""),
+                          "dim": dim, "candidates": candidates,
+                          "index_bytes_per_vector": round(size / n, 1),
+                          "side_file_bytes": os.path.getsize(side) if candidates > 0 else 0,
+                          # Only the reduced index must stay in RAM; the side file is paged in per candidate.
+                          "resident_ratio": round(size / full_bytes, 3),
+                          "single_query": percentiles(latencies),
+                          "batch_qps": round(len(queries) / batch_s, 1),
+                          f"recall@{args.top_k}": round(recall(ids, truth), 4)}
+                print(json.dumps(result))
+                report["results"].append(result)
+        del rows
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench_two_stage_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved: {out}")
+
+
+if __name__ == "__main__":
+    main()
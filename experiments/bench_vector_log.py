@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Vector log append benchmark
+Measures the cost of persisting one upload as a session grows, comparing a full index rewrite
+(read index.faiss + add + write_index, the old path) with appending to utils.vector_log, and the
+load cost of base + log. Random vectors, no API calls.
+
+    python -m experiments.bench_vector_log --sizes 1000 10000 50000 --append 20
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import vector_log
+
+
+def bench(n_base: int, n_append: int, dim: int, rounds: int) -> dict:
+    rng = np.random.default_rng(0)
+    base = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    base.add_with_ids(rng.standard_normal((n_base, dim)).astype("float32"), np.arange(n_base, dtype="int64"))
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "index.faiss")
+        log_path = os.path.join(tmp, "vectors.log")
+        faiss.write_index(base, index_path)
+
+        rewrite_ms, rewrite_bytes = [], 0
+        next_id = n_base
+        for _ in range(rounds):
+            new = rng.standard_normal((n_append, dim)).astype("float32")
+            t0 = time.perf_counter()
+            index = faiss.read_index(index_path)
+            index.add_with_ids(new, np.arange(next_id, next_id + n_append, dtype="int64"))
+            faiss.write_index(index, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+            rewrite_ms.append((time.perf_counter() - t0) * 1000)
+            rewrite_bytes += os.path.getsize(index_path)
+            next_id += n_append
+
+        faiss.write_index(base, index_path)
+        log_ms, log_bytes = [], 0
+        next_id = n_base
+        for _ in range(rounds):
+            new = rng.standard_normal((n_append, dim)).astype("float32")
+            t0 = time.perf_counter()
+            size = vector_log.append(log_path, np.arange(next_id, next_id + n_append, dtype="int64"), new)
+            log_ms.append((time.perf_counter() - t0) * 1000)
+            log_bytes = size
+            next_id += n_append
+
+        t0 = time.perf_counter()
+        index = faiss.read_index(index_path)
+        vector_log.apply(index, log_path)
+        load_ms = (time.perf_counter() - t0) * 1000
+
+    return {
+        "base_vectors": n_base,
+        "append_vectors": n_append,
+        "rewrite_ms": round(float(np.median(rewrite_ms)), 2),
+        "log_append_ms": round(float(np.median(log_ms)), 3),
+        "rewrite_mb_per_append": round(rewrite_bytes / rounds / (1024 * 1024), 2),
+        "log_mb_per_append": round(log_bytes / rounds / (1024 * 1024), 3),
+        "load_base_plus_log_ms": round(load_ms, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector log append benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Vectors already in the session")
+    parser.add_argument("--append", type=int, default=20, help="Vectors per upload")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        print(bench(n, args.append, args.dim, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Retrieval evaluation against ground-truth labels
+Chunks data/text_chunks.txt, embeds chunks and labelled questions once, builds each requested index
+type over the same vectors and runs one batched search per index at max(k). recall@k, precision@k,
+hit@k, MRR@k and nDCG@k for every k come from a single NumPy pass (utils.retrieval_eval); approximate
+indexes also report how much of the exact (flat) top-k they recover, search latency and bytes per
+vector. Synthetic distractor chunks can be added to see how quality holds up as the corpus grows.
+
+    python -m experiments.eval_retrieval --embedder local --index flat ivf hnsw sq8 pq
+    python -m experiments.eval_retrieval --chunk-size 256 512 --k 1 3 5 10 --distractors 20000
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chunker import TextChunker
+from utils.retrieval_eval import load_labels, resolve_relevant, build_index, evaluate_index, index_spec
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT_FILE = os.path.join(BASE_DIR, "data", "text_chunks.txt")
+RESULTS_DIR = os.path.join(BASE_DIR, "experiments", "results")
+LABELS_PATH = os.path.join(BASE_DIR, "experiments", "labels", "ai_questions.jsonl")
+CACHE_PATH = os.path.join(RESULTS_DIR, "embedding_cache.db")
+EMBED_MODEL = "text-embedding-3-small"
+
+
+def make_embed_fn(kind: str, cache_path: str):
+    """texts -> (n, dim) float32 L2-normalized vectors."""
+    if kind == "local":
+        from utils.local_embedder import HashingEmbedder
+        return HashingEmbedder().embed_texts
+
+    from dotenv import load_dotenv
+    from openai import OpenAI
+    from utils.embedding_cache import EmbeddingCache
+
+    load_dotenv()
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None)
+    cache = EmbeddingCache(cache_path)
+
+    def embed_batch(texts):
+        response = client.embeddings.create(model=EMBED_MODEL, input=texts)
+        return np.array([d.embedding for d in response.data], dtype="float32")
+
+    def embed(texts):
+        vectors = cache.embed_cached(EMBED_MODEL, list(texts), embed_batch)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    return embed
+
+
+def distractor_chunks(n: int, seed: int = 0) -> list:
+    """Synthetic chunks that are never relevant (same generator as bench_retrieval)."""
+    if n <= 0:
+        return []
+    from experiments.bench_retrieval import vocabulary, make_corpus
+    return make_corpus(n, vocabulary(), seed=seed)
+
+
+def evaluate_chunk_size(chunk_size: int, text: str, labels: list, embed, args, distractors: list) -> dict:
+    chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_size // 4,
+                          separators=["\n\n", "\n", ". ", " ", ""])
+    chunks = chunker.split_text(text)
+    relevant = resolve_relevant(labels, chunks)  # distractors go after the real chunks, so ids stay valid
+    corpus = chunks + distractors
+    vectors = embed(corpus)
+    queries = embed([label["query"] for label in labels])
+
+    ks = sorted(set(k for k in args.k if k > 0))
+    print(f"\nchunk_size={chunk_size}: {len(chunks)} chunks + {len(distractors)} distractors, "
+          f"{sum(1 for r in relevant if r)}/{len(labels)} labelled questions resolved")
+
+    exact_ids = None
+    indexes = {}
+    for kind in ["flat"] + [k for k in args.index if k != "flat"]:
+        index = build_index(kind, vectors, nprobe=args.nprobe, ef_search=args.ef_search)
+        result = evaluate_index(index, queries, relevant, ks, exact_ids=exact_ids)
+        ids = result.pop("ids")
+        if kind == "flat":
+            exact_ids = ids
+            if "flat" not in args.index:
+                continue
+        result["factory"] = index_spec(kind, len(corpus), vectors.shape[1])
+        indexes[kind] = result
+        k_main = 5 if 5 in ks else ks[-1]
+        print(f"  {kind:>6} ({result['factory']}): recall@{k_main}={result[f'recall@{k_main}']} "
+              f"mrr@{k_main}={result[f'mrr@{k_main}']} ndcg@{k_main}={result[f'ndcg@{k_main}']} "
+              f"{result['search_ms_per_query']} ms/query {result['bytes_per_vector']} B/vector")
+
+    return {
+        "chunk_size": chunk_size,
+        "chunks": len(chunks),
+        "distractors": len(distractors),
+        "resolved_questions": sum(1 for r in relevant if r),
+        "relevant_per_question": [len(r) for r in relevant],
+        "indexes": indexes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval evaluation against ground-truth labels")
+    parser.add_argument("--labels", default=LABELS_PATH, help="JSONL of {query, relevant_text | relevant_ids}")
+    parser.add_argument("--text", default=TEXT_FILE)
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 8, 10])
+    parser.add_argument("--index", nargs="+", default=["flat", "ivf", "hnsw", "sq8", "pq"],
+                        help="flat, ivf, hnsw, sq8, pq, ivfpq or any faiss index_factory string")
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--embedder", choices=["openai", "local"], default="openai",
+                        help="local = deterministic hashed n-grams, no API calls")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Embedding cache path (openai)")
+    parser.add_argument("--distractors", type=int, default=0, help="Synthetic non-relevant chunks to add")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels)
+    with open(args.text, encoding="utf-8") as f:
+        text = f.read()
+    embed = make_embed_fn(args.embedder, args.cache)
+    distractors = distractor_chunks(args.distractors)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "labels": os.path.relpath(args.labels, BASE_DIR),
+        "questions": len(labels),
+        "embedder": args.embedder,
+        "k": sorted(set(args.k)),
+        "results": [evaluate_chunk_size(c, text, labels, embed, args, distractors) for c in args.chunk_size],
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f"eval_retrieval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nSaved: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI-compatible server for offline load tests
+Serves /v1/embeddings (deterministic utils.local_embedder vectors, float or base64 encoding as the
+openai client requests) and /v1/chat/completions (plain and streamed) with configurable latency,
+token rate and error injection. Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+    python -m experiments.fake_openai --port 9100 --llm-latency-ms 300 --tokens-per-s 40 --error-rate 0.01
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.local_embedder import HashingEmbedder
+
+WORDS = ("the answer is based on the retrieved context and covers the main points of the question "
+         "with a short summary of each relevant passage").split()
+
+
+@dataclass
+class FakeSettings:
+    dim: int = 1536                 # text-embedding-3-small
+    embed_latency_ms: float = 30.0
+    llm_latency_ms: float = 300.0   # time to first token
+    tokens_per_s: float = 40.0
+    answer_tokens: int = 60
+    jitter: float = 0.2             # latencies are scaled by uniform(1 - jitter, 1 + jitter)
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int = 0
+    stats: dict = field(default_factory=lambda: {"embeddings": 0, "embedded_texts": 0, "chat": 0,
+                                                  "chat_stream": 0, "injected_errors": 0})
+
+
+def create_app(settings: FakeSettings) -> FastAPI:
+    app = FastAPI()
+    embedder = HashingEmbedder(dim=settings.dim)
+    rng = random.Random(settings.seed)
+
+    def delay(ms: float) -> float:
+        return max(ms, 0.0) / 1000 * rng.uniform(1 - settings.jitter, 1 + settings.jitter)
+
+    def injected_error():
+        if settings.error_rate and rng.random() < settings.error_rate:
+            settings.stats["injected_errors"] += 1
+            return JSONResponse(status_code=settings.error_status,
+                                content={"error": {"message": "injected error", "type": "server_error"}})
+        return None
+
+    def tokens():
+        return [rng.choice(WORDS) + " " for _ in range(settings.answer_tokens)]
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    @app.get("/stats")
+    async def stats():
+        return settings.stats
+
+    @app.post("/v1/embeddings")
+    async def embeddings(req: Request):
+        body = await req.json()
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        settings.stats["embeddings"] += 1
+        settings.stats["embedded_texts"] += len(texts)
+        await asyncio.sleep(delay(settings.embed_latency_ms))
+        error = injected_error()
+        if error is not None:
+            return error
+        vectors = embedder.embed_texts(texts)
+        base64_output = body.get("encoding_format") == "base64"
+        data = [{"object": "embedding", "index": i,
+                 "embedding": base64.b64encode(v.astype("<f4").tobytes()).decode() if base64_output else v.tolist()}
+                for i, v in enumerate(vectors)]
+        n_tokens = sum(len(t.split()) for t in texts)
+        return {"object": "list", "data": data, "model": body.get("model", ""),
+                "usage": {"prompt_tokens": n_tokens, "total_tokens": n_tokens}}
+
+    @app.post("/v1/chat/completions")
+    async def chat(req: Request):
+        body = await req.json()
+        model = body.get("model", "")
+        created = int(time.time())
+        stream = bool(body.get("stream"))
+        settings.stats["chat_stream" if stream else "chat"] += 1
+        await asyncio.sleep(delay(settings.llm_latency_ms))
+        error = injected_error()
+        if error is not None:
+            return error
+        parts = tokens()
+        per_token = 1.0 / settings.tokens_per_s if settings.tokens_per_s > 0 else 0.0
+
+        if not stream:
+            await asyncio.sleep(delay(per_token * 1000 * len(parts)))
+            return {
+                "id": f"chatcmpl-fake-{created}", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(parts).strip()}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(parts), "total_tokens": len(parts)},
+            }
+
+        async def events():
+            def chunk(delta, finish=None):
+                return "data: " + json.dumps({
+                    "id": f"chatcmpl-fake-{created}", "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                }) + "\n\n"
+            yield chunk({"role": "assistant", "content": ""})
+            for part in parts:
+                yield chunk({"content": part})
+                await asyncio.sleep(delay(per_token * 1000))
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Fake server options, shared with experiments.load_test."""
+    defaults = FakeSettings()
+    parser.add_argument("--dim", type=int, default=defaults.dim, help="Embedding dimension")
+    parser.add_argument("--embed-latency-ms", type=float, default=defaults.embed_latency_ms)
+    parser.add_argument("--llm-latency-ms", type=float, default=defaults.llm_latency_ms, help="Time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=defaults.tokens_per_s)
+    parser.add_argument("--answer-tokens", type=int, default=defaults.answer_tokens)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Probability of an injected error")
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+
+
+def settings_from_args(args) -> FakeSettings:
+    return FakeSettings(dim=args.dim, embed_latency_ms=args.embed_latency_ms, llm_latency_ms=args.llm_latency_ms,
+                        tokens_per_s=args.tokens_per_s, answer_tokens=args.answer_tokens, jitter=args.jitter,
+                        error_rate=args.error_rate, error_status=args.error_status)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
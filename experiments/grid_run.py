@@ -2,24 +2,42 @@
 """
 RAG Experiment Automation Pipeline
 Grid search for chunking, top-k, and temperature parameters
+
+Chunks and questions are embedded in batches once per chunk size and kept in a persistent
+embedding cache (utils.embedding_cache), retrieval runs once per (chunk, k, question) — or once at
+max(k) with --slice-k — and the LLM calls run on a bounded thread pool. Completed cells are
+checkpointed next to the CSV, so an interrupted run continues with --resume.
+
+Questions and their relevant chunks come from a labels file (utils.retrieval_eval), so recall@5,
+F1 (from precision@k and recall@k), MRR and nDCG are measured against ground truth.
+
+    python -m experiments.grid_run --workers 8
+    python -m experiments.grid_run --resume experiments/results/grid_search_20250101_120000.csv
 """
 
 import os
+import sys
 import csv
+import json
 import time
 import argparse
 import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import uuid
 
 import numpy as np
 from openai import OpenAI
 from dotenv import load_dotenv
 import tiktoken
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import faiss
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.chunker import TextChunker
+from utils.embedding_cache import EmbeddingCache
+from utils.retrieval_eval import load_labels, resolve_relevant, metrics
+
 # Load environment variables
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -34,36 +52,35 @@ os.makedirs(RESULTS_DIR, exist_ok=True)
 DEFAULT_CHUNK_SIZES = [256, 512]
 DEFAULT_TOP_KS = [3, 5, 8]
 DEFAULT_TEMPERATURES = [0.2, 0.5, 0.8]
+DEFAULT_WORKERS = 8
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = 100
+CACHE_PATH = os.path.join(RESULTS_DIR, "embedding_cache.db")
+LABELS_PATH = os.path.join(BASE_DIR, "experiments", "labels", "ai_questions.jsonl")
+FIELDNAMES = ["run_id", "chunk", "k", "temp", "recall@5", "f1", "mrr", "ndcg", "latency_ms", "cost_cents"]
+QUALITY_FIELDS = ["recall@5", "f1", "mrr", "ndcg"]
 
-# Test questions (AI topic)
-TEST_QUESTIONS = [
-    "Who coined the term 'artificial intelligence'?",
-    "What is the Turing Test?",
-    "How does machine learning work?",
-    "What are neural networks?",
-    "Explain deep learning in simple terms"
-]
+def embed_batch(texts: List[str]) -> np.ndarray:
+    """Embed a batch of texts with one OpenAI API call"""
+    response = client.embeddings.create(model=EMBED_MODEL, input=texts)
+    return np.array([d.embedding for d in response.data], dtype="float32")
 
-def get_embeddings(texts: List[str]) -> np.ndarray:
-    """Get embeddings for a list of texts using OpenAI API"""
-    embeddings = []
-    for text in texts:
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        embeddings.append(response.data[0].embedding)
-    return np.array(embeddings)
+def get_embeddings(texts: List[str], cache: EmbeddingCache = None, batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """Get embeddings for a list of texts, batched and served from the cache when one is given"""
+    if cache is not None:
+        return cache.embed_cached(EMBED_MODEL, texts, embed_batch, batch_size=batch_size)
+    if not texts:
+        return np.empty((0, 0), dtype="float32")
+    return np.vstack([embed_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
 
 def chunk_text(text: str, chunk_size: int) -> List[str]:
-    """Split text into chunks using RecursiveCharacterTextSplitter"""
-    text_splitter = RecursiveCharacterTextSplitter(
+    """Split text into chunks (same output as RecursiveCharacterTextSplitter, see utils/chunker.py)"""
+    chunker = TextChunker(
         chunk_size=chunk_size,
         chunk_overlap=chunk_size // 4,
-        length_function=len,
         separators=["\n\n", "\n", ". ", " ", ""]
     )
-    return text_splitter.split_text(text)
+    return chunker.split_text(text)
 
 def create_faiss_index(embeddings: np.ndarray) -> faiss.IndexFlatIP:
     """Create and return a Faiss index for similarity search"""
@@ -78,6 +95,27 @@ def search_similar_chunks(query_embedding: np.ndarray, index: faiss.IndexFlatIP,
     scores, indices = index.search(query_embedding, top_k)
     return scores[0], indices[0]
 
+def retrieval_plan(query_embeddings: np.ndarray, index: faiss.IndexFlatIP, top_ks: List[int],
+                   slice_k: bool = False) -> Dict[Tuple[int, int], np.ndarray]:
+    """Return {(question position, k): chunk ids} for every question and k.
+
+    Each k is one batched search over all questions. With slice_k a single search at max(k)
+    is sliced for the smaller k; on a flat (exact) index the top-k prefix is the same result.
+    """
+    queries = query_embeddings.astype("float32")
+    plan = {}
+    if slice_k:
+        _, indices = index.search(queries, min(max(top_ks), index.ntotal))
+        for k in top_ks:
+            for qi in range(len(queries)):
+                plan[(qi, k)] = indices[qi][:k]
+        return plan
+    for k in top_ks:
+        _, indices = index.search(queries, min(k, index.ntotal))
+        for qi in range(len(queries)):
+            plan[(qi, k)] = indices[qi]
+    return plan
+
 def generate_answer(context: str, question: str, temperature: float) -> str:
     """Generate answer using OpenAI GPT"""
     prompt = f"""Based on the following context, answer the question:
@@ -101,48 +139,50 @@ Answer:"""
     answer = response.choices[0].message.content
     return answer if answer else "No response generated"
 
-def calculate_recall_at_5(relevant_chunks: List[str], retrieved_chunks: List[str]) -> float:
-    """Calculate recall@5 (simplified version)"""
-    if not relevant_chunks:
-        return 0.0
-    
-    # For simplicity, we'll consider chunks containing key terms as relevant
-    relevant_terms = ["AI", "artificial intelligence", "machine learning", "neural", "turing"]
-    relevant_count = 0
-    
-    for chunk in retrieved_chunks[:5]:
-        if any(term.lower() in chunk.lower() for term in relevant_terms):
-            relevant_count += 1
-    
-    return relevant_count / min(5, len(relevant_chunks))
-
 def calculate_f1_score(precision: float, recall: float) -> float:
     """Calculate F1 score"""
     if precision + recall == 0:
         return 0.0
     return 2 * (precision * recall) / (precision + recall)
 
+def retrieval_quality(plan: Dict[Tuple[int, int], np.ndarray], relevant: List[List[int]],
+                      top_ks: List[int]) -> Dict[Tuple[int, int], Dict[str, float]]:
+    """Return {(question position, k): quality columns} for the retrieval plan.
+
+    recall@5 is measured on the first min(5, k) retrieved chunks; f1 combines precision@k and
+    recall@k, and mrr / ndcg are @k. Questions without any relevant chunk score 0.
+    """
+    quality = {}
+    for k in top_ks:
+        ids = np.full((len(relevant), k), -1, dtype="int64")
+        for qi in range(len(relevant)):
+            found = plan[(qi, k)][:k]
+            ids[qi, :len(found)] = found
+        per_query = metrics(ids, relevant, sorted({min(5, k), k}))
+        for qi in range(len(relevant)):
+            value = {name: float(np.nan_to_num(v[qi])) for name, v in per_query.items()}
+            recall_k, precision_k = value[f"recall@{k}"], value[f"precision@{k}"]
+            quality[(qi, k)] = {
+                "recall@5": round(value[f"recall@{min(5, k)}"], 4),
+                "f1": round(calculate_f1_score(precision_k, recall_k), 4),
+                "mrr": round(value[f"mrr@{k}"], 4),
+                "ndcg": round(value[f"ndcg@{k}"], 4),
+            }
+    return quality
+
 def run_single_experiment(
     run_id: str,
     chunk_size: int,
     top_k: int,
     temperature: float,
     question: str,
-    chunks: List[str],
-    chunk_embeddings: np.ndarray,
-    faiss_index: faiss.IndexFlatIP
+    retrieved_chunks: List[str],
+    quality: Dict[str, float]
 ) -> Dict[str, Any]:
-    """Run a single experiment and return results"""
+    """Run a single experiment on already retrieved chunks and return results (quality is precomputed)"""
     
     start_time = time.time()
     
-    # Get query embedding
-    query_embedding = get_embeddings([question])[0]
-    
-    # Search for similar chunks
-    scores, indices = search_similar_chunks(query_embedding, faiss_index, top_k)
-    retrieved_chunks = [chunks[i] for i in indices]
-    
     # Generate answer
     context = "\n\n".join(retrieved_chunks)
     answer = generate_answer(context, question, temperature)
@@ -150,11 +190,6 @@ def run_single_experiment(
     # Calculate metrics
     latency_ms = (time.time() - start_time) * 1000
     
-    # Simplified evaluation (in real scenario, you'd have ground truth)
-    recall_at_5 = calculate_recall_at_5(retrieved_chunks, retrieved_chunks)
-    precision = recall_at_5  # Simplified
-    f1 = calculate_f1_score(precision, recall_at_5)
-    
     # Estimate cost (rough calculation)
     input_tokens = len(context.split()) + len(question.split())
     output_tokens = len(answer.split())
@@ -165,12 +200,29 @@ def run_single_experiment(
         "chunk": chunk_size,
         "k": top_k,
         "temp": temperature,
-        "recall@5": round(recall_at_5, 4),
-        "f1": round(f1, 4),
+        **{name: quality[name] for name in QUALITY_FIELDS},
         "latency_ms": round(latency_ms, 2),
         "cost_cents": round(cost_cents, 4)
     }
 
+def cell_key(chunk_size: int, top_k: int, temperature: float, question: str) -> str:
+    """Stable identifier of one grid cell, used by the checkpoint"""
+    return json.dumps([chunk_size, top_k, temperature, question], ensure_ascii=False)
+
+def load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """Read completed cells ({cell key: result row}); a torn last line is ignored"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            done[entry["cell"]] = entry["row"]
+    return done
+
 def main():
     parser = argparse.ArgumentParser(description="RAG Experiment Automation")
     parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_TOP_KS,
@@ -181,6 +233,21 @@ def main():
                        help="Chunk sizes for text splitting")
     parser.add_argument("--sample", type=int, default=10,
                        help="Number of samples to run per parameter combination")
+    parser.add_argument("--labels", default=LABELS_PATH,
+                       help="JSONL of questions with relevant_text / relevant_ids (utils.retrieval_eval)")
+    
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                       help="Concurrent LLM calls")
+    parser.add_argument("--slice-k", action="store_true",
+                       help="Search once at max(k) and slice the result for smaller k")
+    parser.add_argument("--embed-batch", type=int, default=EMBED_BATCH_SIZE,
+                       help="Texts per embedding API call")
+    parser.add_argument("--cache", default=CACHE_PATH,
+                       help="Embedding cache path")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Do not read or write the embedding cache")
+    parser.add_argument("--resume", default=None,
+                       help="Results CSV of an interrupted run to continue")
     
     args = parser.parse_args()
     
@@ -188,6 +255,7 @@ def main():
     print(f"  Top-k values: {args.k}")
     print(f"  Temperature values: {args.temp}")
     print(f"  Chunk sizes: {args.chunk}")
+    print(f"  Workers: {args.workers}, search plan: {'max-k slice' if args.slice_k else 'per-k'}")
     
     # Load text data
     text_file = os.path.join(DATA_DIR, "text_chunks.txt")
@@ -198,76 +266,106 @@ def main():
     with open(text_file, "r", encoding="utf-8") as f:
         text = f.read()
     
-    # Prepare results file
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    results_file = os.path.join(RESULTS_DIR, f"grid_search_{timestamp}.csv")
+    cache = None if args.no_cache else EmbeddingCache(args.cache)
+    labels = load_labels(args.labels)[:args.sample]
+    questions = [label["query"] for label in labels]
     
-    # CSV headers as specified by mentor
-    fieldnames = ["run_id", "chunk", "k", "temp", "recall@5", "f1", "latency_ms", "cost_cents"]
+    # Prepare results file; completed cells are checkpointed next to it
+    if args.resume:
+        results_file = args.resume
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        results_file = os.path.join(RESULTS_DIR, f"grid_search_{timestamp}.csv")
+    checkpoint_file = os.path.splitext(results_file)[0] + ".checkpoint.jsonl"
+    done = load_checkpoint(checkpoint_file)
+    if done:
+        print(f"Resuming: {len(done)} completed cells in {checkpoint_file}")
     
-    with open(results_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+    start_time = time.time()
+    experiment_count = 0
+    error_count = 0
+    
+    # The CSV is rebuilt from the checkpoint, so failed cells of the previous run are retried
+    with open(results_file, "w", newline="", encoding="utf-8") as f, \
+         open(checkpoint_file, "a", encoding="utf-8") as ckpt:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
         writer.writeheader()
+        for row in done.values():
+            writer.writerow(row)
+        f.flush()
         
         # Run experiments for each chunk size
         for chunk_size in args.chunk:
-            print(f"\nProcessing chunk size: {chunk_size}")
+            cells = [(k, t, qi) for k, t, qi in itertools.product(args.k, args.temp, range(len(questions)))
+                     if cell_key(chunk_size, k, t, questions[qi]) not in done]
+            if not cells:
+                print(f"\nChunk size {chunk_size}: all cells completed, skipping")
+                continue
+            print(f"\nProcessing chunk size: {chunk_size} ({len(cells)} cells to run)")
             
             # Chunk the text
             chunks = chunk_text(text, chunk_size)
-            print(f"Created {len(chunks)} chunks")
+            relevant = resolve_relevant(labels, chunks)
+            print(f"Created {len(chunks)} chunks "
+                  f"({sum(1 for r in relevant if r)}/{len(questions)} questions have labelled chunks)")
             
-            # Get embeddings for chunks
-            print("Getting embeddings for chunks...")
-            chunk_embeddings = get_embeddings(chunks)
+            # One batched (cached) embedding pass for the chunks and one for the questions
+            print("Getting embeddings for chunks and questions...")
+            chunk_embeddings = get_embeddings(chunks, cache, args.embed_batch)
+            query_embeddings = get_embeddings(questions, cache, args.embed_batch)
             
-            # Create Faiss index
-            print("Creating Faiss index...")
+            # Create Faiss index and retrieve for every (question, k) up front
             faiss_index = create_faiss_index(chunk_embeddings)
+            plan = retrieval_plan(query_embeddings, faiss_index, args.k, args.slice_k)
+            quality = retrieval_quality(plan, relevant, args.k)
             
-            # Run experiments for all parameter combinations
-            total_experiments = len(args.k) * len(args.temp) * min(args.sample, len(TEST_QUESTIONS))
-            experiment_count = 0
-            
-            for top_k in args.k:
-                for temperature in args.temp:
-                    for question in TEST_QUESTIONS[:args.sample]:
-                        experiment_count += 1
-                        run_id = str(uuid.uuid4())[:8]
-                        
-                        print(f"Running experiment {experiment_count}/{total_experiments}: "
-                              f"k={top_k}, temp={temperature}, chunk={chunk_size}")
-                        
-                        try:
-                            result = run_single_experiment(
-                                run_id=run_id,
-                                chunk_size=chunk_size,
-                                top_k=top_k,
-                                temperature=temperature,
-                                question=question,
-                                chunks=chunks,
-                                chunk_embeddings=chunk_embeddings,
-                                faiss_index=faiss_index
-                            )
-                            writer.writerow(result)
-                            
-                        except Exception as e:
-                            print(f"Error in experiment: {e}")
-                            # Write error result
-                            error_result = {
-                                "run_id": run_id,
-                                "chunk": chunk_size,
-                                "k": top_k,
-                                "temp": temperature,
-                                "recall@5": 0.0,
-                                "f1": 0.0,
-                                "latency_ms": 0.0,
-                                "cost_cents": 0.0
-                            }
-                            writer.writerow(error_result)
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                futures = {}
+                for top_k, temperature, qi in cells:
+                    retrieved_chunks = [chunks[i] for i in plan[(qi, top_k)] if i >= 0]
+                    run_id = str(uuid.uuid4())[:8]
+                    future = pool.submit(run_single_experiment,
+                                         run_id=run_id,
+                                         chunk_size=chunk_size,
+                                         top_k=top_k,
+                                         temperature=temperature,
+                                         question=questions[qi],
+                                         retrieved_chunks=retrieved_chunks,
+                                         quality=quality[(qi, top_k)])
+                    futures[future] = (run_id, top_k, temperature, qi)
+                
+                for future in as_completed(futures):
+                    run_id, top_k, temperature, qi = futures[future]
+                    experiment_count += 1
+                    print(f"Completed experiment {experiment_count}: "
+                          f"k={top_k}, temp={temperature}, chunk={chunk_size}, question={qi}")
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Error in experiment: {e}")
+                        error_count += 1
+                        # Write error result (not checkpointed, so --resume retries it)
+                        writer.writerow({
+                            "run_id": run_id,
+                            "chunk": chunk_size,
+                            "k": top_k,
+                            "temp": temperature,
+                            **{name: 0.0 for name in QUALITY_FIELDS},
+                            "latency_ms": 0.0,
+                            "cost_cents": 0.0
+                        })
+                        continue
+                    ckpt.write(json.dumps({"cell": cell_key(chunk_size, top_k, temperature, questions[qi]),
+                                           "row": result}, ensure_ascii=False) + "\n")
+                    ckpt.flush()
+                    writer.writerow(result)
+                    f.flush()
     
     print(f"\nExperiments completed! Results saved to: {results_file}")
-    print(f"Total experiments run: {experiment_count}")
+    print(f"Total experiments run: {experiment_count} ({error_count} errors) "
+          f"in {time.time() - start_time:.1f}s")
+    if cache is not None:
+        print(f"Embedding cache: {cache.hits} hits, {cache.misses} misses ({args.cache})")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for /search, /search-stream, /upload and /add-text
+Starts experiments.fake_openai and the FastAPI app (uvicorn, in a temporary working directory with
+its own data/ and logs/) on local ports, seeds a few sessions,
+then drives open-loop traffic (Poisson arrivals at --rate req/s) with a weighted endpoint mix.
+Questions are synthetic or replayed in recorded order from chat/search log CSVs. Reports per
+endpoint: throughput, error rate and status codes, latency p50/p95/p99 and a histogram, and
+time-to-first-token for /search-stream. Latency is measured from the scheduled arrival time, so
+client-side queueing behind --concurrency is included (no coordinated omission).
+
+    python -m experiments.load_test --rate 10 --duration 60
+    python -m experiments.load_test --replay logs/chat_logs.csv logs/search_logs.csv --rate 20 --workers 2
+    python -m experiments.load_test --mix search=1 --error-rate 0.05 --llm-latency-ms 800
+    python -m experiments.load_test --target http://127.0.0.1:8000   # already running app, no fake server
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from experiments import fake_openai
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "experiments", "results")
+SEED_FILES = [os.path.join(BASE_DIR, "test_document.txt"), os.path.join(BASE_DIR, "test_story.txt")]
+ENDPOINTS = ("search", "search-stream", "upload", "add-text")
+BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+SYNTHETIC_QUESTIONS = [
+    "GPT가 왜 중요한 기술인가요?",
+    "딥러닝과 신경망의 차이는 무엇인가요?",
+    "생성형 AI의 활용 사례를 알려주세요.",
+    "주인공은 누구인가요?",
+    "Who coined the term 'artificial intelligence'?",
+    "What is the Turing Test?",
+    "How does machine learning work?",
+]
+
+
+def load_questions(paths: List[str]) -> List[str]:
+    """Questions in recorded order. Files with a header use the question/user_input column;
+    headerless chat logs (timestamp, user_input, system_role, temperature, reply) use column 1.
+    Consecutive duplicates (search logs have one row per rank) are collapsed."""
+    questions = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        if not rows:
+            continue
+        header = [h.strip().lower() for h in rows[0]]
+        column = next((header.index(name) for name in ("question", "user_input") if name in header), None)
+        if column is None:
+            column = 1
+        else:
+            rows = rows[1:]
+        for row in rows:
+            if len(row) > column and row[column].strip():
+                q = row[column].strip()
+                if not questions or questions[-1] != q:
+                    questions.append(q)
+    return questions
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint in --mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 60.0, proc: Optional[subprocess.Popen] = None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"process exited while starting ({url}), code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"timed out waiting for {url}")
+
+
+def start_servers(args, tmp: str):
+    """Start the fake OpenAI server and the app. Returns (app base url, fake base url, processes)."""
+    fake_port, app_port = free_port(), free_port()
+    fake_cmd = [sys.executable, "-m", "experiments.fake_openai", "--port", str(fake_port),
+                "--dim", str(args.dim), "--embed-latency-ms", str(args.embed_latency_ms),
+                "--llm-latency-ms", str(args.llm_latency_ms), "--tokens-per-s", str(args.tokens_per_s),
+                "--answer-tokens", str(args.answer_tokens), "--jitter", str(args.jitter),
+                "--error-rate", str(args.error_rate), "--error-status", str(args.error_status)]
+    fake = subprocess.Popen(fake_cmd, cwd=BASE_DIR)
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    wait_ready(fake_url + "/health", proc=fake)
+
+    # The app runs in its own working directory (relative data/, logs/ paths), so the fake
+    # embeddings never touch the real data/index.faiss, sessions, catalog or logs.
+    workdir = os.path.join(tmp, "app")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.makedirs(os.path.join(workdir, "logs"))
+    os.symlink(os.path.join(BASE_DIR, "static"), os.path.join(workdir, "static"))
+    shutil.copy(os.path.join(BASE_DIR, "data", "text_chunks.txt"), os.path.join(workdir, "data", "text_chunks.txt"))
+
+    unlimited = str(10 ** 9)
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(filter(None, [BASE_DIR, os.environ.get("PYTHONPATH")])),
+               OPENAI_API_KEY="fake", OPENAI_BASE_URL=fake_url + "/v1",
+               CATALOG_PATH=os.path.join(workdir, "data", "catalog.db"),
+               SEARCH_DAILY_LIMIT=unlimited, SEARCH_BURST_LIMIT=unlimited,
+               UPLOAD_DAILY_LIMIT=unlimited, UPLOAD_BURST_LIMIT=unlimited,
+               ADDTEXT_DAILY_LIMIT=unlimited, ADDTEXT_BURST_LIMIT=unlimited)
+    app_cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+               "--workers", str(args.workers), "--log-level", "warning"]
+    app = subprocess.Popen(app_cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+    app_url = f"http://127.0.0.1:{app_port}"
+    try:
+        wait_ready(app_url + "/ready", timeout=300, proc=app)  # the global index is embedded on start
+    except SystemExit:
+        stop([fake, app])
+        raise
+    return app_url, fake_url, [fake, app]
+
+
+def stop(procs):
+    for p in procs:
+        if p.poll() is None:
+            p.terminate()
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+class Recorder:
+    def __init__(self):
+        self.latency_ms: Dict[str, List[float]] = defaultdict(list)
+        self.ttft_ms: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, int] = Counter()
+
+    def record(self, endpoint: str, started: float, status: str, ok: bool, ttft: Optional[float] = None):
+        self.latency_ms[endpoint].append((time.perf_counter() - started) * 1000)
+        self.status[endpoint][status] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+        if ttft is not None:
+            self.ttft_ms[endpoint].append((ttft - started) * 1000)
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        out = {}
+        for endpoint in sorted(self.status):
+            lat = np.asarray(self.latency_ms[endpoint])
+            n = int(sum(self.status[endpoint].values()))
+            entry = {
+                "requests": n,
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / n, 4) if n else 0.0,
+                "status": dict(self.status[endpoint]),
+                "throughput_rps": round(n / elapsed, 2) if elapsed else 0.0,
+                "latency_ms": summarize(lat),
+                "histogram_ms": histogram(lat),
+            }
+            if self.ttft_ms.get(endpoint):
+                entry["ttft_ms"] = summarize(np.asarray(self.ttft_ms[endpoint]))
+            out[endpoint] = entry
+        return out
+
+
+def summarize(values: np.ndarray) -> dict:
+    if not len(values):
+        return {}
+    return {"mean": round(float(values.mean()), 1), "p50": round(float(np.percentile(values, 50)), 1),
+            "p95": round(float(np.percentile(values, 95)), 1), "p99": round(float(np.percentile(values, 99)), 1),
+            "max": round(float(values.max()), 1)}
+
+
+def histogram(values: np.ndarray) -> Dict[str, int]:
+    """Counts per upper bound ("<=100" ms); the last bucket is open-ended."""
+    counts = np.bincount(np.searchsorted(BUCKETS_MS, values, side="left"), minlength=len(BUCKETS_MS) + 1)
+    labels = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+    return {label: int(c) for label, c in zip(labels, counts)}
+
+
+class Traffic:
+    def __init__(self, args, base_url: str, sessions: List[str], questions: List[str], recorder: Recorder):
+        self.args = args
+        self.base_url = base_url
+        self.sessions = sessions
+        self.questions = questions
+        self.recorder = recorder
+        self.rng = random.Random(args.seed)
+        self.next_question = 0
+        self.documents = [open(p, encoding="utf-8").read() for p in SEED_FILES if os.path.exists(p)] or \
+            ["\n\n".join(SYNTHETIC_QUESTIONS)]
+
+    def question(self) -> str:
+        q = self.questions[self.next_question % len(self.questions)]
+        self.next_question += 1
+        return q
+
+    def document(self) -> str:
+        """A random slice of a seed document, so uploads add new (not near-duplicate) text."""
+        doc = self.rng.choice(self.documents)
+        start = self.rng.randrange(max(len(doc) - self.args.doc_chars, 1))
+        return f"[{uuid.uuid4().hex[:8]}]\n" + doc[start:start + self.args.doc_chars]
+
+    async def send(self, client: httpx.AsyncClient, endpoint: str, started: float):
+        sid = self.rng.choice(self.sessions)
+        headers = {"X-Session-Id": sid}
+        try:
+            if endpoint == "search":
+                r = await client.post("/search", headers=headers,
+                                      json={"question": self.question(), "top_k": self.args.top_k, "mode": self.args.mode})
+                self.recorder.record(endpoint, started, str(r.status_code), r.status_code == 200)
+            elif endpoint == "search-stream":
+                await self.stream(client, headers, started)
+            elif endpoint == "upload":
+                files = [("files", (f"load-{uuid.uuid4().hex[:8]}.txt", self.document().encode("utf-8"), "text/plain"))]
+                r = await client.post("/upload", files=files, data={"session_id": sid})
+                self.recorder.record(endpoint, started, str(r.status_code), r.status_code == 200)
+            else:
+                r = await client.post("/add-text", data={"title": f"load-{uuid.uuid4().hex[:8]}",
+                                                         "content": self.document(), "session_id": sid})
+                self.recorder.record(endpoint, started, str(r.status_code), r.status_code == 200)
+        except httpx.HTTPError as e:
+            self.recorder.record(endpoint, started, type(e).__name__, False)
+
+    async def stream(self, client: httpx.AsyncClient, headers: dict, started: float):
+        """/search-stream answers 200 and reports failures as SSE error events."""
+        ttft, ok, status = None, False, "no-done"
+        body = {"question": self.question(), "top_k": self.args.top_k, "mode": self.args.mode}
+        async with client.stream("POST", "/search-stream", headers=headers, json=body) as r:
+            if r.status_code != 200:
+                await r.aread()
+                self.recorder.record("search-stream", started, str(r.status_code), False)
+                return
+            async for line in r.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                kind = event.get("type")
+                if kind == "token" and ttft is None:
+                    ttft = time.perf_counter()
+                elif kind == "done":
+                    ok, status = True, "200"
+                elif kind == "error" or "error" in event:
+                    status = "stream-error"
+        self.recorder.record("search-stream", started, status, ok, ttft)
+
+    async def run(self, mix: Dict[str, float]) -> float:
+        names, weights = list(mix), list(mix.values())
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def one(endpoint: str, started: float):
+            async with semaphore:
+                await self.send(client, endpoint, started)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.args.timeout, limits=limits) as client:
+            tasks = []
+            t0 = time.perf_counter()
+            scheduled = t0
+            while scheduled - t0 < self.args.duration:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                endpoint = self.rng.choices(names, weights)[0]
+                tasks.append(asyncio.create_task(one(endpoint, scheduled)))
+                scheduled += self.rng.expovariate(self.args.rate)
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - t0
+
+
+def seed_sessions(base_url: str, n: int, run_id: str) -> List[str]:
+    sessions = [f"loadtest-{run_id}-{i}" for i in range(n)]
+    docs = [open(p, encoding="utf-8").read() for p in SEED_FILES if os.path.exists(p)]
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        for i, sid in enumerate(sessions):
+            content = docs[i % len(docs)] if docs else "\n\n".join(SYNTHETIC_QUESTIONS)
+            r = client.post("/add-text", data={"title": "seed", "content": content, "session_id": sid})
+            if r.status_code != 200:
+                raise SystemExit(f"seeding {sid} failed: {r.status_code} {r.text[:200]}")
+    return sessions
+
+
+def cleanup_sessions(base_url: str, sessions: List[str]):
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        for sid in sessions:
+            try:
+                client.delete("/session", headers={"X-Session-Id": sid})
+            except httpx.HTTPError:
+                pass
+
+
+def print_report(report: Dict[str, dict]):
+    print(f"{'endpoint':<14}{'req':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'ttft p50':>10}{'ttft p95':>10}")
+    for endpoint, e in report.items():
+        lat, ttft = e["latency_ms"], e.get("ttft_ms", {})
+        print(f"{endpoint:<14}{e['requests']:>7}{e['throughput_rps']:>8}{e['error_rate'] * 100:>7.1f}"
+              f"{lat.get('p50', 0):>9}{lat.get('p95', 0):>9}{lat.get('p99', 0):>9}"
+              f"{ttft.get('p50', '-'):>10}{ttft.get('p95', '-'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test with a fake OpenAI server")
+    parser.add_argument("--target", default=None, help="Base URL of a running app (skips starting servers)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started app")
+    parser.add_argument("--rate", type=float, default=5.0, help="Arrivals per second (Poisson)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic")
+    parser.add_argument("--concurrency", type=int, default=64, help="Max requests in flight")
+    parser.add_argument("--mix", default="search=6,search-stream=3,upload=0.5,add-text=0.5",
+                        help="Endpoint weights, e.g. search=1,search-stream=1")
+    parser.add_argument("--replay", nargs="*", default=None,
+                        help="Log CSVs to take questions from, in recorded order (default: synthetic questions)")
+    parser.add_argument("--sessions", type=int, default=4, help="Sessions seeded before the run")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--mode", default="vector", choices=["vector", "lexical", "hybrid"])
+    parser.add_argument("--doc-chars", type=int, default=2000, help="Characters per uploaded document")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-sessions", action="store_true", help="Do not delete the seeded sessions")
+    parser.add_argument("--out", default=None, help="JSON report path (default: experiments/results/load_test_<ts>.json)")
+    fake_openai.add_arguments(parser)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    questions = load_questions(args.replay) if args.replay else SYNTHETIC_QUESTIONS
+    if not questions:
+        raise SystemExit("no questions found in --replay files")
+
+    run_id = uuid.uuid4().hex[:6]
+    procs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.target:
+            base_url, fake_url = args.target.rstrip("/"), None
+        else:
+            base_url, fake_url, procs = start_servers(args, tmp)
+        try:
+            print(f"Seeding {args.sessions} sessions on {base_url} ...")
+            sessions = seed_sessions(base_url, args.sessions, run_id)
+            print(f"Running {args.duration:.0f}s at {args.rate} req/s, mix {mix}, "
+                  f"{len(questions)} {'replayed' if args.replay else 'synthetic'} questions")
+            recorder = Recorder()
+            elapsed = asyncio.run(Traffic(args, base_url, sessions, questions, recorder).run(mix))
+            report = {
+                "benchmark": "load_test",
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "params": {k: v for k, v in vars(args).items() if k != "out"},
+                "elapsed_s": round(elapsed, 2),
+                "endpoints": recorder.report(elapsed),
+            }
+            if fake_url:
+                report["fake_openai"] = httpx.get(fake_url + "/stats").json()
+            if not args.keep_sessions:
+                cleanup_sessions(base_url, sessions)
+        finally:
+            stop(procs)
+
+    print_report(report["endpoints"])
+    out = args.out or os.path.join(RESULTS_DIR, f"load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved: {out}")
+
+
+if __name__ == "__main__":
+    main()
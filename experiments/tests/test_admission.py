@@ -0,0 +1,121 @@
+import threading
+import time
+import types
+
+import pytest
+
+from utils.admission import AdmissionController, CircuitOpen, Overloaded
+from utils.embedders import OpenAIEmbedder
+from utils.resilient_call import ResilientCaller, is_retryable
+
+
+class _Status(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _raises(exc):
+    def fn():
+        raise exc
+    return fn
+
+
+def test_limit_halves_on_overload_and_grows_when_busy():
+    ctl = AdmissionController("test", initial_limit=8, failure_threshold=100)
+    with pytest.raises(_Status):
+        ctl.call("interactive", _raises(_Status(429)))
+    assert ctl.limit == 4
+    with pytest.raises(_Status):
+        ctl.call("interactive", _raises(_Status(400)))  # 요청 오류는 한도에 영향이 없다
+    assert ctl.limit == 4
+
+    ctl = AdmissionController("test", initial_limit=1)
+    ctl.call("interactive", lambda: "ok")
+    assert ctl.limit == 2 and ctl.stats()["limit_increases"] == 1
+
+
+def test_circuit_opens_fails_fast_and_closes_after_probe():
+    ctl = AdmissionController("test", failure_threshold=3, open_seconds=0.05)
+    for _ in range(3):
+        with pytest.raises(_Status):
+            ctl.call("interactive", _raises(_Status(503)))
+    assert ctl.stats()["circuit"] == "open"
+
+    called = []
+    with pytest.raises(CircuitOpen) as e:
+        ctl.call("interactive", lambda: called.append(1))
+    assert not called and not is_retryable(e.value)  # 호출하지 않고, 재시도 대상도 아니다
+
+    time.sleep(0.06)
+    assert ctl.call("interactive", lambda: "probe") == "probe"
+    stats = ctl.stats()
+    assert stats["circuit"] == "closed" and stats["trips"] == 0
+
+
+def test_waiting_interactive_call_goes_before_bulk():
+    ctl = AdmissionController("test", initial_limit=1, max_limit=1)
+    release = threading.Event()
+    holder = threading.Thread(target=ctl.call, args=("interactive", lambda: release.wait(5)))
+    holder.start()
+    while ctl.stats()["inflight"]["interactive"] == 0:
+        time.sleep(0.001)
+
+    order = []
+    bulk = threading.Thread(target=ctl.call, args=("bulk", lambda: order.append("bulk")))
+    bulk.start()
+    while ctl.stats()["waiting"]["bulk"] == 0:
+        time.sleep(0.001)
+    interactive = threading.Thread(target=ctl.call, args=("interactive", lambda: order.append("interactive")))
+    interactive.start()
+    while ctl.stats()["waiting"]["interactive"] == 0:
+        time.sleep(0.001)
+
+    release.set()
+    for t in (holder, bulk, interactive):
+        t.join(5)
+    assert order == ["interactive", "bulk"]
+
+
+def test_request_budget_rejects_when_exhausted():
+    ctl = AdmissionController("test", rpm=2, reserve=0.5, queue_timeout={"interactive": 0.05, "bulk": 0.05})
+    ctl.call("bulk", lambda: "a")
+    with pytest.raises(Overloaded):
+        ctl.call("bulk", lambda: "b")  # 남은 1개는 interactive 몫
+    assert ctl.call("interactive", lambda: "c") == "c"
+    with pytest.raises(Overloaded) as e:
+        ctl.call("interactive", lambda: "d")
+    assert e.value.retry_after >= 1.0
+    assert ctl.stats()["lanes"]["bulk"]["overloaded"] == 1
+
+
+def test_embedding_call_takes_one_slot_for_all_its_attempts():
+    sent = []
+
+    class _Embeddings:
+        def create(self, input, model, timeout=None):
+            sent.append(input)
+            if len(sent) < 3:
+                raise _Status(503)
+            return types.SimpleNamespace(data=[types.SimpleNamespace(index=0, embedding=[1.0, 0.0])])
+
+    client = types.SimpleNamespace(embeddings=_Embeddings(), with_options=lambda **kw: client)
+    caller = ResilientCaller(timeout=1.0, max_retries=2, backoff_base=0.001, backoff_max=0.002, hedge=False)
+    ctl = AdmissionController("test", initial_limit=1, max_limit=1, failure_threshold=100,
+                              queue_timeout={"interactive": 0.05, "bulk": 0.05})
+    embedder = OpenAIEmbedder(lambda: client, "m", caller=caller, admission=ctl)
+
+    release = threading.Event()
+    holder = threading.Thread(target=ctl.call, args=("interactive", lambda: release.wait(5)))
+    holder.start()
+    while ctl.stats()["inflight"]["interactive"] == 0:
+        time.sleep(0.001)
+    with pytest.raises(Overloaded):
+        embedder.embed_text("q")  # 자리를 못 얻은 호출은 요청을 보내지 않는다
+    release.set()
+    holder.join(5)
+    time.sleep(0.05)
+    assert sent == []
+
+    assert embedder.embed_text("q").shape == (1, 2)
+    assert len(sent) == 3 and ctl.stats()["lanes"]["interactive"]["admitted"] == 2  # 재시도 두 번도 자리 하나
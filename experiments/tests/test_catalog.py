@@ -0,0 +1,55 @@
+import json
+import threading
+
+from utils.catalog import Catalog
+
+
+def _entry(name, chunks=1):
+    return {"name": name, "size": 10, "chunks": chunks, "uploaded_at": "2025-01-01T00:00:00"}
+
+
+def test_concurrent_appends_are_not_lost(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+
+    def worker(n):
+        for i in range(20):
+            catalog.add_files("s1", [_entry(f"w{n}-{i}.txt", chunks=2)])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    session = catalog.get_session("s1")
+    assert session["file_count"] == 160 and session["chunk_count"] == 320
+
+
+def test_pagination_and_delete(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+    catalog.add_files("s1", [_entry(f"f{i}.txt") for i in range(5)])
+    catalog.add_files("s2", [_entry("other.txt")])
+
+    page, cursor = catalog.list_files("s1", limit=2)
+    names = [f["name"] for f in page]
+    while cursor is not None:
+        page, cursor = catalog.list_files("s1", limit=2, cursor=cursor)
+        names += [f["name"] for f in page]
+    assert names == [f"f{i}.txt" for i in range(5)]
+
+    assert catalog.delete_file("s1", "f3.txt") == 1
+    assert catalog.get_session("s1")["file_count"] == 4
+    catalog.delete_session("s1")
+    assert catalog.list_files("s1")[0] == [] and catalog.get_session("s2")["file_count"] == 1
+
+
+def test_migrates_files_json_once(tmp_path):
+    legacy = tmp_path / "files.json"
+    legacy.write_text(json.dumps([_entry("a.txt"), dict(_entry("b.txt"), type="text_input")]), encoding="utf-8")
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+    assert catalog.migrate_json("s1", str(legacy)) == 2
+    assert not legacy.exists() and (tmp_path / "files.json.migrated").exists()
+
+    again = Catalog(str(tmp_path / "catalog.db"))
+    assert again.migrate_json("s1", str(legacy)) == 0
+    files, _ = again.list_files("s1")
+    assert [f["name"] for f in files] == ["a.txt", "b.txt"] and files[1]["type"] == "text_input"
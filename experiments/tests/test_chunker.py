@@ -0,0 +1,58 @@
+import os
+import random
+
+import pytest
+
+from utils.chunker import TextChunker
+
+splitters = pytest.importorskip("langchain_text_splitters")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+PARAMS = [(512, 100), (256, 64), (100, 20), (30, 29)]
+
+
+def _texts():
+    texts = []
+    for name in ["test_document.txt", "test_story.txt", os.path.join("data", "text_chunks.txt")]:
+        with open(os.path.join(BASE_DIR, name), encoding="utf-8") as f:
+            texts.append(f.read())
+    rng = random.Random(0)
+    alphabet = ["가", "나", "a", " ", "\n", ". ", "\n\n", "xxxxx"]
+    texts += ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 600))) for _ in range(50)]
+    return texts
+
+
+def _reference(text, chunk_size, chunk_overlap):
+    return splitters.RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len, separators=SEPARATORS
+    ).split_text(text)
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", PARAMS)
+def test_character_mode_matches_recursive_splitter(chunk_size, chunk_overlap):
+    chunker = TextChunker(chunk_size, chunk_overlap, SEPARATORS)
+    for text in _texts():
+        assert chunker.split_text(text) == _reference(text, chunk_size, chunk_overlap)
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", PARAMS)
+def test_streaming_matches_batch(chunk_size, chunk_overlap):
+    chunker = TextChunker(chunk_size, chunk_overlap, SEPARATORS)
+    rng = random.Random(1)
+    for text in _texts():
+        pieces, i = [], 0
+        while i < len(text):
+            n = rng.randint(1, 40)
+            pieces.append(text[i:i + n])
+            i += n
+        assert list(chunker.iter_chunks(pieces)) == chunker.split_text(text)
+
+
+def test_token_mode_respects_budget():
+    words = lambda s: len(s.split())
+    chunker = TextChunker(20, 5, SEPARATORS, length_function=words)
+    text = " ".join(f"단어{i}" for i in range(200))
+    chunks = chunker.split_text(text)
+    assert all(words(c) <= 20 for c in chunks)
+    assert len(chunks) > 10
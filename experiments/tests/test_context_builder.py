@@ -0,0 +1,26 @@
+from utils import context_builder
+from utils.tokens import estimate_tokens
+
+TEXT = " ".join(f"{i}번째 문장은 서로 다른 내용을 담고 있다." for i in range(30))
+
+
+def test_adjacent_overlapping_chunks_are_merged():
+    chunks = [TEXT[:150], TEXT[100:250], "전혀 다른 문단입니다."]
+    meta = [{"source": "a.txt"}, {"source": "a.txt"}, {"source": "b.txt"}]
+    items, stats = context_builder.build_context(
+        [(1, 0.9), (0, 0.8), (2, 0.5)], chunks, estimate_tokens, budget=10_000, meta=meta
+    )
+    assert items[0]["ids"] == [0, 1]
+    assert items[0]["text"] == TEXT[:250]
+    assert stats["chunks_merged"] == 1
+    assert stats["tokens_saved"] > 0
+
+
+def test_duplicates_dropped_and_budget_respected():
+    chunks = ["고양이는 귀엽고 강아지는 충직하다.", "고양이는 귀엽고 강아지는 충직하다!", "파이썬은 프로그래밍 언어다." * 10]
+    items, stats = context_builder.build_context(
+        [(0, 0.9), (2, 0.8), (1, 0.7)], chunks, estimate_tokens, budget=40
+    )
+    assert [it["ids"] for it in items] == [[0]]
+    assert stats["duplicates_dropped"] == 1
+    assert stats["tokens_used"] <= 40
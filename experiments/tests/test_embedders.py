@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+from experiments.fake_openai import FakeSettings, create_app
+from utils.embedders import OpenAIEmbedder, embedding_record, incompatibility, make_embedder
+
+
+def test_openai_backend_batches_in_order_and_learns_dimension():
+    settings = FakeSettings(dim=24, embed_latency_ms=0, llm_latency_ms=0)
+    http = TestClient(create_app(settings), base_url="http://fake")
+    client = OpenAI(api_key="fake", base_url="http://fake/v1", http_client=http, max_retries=0)
+    e = OpenAIEmbedder(lambda: client, "text-embedding-3-small", batch_size=2)
+    assert e.name == "openai:text-embedding-3-small" and e.dim is None
+
+    texts = ["가나다", "라마바", "사아자", "차카타", "파하"]
+    vecs = e.embed_texts(texts)
+    assert vecs.shape == (5, 24) and e.dim == 24
+    assert settings.stats["embeddings"] == 3  # 2 + 2 + 1
+    assert np.allclose(vecs[3], e.embed_text("차카타")[0], atol=1e-6)  # 배치를 나눠도 순서가 맞다
+
+
+def test_hash_backend_and_records():
+    e = make_embedder("hash", dim=32)
+    assert e.name == "hash:32" and e.embed_texts(["a b", "c"]).shape == (2, 32)
+    record = embedding_record(e)
+    assert record == {"backend": "hash:32", "dim": 32}
+
+    assert incompatibility(record, e) is None
+    assert incompatibility(None, e, index_dim=32) is None      # 기록 없는 예전 인덱스: 차원만 본다
+    assert "차원" in incompatibility(None, e, index_dim=1536)
+    assert "백엔드" in incompatibility({"backend": "openai:text-embedding-3-small", "dim": 32}, e)
+    with pytest.raises(ValueError):
+        make_embedder("word2vec")
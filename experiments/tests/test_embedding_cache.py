@@ -0,0 +1,36 @@
+import numpy as np
+
+from utils.embedding_cache import EmbeddingCache
+
+
+class FakeEmbedder:
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), i, 0, 1][:self.dim] for i, t in enumerate(texts)], dtype="float32")
+
+
+def test_only_missing_texts_are_embedded_in_batches(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    embed = FakeEmbedder()
+    first = cache.embed_cached("m", ["a", "bb", "a", "ccc"], embed, batch_size=2)
+    assert embed.batches == [["a", "bb"], ["ccc"]]  # 중복 제거 후 배치 단위
+    assert first.shape == (4, 4) and np.array_equal(first[0], first[2])
+
+    second = cache.embed_cached("m", ["ccc", "dddd", "a"], embed, batch_size=2)
+    assert embed.batches[-1] == ["dddd"]
+    assert np.array_equal(second[0], first[3]) and np.array_equal(second[2], first[0])
+
+
+def test_cache_persists_and_is_keyed_by_model(tmp_path):
+    path = str(tmp_path / "cache.db")
+    EmbeddingCache(path).embed_cached("m", ["x", "y"], FakeEmbedder())
+    cache = EmbeddingCache(path)
+    embed = FakeEmbedder()
+    cache.embed_cached("m", ["x", "y"], embed)
+    assert embed.batches == [] and cache.hits == 2
+    cache.embed_cached("other", ["x"], embed)
+    assert embed.batches == [["x"]]
@@ -0,0 +1,49 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+from experiments.fake_openai import FakeSettings, create_app
+from experiments.load_test import histogram, load_questions
+
+
+def _client(**settings):
+    settings = FakeSettings(dim=16, embed_latency_ms=0, llm_latency_ms=0, tokens_per_s=0, answer_tokens=5, **settings)
+    http = TestClient(create_app(settings), base_url="http://fake")
+    return OpenAI(api_key="fake", base_url="http://fake/v1", http_client=http, max_retries=0), settings
+
+
+def test_openai_client_round_trip():
+    client, settings = _client()
+    data = client.embeddings.create(input=["가나다", "abc"], model="m").data  # 기본 base64 인코딩
+    vecs = np.asarray([d.embedding for d in data], dtype="float32")
+    assert vecs.shape == (2, 16) and np.allclose(np.linalg.norm(vecs, axis=1), 1.0)
+    same = client.embeddings.create(input="가나다", model="m", encoding_format="float").data[0].embedding
+    assert np.allclose(same, vecs[0])
+
+    answer = client.chat.completions.create(model="m", messages=[{"role": "user", "content": "q"}])
+    assert len(answer.choices[0].message.content.split()) == 5
+    stream = client.chat.completions.create(model="m", messages=[{"role": "user", "content": "q"}], stream=True)
+    tokens = [c.choices[0].delta.content for c in stream if c.choices[0].delta.content]
+    assert len(tokens) == 5
+    assert settings.stats["chat"] == 1 and settings.stats["chat_stream"] == 1
+
+
+def test_error_injection():
+    client, settings = _client(error_rate=1.0, error_status=503)
+    try:
+        client.embeddings.create(input="x", model="m")
+    except Exception as e:
+        assert getattr(e, "status_code", None) == 503
+    else:
+        raise AssertionError("expected an injected error")
+    assert settings.stats["injected_errors"] == 1
+
+
+def test_replay_questions_and_histogram(tmp_path):
+    chat = tmp_path / "chat.csv"
+    chat.write_text('t1,첫 질문,sys,0.2,"여러 줄\n답변"\nt2,첫 질문,sys,0.5,a\nt3,둘째,sys,0.2,b\n', encoding="utf-8")
+    search = tmp_path / "search.csv"
+    search.write_text("timestamp,question,rank\nt,셋째,1\nt,셋째,2\n", encoding="utf-8")
+    assert load_questions([str(chat), str(search)]) == ["첫 질문", "둘째", "셋째"]
+    counts = histogram(np.array([5, 10, 11, 40000]))
+    assert counts["<=10"] == 2 and counts["<=25"] == 1 and counts[">30000"] == 1
@@ -0,0 +1,33 @@
+import numpy as np
+
+from utils import full_vectors
+
+
+def test_truncate_keeps_prefix_and_renormalizes():
+    v = np.array([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]], dtype="float32")
+    out = full_vectors.truncate(v, 2)
+    assert out.shape == (2, 2)
+    assert np.allclose(out[0], [0.6, 0.8])
+    assert np.allclose(out[1], [0.0, 0.0])  # 앞 차원이 모두 0이면 그대로 둔다
+    assert full_vectors.truncate(v[0], 2).shape == (2,)
+
+
+def test_rows_written_at_chunk_ids_and_rerank_recovers_exact_order(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((30, 16)).astype("float32")
+    path = full_vectors.path_for(str(tmp_path / "index.faiss"))
+    full_vectors.write_rows(path, 0, vectors[:20])
+    full_vectors.write_rows(path, 25, rng.standard_normal((5, 16)).astype("float32"))  # 커밋되지 않은 꼬리
+    full_vectors.write_rows(path, 20, vectors[20:])  # 다음 쓰기가 같은 자리를 덮어쓴다
+
+    rows = full_vectors.open_rows(path, 30, 16)
+    assert np.array_equal(rows, vectors)
+    assert full_vectors.open_rows(path, 10, 16).shape == (10, 16)
+
+    query = rng.standard_normal(16).astype("float32")
+    candidates = [29, 3, 3, 17, -1, 40, 8]  # 중복, FAISS의 -1, 범위 밖 id는 무시된다
+    hits = full_vectors.rerank(query, candidates, rows)
+    scores = vectors[[3, 8, 17, 29]] @ query
+    expected = [int(i) for i in np.array([3, 8, 17, 29])[np.argsort(-scores)]]
+    assert [i for i, _ in hits] == expected
+    assert np.isclose(hits[0][1], scores.max())
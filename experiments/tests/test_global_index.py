@@ -0,0 +1,81 @@
+import json
+import zlib
+
+import numpy as np
+
+from utils.global_index import GlobalIndex
+
+
+class CountingEmbedder:
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for i, t in enumerate(texts):
+            out[i, zlib.crc32(t.encode("utf-8")) % self.dim] = 1.0
+        return out
+
+
+def _make(tmp_path, embed, backend=None):
+    return GlobalIndex(str(tmp_path / "index.faiss"), str(tmp_path / "text_chunks.txt"),
+                       str(tmp_path / "chunk_meta.jsonl"), embed, batch_size=2, backend=backend)
+
+
+def _write_chunks(tmp_path, chunks):
+    (tmp_path / "text_chunks.txt").write_text("".join(c + "\n\n" for c in chunks), encoding="utf-8")
+
+
+def test_rebuild_reembeds_only_changed_chunks(tmp_path):
+    embed = CountingEmbedder()
+    _write_chunks(tmp_path, ["첫 번째 문단", "두 번째 문단", "세 번째 문단"])
+    g = _make(tmp_path, embed)
+    g.refresh()
+    assert g.status["embedded"] == 3 and g.snapshot[0].ntotal == 3
+
+    _write_chunks(tmp_path, ["첫 번째 문단", "바뀐 문단", "세 번째 문단", "새 문단"])
+    embed.calls.clear()
+    g2 = _make(tmp_path, embed)
+    g2.refresh()
+    assert sorted(t for batch in embed.calls for t in batch) == ["바뀐 문단", "새 문단"]
+    assert g2.status["reused"] == 2
+    index, chunks = g2.snapshot
+    assert chunks[1] == "바뀐 문단" and index.ntotal == 4
+    D, I = index.search(embed(["새 문단"]), 1)
+    assert I[0][0] == 3
+
+
+def test_background_build_and_readiness(tmp_path):
+    _write_chunks(tmp_path, ["가나다", "라마바"])
+    g = _make(tmp_path, CountingEmbedder())
+    assert not g.ready
+    assert g.get() is None  # idle이면 구축을 시작하고 바로 반환
+    g._thread.join(timeout=10)
+    assert g.ready and g.status["state"] == "ready"
+    assert g.get()[0].ntotal == 2
+
+
+def test_missing_text_is_empty_not_failed(tmp_path):
+    g = _make(tmp_path, CountingEmbedder())
+    g.refresh()
+    assert g.status["state"] == "empty" and g.ready
+
+
+def test_backend_change_reembeds_everything(tmp_path):
+    _write_chunks(tmp_path, ["가나다", "라마바", "사아자"])
+    g = _make(tmp_path, CountingEmbedder(dim=16), backend=lambda: "a")
+    g.refresh()
+    assert json.loads((tmp_path / "embedding.json").read_text()) == {"backend": "a", "dim": 16}
+
+    same = CountingEmbedder(dim=16)
+    _make(tmp_path, same, backend=lambda: "a").refresh()
+    assert same.calls == []  # 같은 백엔드는 전부 재사용
+
+    other = CountingEmbedder(dim=8)
+    g2 = _make(tmp_path, other, backend=lambda: "b")
+    g2.refresh()
+    assert sum(len(b) for b in other.calls) == 3 and g2.status["reused"] == 0
+    assert g2.snapshot[0].d == 8
+    assert json.loads((tmp_path / "embedding.json").read_text()) == {"backend": "b", "dim": 8}
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from utils.group_commit import GroupCommitter
+
+
+def test_concurrent_submits_share_one_batch():
+    batches = []
+
+    def apply(key, items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    committer = GroupCommitter(apply, window_seconds=0.2)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, committer.submit("s", i))) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {i: i * 10 for i in range(5)}
+    assert len(batches) == 1 and sorted(batches[0]) == list(range(5))
+    assert committer.stats == {"requests": 5, "batches": 1, "max_batch": 5}
+
+
+def test_requests_during_apply_form_the_next_batch():
+    release = threading.Event()
+    batches = []
+
+    applying = threading.Event()
+
+    def apply(key, items):
+        batches.append(list(items))
+        if items == ["first"]:
+            applying.set()
+            release.wait(5)
+        return items
+
+    committer = GroupCommitter(apply, window_seconds=0)
+    first = threading.Thread(target=committer.submit, args=("s", "first"))
+    first.start()
+    assert applying.wait(5)
+    others = [threading.Thread(target=committer.submit, args=("s", n)) for n in ("a", "b")]
+    for t in others:
+        t.start()
+    deadline = time.monotonic() + 5
+    while len(committer._queues.get("s", [])) < 2:
+        assert time.monotonic() < deadline, "다음 배치에 요청이 쌓이지 않았습니다"
+        time.sleep(0.001)
+    release.set()
+    for t in [first] + others:
+        t.join()
+    assert batches[0] == ["first"] and sorted(batches[1]) == ["a", "b"]
+
+
+def test_batch_failure_reaches_every_request():
+    def apply(key, items):
+        raise ValueError("disk full")
+
+    committer = GroupCommitter(apply, window_seconds=0)
+    with pytest.raises(ValueError):
+        committer.submit("s", 1)
+    # 실패 후에도 다음 요청은 새 리더로 처리된다
+    committer.apply_batch = lambda key, items: items
+    assert committer.submit("s", 2) == 2
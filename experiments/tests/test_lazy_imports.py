@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+from experiments.bench_import import BASE_DIR, LAZY_MODULES
+
+
+def test_main_does_not_import_heavy_dependencies():
+    probe = f"import sys, main; print([m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "x"))
+    out = subprocess.run([sys.executable, "-c", probe], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,40 @@
+from utils import lexical_index
+
+CHUNKS = [
+    "인공지능은 인간의 지능을 모방하는 기술이다.",
+    "고양이는 귀엽다.",
+    "파이썬은 프로그래밍 언어다.",
+    "GPT는 대규모 언어 모델이다.",
+]
+
+
+def test_korean_query_hits_expected_chunk():
+    idx = lexical_index.build(CHUNKS)
+    hits = idx.search("프로그래밍 언어 파이썬", top_k=2)
+    assert hits[0][0] == 2
+
+
+def test_incremental_segments_match_full_build(tmp_path):
+    path = tmp_path / "lexical.idx"
+    with open(path, "ab") as f:
+        f.write(lexical_index.encode_documents(CHUNKS[:2], 0))
+    with open(path, "ab") as f:
+        f.write(lexical_index.encode_documents(CHUNKS[2:], 2))
+
+    assert lexical_index.scan_file(str(path)) == (4, 2)
+    loaded = lexical_index.LexicalIndex.load(str(path))
+    full = lexical_index.build(CHUNKS)
+    assert loaded.search("언어 모델", 4) == full.search("언어 모델", 4)
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    path = tmp_path / "lexical.idx"
+    data = lexical_index.encode_documents(CHUNKS[:2], 0) + lexical_index.encode_documents(CHUNKS[2:], 2)[:-3]
+    path.write_bytes(data)
+    assert lexical_index.scan_file(str(path)) == (2, 1)
+    assert lexical_index.LexicalIndex.load(str(path)).n_docs == 2
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    fused = lexical_index.reciprocal_rank_fusion([[1, 2, 3], [2, 1, 4]], top_k=2)
+    assert {doc for doc, _ in fused} == {1, 2}
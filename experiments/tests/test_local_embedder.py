@@ -0,0 +1,20 @@
+import numpy as np
+
+from utils.local_embedder import HashingEmbedder
+
+
+def test_deterministic_normalized_and_shaped_like_embed_text():
+    texts = ["인공지능은 인간의 지능을 모방하는 기술이다.", "고양이는 귀엽다.", ""]
+    a = HashingEmbedder(dim=64).embed_texts(texts)
+    b = HashingEmbedder(dim=64).embed_texts(texts)  # 새 인스턴스(새 프로세스와 같은 조건)에서도 같은 값
+    assert a.shape == (3, 64) and a.dtype == np.float32
+    assert np.array_equal(a, b)
+    assert np.allclose(np.linalg.norm(a[:2], axis=1), 1.0) and not a[2].any()
+    assert HashingEmbedder(dim=64).embed_text(texts[0]).shape == (1, 64)
+
+
+def test_shared_vocabulary_scores_higher():
+    e = HashingEmbedder()
+    docs = e.embed_texts(["GPT는 대규모 언어 모델이다", "고양이는 귀엽다"])
+    q = e.embed_text("GPT가 뭐야")[0]
+    assert docs[0] @ q > docs[1] @ q
@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.micro_batch import MicroBatcher
+
+
+def test_concurrent_calls_share_batches_and_get_their_own_results():
+    batches = []
+
+    def run(items):
+        batches.append(list(items))
+        time.sleep(0.02)  # 원격 호출
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(run, window_seconds=0.05, max_items=8)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(batcher.submit, range(20)))
+    assert results == [i * 10 for i in range(20)]
+    assert sorted(i for b in batches for i in b) == list(range(20))
+    assert len(batches) < 20 and max(len(b) for b in batches) <= 8
+    assert batcher.stats["requests"] == 20 and batcher.stats["batches"] == len(batches)
+
+
+def test_idle_call_does_not_wait_for_the_window():
+    batcher = MicroBatcher(lambda items: items, window_seconds=1.0)
+    t0 = time.perf_counter()
+    assert batcher.submit("a") == "a"
+    assert time.perf_counter() - t0 < 0.5 and batcher.stats["waited_batches"] == 0
+
+
+def test_batch_error_reaches_every_caller():
+    def run(items):
+        time.sleep(0.02)
+        raise RuntimeError("upstream")
+
+    batcher = MicroBatcher(run, window_seconds=0.05)
+    errors = []
+
+    def submit(item):
+        try:
+            batcher.submit(item)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert errors == ["upstream"] * 5
+    with pytest.raises(RuntimeError):
+        batcher.submit("again")
@@ -0,0 +1,27 @@
+import numpy as np
+
+from utils import mmr
+
+
+def test_near_copies_are_skipped_for_a_different_relevant_chunk():
+    query = np.array([1.0, 0.0, 0.0], dtype="float32")
+    candidates = np.array([[0.95, 0.31, 0.0],    # 가장 관련 있음
+                           [0.94, 0.34, 0.0],    # 0번과 거의 같은 청크 (겹침)
+                           [0.80, 0.0, 0.60],    # 덜 관련 있지만 다른 내용
+                           [0.0, 1.0, 0.0]], dtype="float32")
+    assert mmr.select(query, candidates, 2, lambda_=0.5) == [0, 2]
+    assert mmr.select(query, candidates, 2, lambda_=1.0) == [0, 1]  # λ=1이면 관련성 순서 그대로
+    assert sorted(mmr.select(query, candidates, 10)) == [0, 1, 2, 3]  # 후보보다 많이 달라고 하면 전부
+    assert mmr.select(query, candidates[:0], 3) == []
+
+
+def test_diversify_keeps_original_hits_and_scores():
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal((5, 32)).astype("float32")
+    vectors = np.repeat(base, 3, axis=0) + 0.01 * rng.standard_normal((15, 32)).astype("float32")  # 같은 내용 3벌씩
+    hits = [(100 + i, float(s)) for i, s in enumerate(np.linspace(1.0, 0.5, 15))]
+    query = base.sum(axis=0)  # 다섯 내용 모두와 비슷한 질문
+    picked = mmr.diversify(query, hits, vectors, 5, lambda_=0.5)
+    assert picked[0] == hits[0]
+    assert len({(idx - 100) // 3 for idx, _ in picked}) == 5  # 다섯 벌에서 하나씩
+    assert all(h in hits for h in picked)
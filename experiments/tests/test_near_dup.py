@@ -0,0 +1,29 @@
+from utils import near_dup
+
+BASE = "VectorMind는 문서를 벡터로 변환하여 저장하고, 질문과 가장 관련성 높은 내용을 찾아 GPT가 답변을 생성합니다."
+
+
+def test_near_duplicate_is_linked_to_existing_chunk():
+    idx = near_dup.build([BASE, "고양이는 귀엽다. 강아지는 충직하다."])
+    keep, _, duplicates = near_dup.filter_duplicates(
+        idx, [BASE + " ", "파이썬은 프로그래밍 언어다."], threshold=0.9
+    )
+    assert keep == [1]
+    assert duplicates[0][:2] == (0, 0)
+
+
+def test_signatures_round_trip_and_reject_other_params():
+    idx = near_dup.build([BASE, "다른 문단"])
+    data = idx.to_bytes()
+    loaded = near_dup.NearDupIndex.from_bytes(data)
+    assert len(loaded) == 2
+    assert loaded.query(loaded.signature(BASE), 0.99)[0] == 0
+    assert near_dup.NearDupIndex.from_bytes(data, num_perm=64, bands=8) is None
+    # 잘린 꼬리 레코드는 버린다
+    assert len(near_dup.NearDupIndex.from_bytes(data[:-5])) == 1
+
+
+def test_excluded_chunks_are_not_duplicates():
+    idx = near_dup.build([BASE])
+    keep, _, duplicates = near_dup.filter_duplicates(idx, [BASE], threshold=0.9, exclude={0})
+    assert keep == [0] and duplicates == []
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from utils.resilient_call import CallFailed, ResilientCaller, is_retryable
+
+
+class _Status(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _raises(exc):
+    def fn(timeout):
+        raise exc
+    return fn
+
+
+def _caller(**kw):
+    defaults = dict(timeout=1.0, max_retries=2, backoff_base=0.001, backoff_max=0.002, hedge=False)
+    return ResilientCaller(**{**defaults, **kw})
+
+
+def test_retryable_errors_are_retried_and_others_fail_fast():
+    assert is_retryable(_Status(429)) and is_retryable(_Status(503)) and is_retryable(TimeoutError())
+    assert not is_retryable(_Status(400)) and not is_retryable(ValueError())
+
+    calls = []
+
+    def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise _Status(502)
+        return "ok"
+
+    caller = _caller()
+    assert caller.call(flaky) == "ok" and calls == [1.0, 1.0, 1.0]
+    stats = caller.stats()
+    assert stats["attempts"]["primary"]["retryable_error"] == 1 and stats["attempts"]["retry"]["count"] == 2
+
+    with pytest.raises(CallFailed) as e:
+        caller.call(_raises(_Status(400)))
+    assert not e.value.retryable and caller.stats()["attempts"]["retry"]["count"] == 2  # 400은 재시도하지 않는다
+
+    with pytest.raises(CallFailed) as e:
+        _caller(max_retries=1).call(_raises(_Status(500)))
+    assert e.value.retryable
+
+
+def test_attempt_timeout_does_not_wait_for_a_hung_call():
+    release = threading.Event()
+    caller = _caller(timeout=0.05, max_retries=0)
+    t0 = time.perf_counter()
+    with pytest.raises(CallFailed) as e:
+        caller.call(lambda timeout: release.wait(5))
+    assert time.perf_counter() - t0 < 1.0 and e.value.retryable
+    release.set()
+
+
+def test_hedge_fires_after_delay_and_first_response_wins():
+    started = []
+
+    def slow_first(timeout):
+        started.append(time.perf_counter())
+        time.sleep(0.5 if len(started) == 1 else 0.01)
+        return len(started)
+
+    caller = _caller(hedge=True, hedge_initial_delay=0.02)
+    t0 = time.perf_counter()
+    assert caller.call(slow_first, hedge=True) == 2
+    assert time.perf_counter() - t0 < 0.3
+    stats = caller.stats()
+    assert stats["hedge_wins"] == 1 and stats["attempts"]["hedge"]["count"] == 1
+    assert caller.call(lambda timeout: "fast", hedge=True) == "fast"
+    assert caller.stats()["attempts"]["hedge"]["count"] == 1  # 빠른 호출은 헤지하지 않는다
+
+
+def test_budget_caps_extra_attempts():
+    caller = _caller(hedge=True, hedge_initial_delay=0.001, budget_ratio=0.0, budget_burst=1.0)
+    caller.call(lambda timeout: time.sleep(0.02) or "a", hedge=True)  # 예산 1개를 헤지에 쓴다
+    with pytest.raises(CallFailed):
+        caller.call(_raises(_Status(503)))  # 재시도할 예산이 없다
+    stats = caller.stats()
+    assert stats["attempts"]["hedge"]["count"] == 1 and stats["retries_skipped_budget"] == 1
+    assert stats["attempts"]["retry"]["count"] == 0 and stats["failures"] == 1
+
+
+def test_timeout_and_latency_start_when_the_attempt_runs():
+    caller = _caller(timeout=0.3, max_retries=0, max_workers=1)
+    busy = threading.Thread(target=caller.call, args=(lambda timeout: time.sleep(0.2),))
+    busy.start()
+    time.sleep(0.02)
+    # 하나뿐인 풀 스레드가 0.2초 동안 차 있다: 기다린 시간까지 더하면 timeout을 넘지만 실제 호출은 0.15초
+    assert caller.call(lambda timeout: time.sleep(0.15) or "ok") == "ok"
+    busy.join()
+    assert caller.stats()["attempts"]["primary"]["p99_ms"] < 200
@@ -0,0 +1,82 @@
+import os
+import random
+
+import pandas as pd
+import pytest
+
+from utils.results_summary import ResultsSummary
+
+HEADER = "run_id,chunk,k,temp,recall@5,f1,latency_ms,cost_cents\n"
+
+
+def _rows(n, seed=0):
+    rng = random.Random(seed)
+    return "".join(f"{rng.randrange(10**7, 10**8)},{rng.choice([256, 512])},{rng.choice([3, 5])},0.2,"
+                   f"{rng.choice([0.6, 0.8, 1.0])},{rng.choice([0.6, 1.0])},{rng.uniform(100, 900):.2f},"
+                   f"{rng.uniform(0, 0.1):.4f}\n" for _ in range(n))
+
+
+def _expected(path):
+    df = pd.read_csv(path, dtype={"run_id": str})
+    df["cost_dollars"] = df["cost_cents"].round(4)
+    return len(df), df["latency_ms"].mean(), df.nlargest(10, ["recall@5", "f1"]).to_dict(orient="records")
+
+
+def test_appended_rows_are_read_incrementally(tmp_path):
+    path = tmp_path / "grid_search_1.csv"
+    path.write_text(HEADER + _rows(50))
+    results = ResultsSummary(str(tmp_path))
+    etag, first = results.get()
+    assert first["summary"]["total_experiments"] == 50
+    assert results.get()[0] == etag and results.stats["cached"] == 1
+
+    more = _rows(30, seed=1)
+    with open(path, "a") as f:
+        f.write(more[:-20])  # 마지막 줄은 쓰는 중
+    _, partial = results.get()
+    assert partial["summary"]["total_experiments"] == 79 and results.stats["incremental_reads"] == 1
+    with open(path, "a") as f:
+        f.write(more[-20:])
+    etag2, payload = results.get()
+    assert etag2 != etag and results.stats["full_reads"] == 1
+
+    n, latency, top = _expected(path)
+    assert payload["summary"]["total_experiments"] == n
+    assert payload["summary"]["avg_latency_ms"] == pytest.approx(latency)
+    assert payload["top_results"] == top
+
+
+def test_rewritten_file_is_read_again(tmp_path):
+    path = tmp_path / "grid_search_1.csv"
+    path.write_text(HEADER + _rows(20))
+    results = ResultsSummary(str(tmp_path))
+    results.get()
+    with open(path, "r+") as f:  # 같은 파일을 다른 내용으로 더 길게 다시 쓴다 (grid_run --resume)
+        f.write(HEADER + _rows(40, seed=2))
+    _, payload = results.get()
+    assert payload["summary"]["total_experiments"] == 40 and results.stats["full_reads"] == 2
+    assert payload["top_results"] == _expected(path)[2]
+
+
+def test_latest_file_and_missing_columns(tmp_path):
+    (tmp_path / "grid_search_1.csv").write_text(HEADER + _rows(5))
+    (tmp_path / "grid_search_2.csv").write_text("chunk,question\n256,q\n")
+    results = ResultsSummary(str(tmp_path))
+    with pytest.raises(KeyError):
+        results.get()
+    with pytest.raises(FileNotFoundError):
+        ResultsSummary(str(tmp_path), "nothing_*.csv").get()
+
+
+def test_same_size_rewrite_is_read_again(tmp_path):
+    path = tmp_path / "grid_search_1.csv"
+    path.write_text(HEADER + _rows(20))
+    results = ResultsSummary(str(tmp_path))
+    results.get()
+    st = path.stat()
+    path.write_text(path.read_text().replace(",0.6,", ",0.9,"))  # 같은 길이, 다른 내용
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert path.stat().st_size == st.st_size
+    _, payload = results.get()
+    assert results.stats["full_reads"] == 2 and results.stats["cached"] == 0
+    assert payload["top_results"] == _expected(path)[2]
@@ -0,0 +1,60 @@
+import math
+import os
+
+import numpy as np
+
+from utils.local_embedder import HashingEmbedder
+from utils.retrieval_eval import (build_index, evaluate_index, load_labels, metrics, resolve_relevant,
+                                  summarize)
+
+LABELS = os.path.join(os.path.dirname(__file__), "..", "labels", "ai_questions.jsonl")
+
+
+def test_metrics_match_hand_computed_values_for_every_k():
+    ids = np.array([[5, 1, 9, -1],    # 정답 {1, 9}: 2, 3번째
+                    [7, 8, 2, 3],     # 정답 {7}: 1번째
+                    [0, 4, 6, 2]])    # 정답 없음 -> NaN
+    relevant = [[1, 9], [7], []]
+    m = metrics(ids, relevant, [1, 3, 4])
+
+    assert m["recall@1"][:2].tolist() == [0.0, 1.0]
+    assert m["recall@3"][:2].tolist() == [1.0, 1.0]
+    assert m["precision@3"][0] == 2 / 3 and m["hit@1"][0] == 0.0
+    assert m["mrr@1"][0] == 0.0 and m["mrr@3"][0] == 0.5 and m["mrr@4"][1] == 1.0
+    dcg = 1 / math.log2(3) + 1 / math.log2(4)
+    assert math.isclose(m["ndcg@3"][0], dcg / (1 + 1 / math.log2(3)))
+    assert m["ndcg@4"][1] == 1.0
+    assert all(math.isnan(v[2]) for v in m.values())
+    assert summarize(m)["recall@1"] == 0.5  # 정답 없는 질문은 평균에서 빠진다
+
+
+def test_labels_resolve_to_chunks_and_flat_index_finds_them():
+    labels = load_labels(LABELS)
+    assert labels and all(label["query"] for label in labels)
+
+    chunks = ["고양이는 귀엽다.", "튜링 테스트\n1950년 앨런 튜링이 제안한 시험", "강아지는 충성스럽다."]
+    relevant = resolve_relevant([{"query": "튜링 테스트란?", "relevant_text": ["튜링 테스트 1950년 앨런 튜링"]},
+                                 {"query": "x", "relevant_ids": [2]}], chunks)
+    assert relevant == [[1], [2]]
+
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed_texts(chunks)
+    result = evaluate_index(build_index("flat", vectors), embedder.embed_texts(["튜링 테스트 앨런 튜링"]),
+                            [[1]], [1, 3])
+    assert result["recall@1"] == 1.0 and result["mrr@3"] == 1.0
+    assert result["ids"].shape == (1, 3)
+
+
+def test_approximate_indexes_report_overlap_with_exact_search():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((600, 32)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:20] + 0.01 * rng.standard_normal((20, 32)).astype("float32")
+    relevant = [[i] for i in range(20)]
+
+    exact = evaluate_index(build_index("flat", vectors), queries, relevant, [1, 5])
+    assert exact["recall@1"] == 1.0
+    for kind in ("ivf", "hnsw", "sq8"):
+        r = evaluate_index(build_index(kind, vectors), queries, relevant, [1, 5], exact_ids=exact["ids"])
+        assert 0.0 <= r["ann_recall@5"] <= 1.0 and r["recall@5"] > 0.5
+        assert r["bytes_per_vector"] > 0
@@ -0,0 +1,57 @@
+import time
+
+from utils.session_lifecycle import SessionLifecycle
+
+MB = 1024 * 1024
+
+
+class FakeStore:
+    def __init__(self, sessions):
+        self.sessions = dict(sessions)  # sid -> (last access, bytes)
+        self.evicted = []
+
+    def scan(self):
+        return dict(self.sessions)
+
+    def usage(self, sid):
+        return self.sessions.get(sid, (0, 0))[1]
+
+    def evict(self, sid):
+        self.evicted.append(sid)
+        return self.sessions.pop(sid)[1]
+
+
+def _manager(store, **kwargs):
+    params = dict(ttl_seconds=3600, session_quota_bytes=10 * MB, global_quota_bytes=100 * MB, hot_seconds=60)
+    params.update(kwargs)
+    return SessionLifecycle(scan=store.scan, usage=store.usage, evict=store.evict, **params)
+
+
+def test_ttl_evicts_idle_sessions_only():
+    now = time.time()
+    store = FakeStore({"old": (now - 7200, MB), "recent": (now - 10, MB)})
+    manager = _manager(store)
+    result = manager.sweep()
+    assert result["evicted_ttl"] == ["old"] and store.evicted == ["old"]
+    assert manager.metrics()["evicted_ttl"] == 1 and manager.metrics()["bytes_reclaimed"] == MB
+
+
+def test_in_memory_touch_keeps_session_alive():
+    store = FakeStore({"s": (time.time() - 7200, MB)})
+    manager = _manager(store)
+    manager.touch("s")
+    assert manager.sweep()["evicted_ttl"] == [] and store.evicted == []
+
+
+def test_global_quota_evicts_coldest_and_keeps_hot():
+    now = time.time()
+    store = FakeStore({
+        "cold": (now - 1800, 60 * MB),
+        "warm": (now - 900, 30 * MB),
+        "hot": (now - 5, 50 * MB),
+    })
+    manager = _manager(store)
+    result = manager.sweep()
+    assert result["evicted_quota"] == ["cold"]
+    assert set(store.sessions) == {"warm", "hot"} and manager.metrics()["disk_bytes"] == 80 * MB
+    assert manager.over_quota("hot") and not _manager(FakeStore({"x": (now, MB)})).over_quota("x")
@@ -0,0 +1,33 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.sharded_search import search_shards
+
+
+def test_merges_global_top_k_across_shards():
+    shards = {
+        "a": lambda: [(0, 0.9), (1, 0.5)],
+        "b": lambda: [(0, 0.7), (1, 0.6)],
+    }
+    with ThreadPoolExecutor(4) as pool:
+        merged, status = search_shards(shards, 3, pool, timeout=5)
+    assert merged == [("a", (0, 0.9)), ("b", (0, 0.7)), ("b", (1, 0.6))]
+    assert status["a"]["state"] == "ok" and status["b"]["hits"] == 2
+
+
+def test_slow_and_failing_shards_return_partial_results():
+    def slow():
+        time.sleep(1)
+        return [(0, 1.0)]
+
+    def broken():
+        raise RuntimeError("disk gone")
+
+    with ThreadPoolExecutor(4) as pool:
+        t0 = time.perf_counter()
+        merged, status = search_shards({"fast": lambda: [(3, 0.4)], "slow": slow, "broken": broken}, 5, pool, timeout=0.2)
+        elapsed = time.perf_counter() - t0
+    assert elapsed < 0.8
+    assert merged == [("fast", (3, 0.4))]
+    assert status["slow"]["state"] == "timeout"
+    assert status["broken"] == {"state": "error", "error": "disk gone"}
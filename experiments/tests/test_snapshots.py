@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import time
+
+from utils.snapshots import FileLock, SnapshotCache, next_version, parse_version, version_bytes
+
+
+def test_snapshot_cache_reloads_only_on_new_version():
+    cache = SnapshotCache(max_entries=2)
+    loads = []
+
+    def loader(v):
+        def load():
+            loads.append(v)
+            return f"snapshot-{v}"
+        return load
+
+    assert cache.get("s", 1, loader(1)) == "snapshot-1"
+    assert cache.get("s", 1, loader(1)) == "snapshot-1"
+    assert cache.get("s", 2, loader(2)) == "snapshot-2"
+    assert loads == [1, 2]
+    cache.get("a", 1, loader("a"))
+    cache.get("b", 1, loader("b"))  # "s"가 밀려난다
+    assert cache.stats()["entries"] == 2
+    cache.get("s", 2, loader(2))
+    assert loads == [1, 2, "a", "b", 2]
+
+
+def test_version_pointer_round_trip():
+    v1 = next_version(None, chunks=3, text_bytes=30, meta_bytes=12)
+    v2 = next_version(v1, chunks=5, text_bytes=50, meta_bytes=20)
+    assert (v1["version"], v2["version"]) == (1, 2)
+    assert parse_version(version_bytes(v2))["chunks"] == 5
+    assert parse_version(b'{"version": 1, "chun') is None
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    lock_path = str(tmp_path / ".index.lock")
+    child = (
+        "import sys, time; sys.path.insert(0, %r)\n"
+        "from utils.snapshots import FileLock\n"
+        "t0 = time.time()\n"
+        "with FileLock(%r):\n"
+        "    print(round(time.time() - t0, 2))\n"
+    ) % (sys.path[0], lock_path)
+    with FileLock(lock_path):
+        proc = subprocess.Popen([sys.executable, "-c", child], stdout=subprocess.PIPE, text=True)
+        time.sleep(0.5)
+    waited = float(proc.communicate(timeout=30)[0])
+    assert waited >= 0.3
@@ -0,0 +1,36 @@
+import faiss
+import numpy as np
+
+from utils.tombstones import Tombstones
+
+
+def test_ranges_merge_and_membership():
+    ts = Tombstones()
+    ts.add(10, 20)
+    ts.add(15, 30)
+    ts.add(40, 41)
+    assert ts.deleted == [(10, 30), (40, 41)] and len(ts) == 21
+    assert 10 in ts and 29 in ts and 40 in ts
+    assert 9 not in ts and 30 not in ts and 41 not in ts
+    assert Tombstones.from_bytes(ts.to_bytes()).deleted == ts.deleted
+
+
+def test_compaction_keeps_ranges_deleted_meanwhile():
+    ts = Tombstones()
+    ts.add(0, 10)
+    done = list(ts.pending)
+    ts.add(5, 15)  # 압축 도중 들어온 삭제
+    ts.mark_compacted(done)
+    assert ts.pending == [(10, 15)] and ts.purged_count == 10 and ts.pending_count == 5
+
+
+def test_id_map_remove_keeps_chunk_ids():
+    xb = np.eye(8, dtype="float32")
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(8))
+    index.add_with_ids(xb, np.arange(8, dtype="int64"))
+    ts = Tombstones()
+    ts.add(2, 5)
+    index.remove_ids(ts.pending_ids())
+    assert index.ntotal == 5
+    _, I = index.search(xb[6:7], 1)
+    assert I[0][0] == 6
@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 앱 하나(이벤트 루프 하나)에 /add-text를 동시에 보내 그룹 커밋이 실제로 묶이는지 본다.
+# 핸들러가 이벤트 루프에서 그룹 커밋을 기다리면 요청이 하나씩 처리되어 max_batch가 1에 머문다.
+# 임베딩 API 대신 텍스트로 정해지는 벡터를 돌려주는 클라이언트를 쓴다.
+PROBE = """
+import json, threading, types, zlib
+import numpy as np
+from fastapi.testclient import TestClient
+import main
+
+def _vector(text):
+    v = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(64).astype("float32")
+    return (v / np.linalg.norm(v)).tolist()
+
+class _Embeddings:
+    def create(self, input, model, **kw):
+        texts = [input] if isinstance(input, str) else list(input)
+        return types.SimpleNamespace(data=[types.SimpleNamespace(index=i, embedding=_vector(t)) for i, t in enumerate(texts)])
+
+class _Client:
+    embeddings = _Embeddings()
+    def with_options(self, **kw):
+        return self
+
+main.client = _Client()
+with TestClient(main.app) as client:
+    barrier = threading.Barrier(4)
+    statuses = []
+    def add(i):
+        barrier.wait()
+        r = client.post("/add-text", data={"title": f"doc{i}", "content": f"문서 {i}의 내용입니다. " * 30,
+                                           "chunk_size": 200, "chunk_overlap": 20, "session_id": "group-commit-test"})
+        statuses.append(r.status_code)
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(json.dumps({"statuses": statuses, "group_commit": client.get("/sessions/metrics").json()["group_commit"]}))
+"""
+
+
+def test_concurrent_add_text_requests_share_a_group_commit(tmp_path):
+    os.makedirs(tmp_path / "data")
+    os.makedirs(tmp_path / "logs")
+    os.symlink(os.path.join(BASE_DIR, "static"), tmp_path / "static")
+    env = dict(os.environ, PYTHONPATH=BASE_DIR, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "x"),
+               GROUP_COMMIT_WINDOW_MS="200", CATALOG_PATH=str(tmp_path / "data" / "catalog.db"))
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, check=True, timeout=120).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    assert result["statuses"] == [200] * 4
+    assert result["group_commit"]["requests"] == 4 and result["group_commit"]["max_batch"] > 1
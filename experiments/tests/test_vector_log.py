@@ -0,0 +1,59 @@
+import os
+
+import faiss
+import numpy as np
+
+from utils import vector_log
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+
+
+def test_round_trip_and_limit(tmp_path):
+    path = str(tmp_path / "vectors.log")
+    first = vector_log.append(path, np.arange(0, 3), _vectors(3))
+    vector_log.append(path, np.arange(3, 5), _vectors(2, seed=1))
+    ids, vecs, end = vector_log.read(path)
+    assert list(ids) == [0, 1, 2, 3, 4] and vecs.shape == (5, 8) and end == os.path.getsize(path)
+    ids, _, end = vector_log.read(path, limit=first)  # 커밋된 길이까지만
+    assert list(ids) == [0, 1, 2] and end == first
+
+
+def test_torn_and_corrupt_tails_are_ignored_then_truncated(tmp_path):
+    path = str(tmp_path / "vectors.log")
+    good = vector_log.append(path, np.arange(0, 2), _vectors(2))
+    record = vector_log.encode(np.arange(2, 4), _vectors(2, seed=1))
+    with open(path, "ab") as f:
+        f.write(record[:-7])  # 쓰다 멈춘 레코드
+    ids, _, end = vector_log.read(path)
+    assert list(ids) == [0, 1] and end == good
+
+    corrupt = bytearray(record)
+    corrupt[20] ^= 0xFF
+    os.truncate(path, good)
+    with open(path, "ab") as f:
+        f.write(bytes(corrupt))
+    assert list(vector_log.read(path)[0]) == [0, 1]
+    assert vector_log.truncate(path, good) and os.path.getsize(path) == good
+
+
+def test_apply_skips_ids_already_in_base(tmp_path):
+    path = str(tmp_path / "vectors.log")
+    vecs = _vectors(4)
+    vector_log.append(path, np.arange(0, 2), vecs[:2])
+    vector_log.append(path, np.arange(2, 4), vecs[2:])
+    base = faiss.IndexIDMap2(faiss.IndexFlatIP(8))
+    base.add_with_ids(vecs[:2], np.arange(0, 2))  # 앞 레코드는 이미 병합됨 (로그를 지우기 전에 멈춘 경우)
+    assert vector_log.apply(base, path) == 2
+    assert sorted(faiss.vector_to_array(base.id_map)) == [0, 1, 2, 3]
+
+
+def test_index_dim_reads_only_the_header(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(12))
+    index.add_with_ids(_vectors(3, dim=12), np.arange(3))
+    faiss.write_index(index, path)
+    assert vector_log.index_dim(path) == 12
+    faiss.write_index(faiss.IndexFlatIP(5), path)
+    assert vector_log.index_dim(path) == 5
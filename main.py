@@ -10,27 +10,93 @@ if sys.platform == 'win32':
 from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
-from openai import OpenAI
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from prompt_template import make_prompt
 from datetime import datetime
 from dotenv import load_dotenv
 from pathlib import Path
 import faiss, numpy as np, csv, os, time
-import pandas as pd
 from utils.data_loader import load_chunks
 import config # 설정 파일을 불러온다. 이제 하드코딩은 그만.
-import PyPDF2
-from docx import Document
 import io
-from typing import Optional, Tuple
-from utils.s3_store import S3Store
-from utils.rate_limit import check_limits
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import re
+import json
+import asyncio
+import threading
+import shutil
+import heapq
+import functools
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from utils.rate_limit import check_limits, prune_expired
+from utils import lexical_index, context_builder, tokens, near_dup, vector_log, embedders, full_vectors, mmr
+from utils.chunker import make_chunker
+from utils.global_index import GlobalIndex, chunk_hash
+from utils.catalog import Catalog
+from utils.tombstones import Tombstones, DELETED_PLACEHOLDER
+from utils.session_lifecycle import SessionLifecycle
+from utils.sharded_search import search_shards
+from utils.group_commit import GroupCommitter
+from utils.results_summary import ResultsSummary
+from utils.resilient_call import CallFailed, ResilientCaller
+from utils.admission import AdmissionController, Rejected, estimate_tokens
+from utils.snapshots import FileLock, SnapshotCache, VERSION_FILE, next_version, parse_version, version_bytes
+
+if TYPE_CHECKING:
+    from utils.s3_store import S3Store
 
 # ── 환경 및 클라이언트 ─────────────────────────────
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# 무거운 의존성(openai, pandas, PyPDF2, python-docx, boto3)은 처음 쓰는 곳에서 불러온다.
+# 워커 기동 시간을 줄이기 위함이며, experiments/bench_import.py 로 import 시간을 확인한다.
+client = None
+_s3_store = None
+_catalog = None
+
+def get_client():
+    """OpenAI 클라이언트를 처음 요청할 때 만든다."""
+    global client
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=config.OPENAI_BASE_URL)
+    return client
+
+_embedder = None
+_embedder_lock = threading.Lock()
+# 임베딩 API 호출 계층 (timeout, 재시도, 헤징). 시도별 지표는 /sessions/metrics의 embedding_calls.
+embed_caller = ResilientCaller(
+    timeout=config.EMBED_TIMEOUT_SECONDS, max_retries=config.EMBED_MAX_RETRIES,
+    backoff_base=config.EMBED_RETRY_BACKOFF_MS / 1000, backoff_max=config.EMBED_RETRY_BACKOFF_MAX_MS / 1000,
+    hedge=config.EMBED_HEDGE, hedge_quantile=config.EMBED_HEDGE_QUANTILE, hedge_min_delay=config.EMBED_HEDGE_MIN_MS / 1000,
+    budget_ratio=config.EMBED_EXTRA_BUDGET_RATIO, budget_burst=config.EMBED_EXTRA_BUDGET_BURST,
+    max_workers=config.EMBED_CALL_THREADS)
+
+def make_admission(name: str, rpm: float, tpm: float) -> AdmissionController:
+    return AdmissionController(
+        name, initial_limit=config.UPSTREAM_INITIAL_CONCURRENCY, min_limit=config.UPSTREAM_MIN_CONCURRENCY,
+        max_limit=config.UPSTREAM_MAX_CONCURRENCY, bulk_share=config.UPSTREAM_BULK_SHARE, reserve=config.UPSTREAM_RESERVE,
+        queue_timeout={"interactive": config.UPSTREAM_QUEUE_TIMEOUT_INTERACTIVE, "bulk": config.UPSTREAM_QUEUE_TIMEOUT_BULK},
+        rpm=rpm, tpm=tpm, failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD, failure_ratio=config.CIRCUIT_FAILURE_RATIO,
+        open_seconds=config.CIRCUIT_OPEN_SECONDS, max_open_seconds=config.CIRCUIT_MAX_OPEN_SECONDS)
+
+# OpenAI 입장 제어 (동시 호출 한도, 우선순위 차선, 분당 예산, 회로 차단기). 지표는 /sessions/metrics의 admission.
+embed_admission = make_admission("embeddings", config.OPENAI_EMBED_RPM, config.OPENAI_EMBED_TPM)
+chat_admission = make_admission("chat", config.OPENAI_CHAT_RPM, config.OPENAI_CHAT_TPM)
+
+def get_embedder():
+    """설정된 임베딩 백엔드(config.EMBED_BACKEND)를 처음 쓸 때 만든다. onnx는 이때 모델을 읽고 워밍업한다."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = embedders.make_embedder(
+                    config.EMBED_BACKEND, get_client=get_client, model=config.EMBED_MODEL,
+                    model_path=config.EMBED_MODEL_PATH, batch_size=config.EMBED_BATCH_SIZE,
+                    threads=config.EMBED_THREADS, max_length=config.EMBED_MAX_LENGTH, dim=config.EMBED_HASH_DIM,
+                    caller=embed_caller, admission=embed_admission,
+                    query_window=config.EMBED_QUERY_BATCH_WINDOW_MS / 1000, query_batch_max=config.EMBED_QUERY_BATCH_MAX)
+    return _embedder
 # ─────────────────────────────────────────────────
 
 app = FastAPI()
@@ -60,28 +126,39 @@ def log_chat(ts, user_input, role, temp, reply):
             "system_role": role, "temperature": temp, "reply": reply
         })
 
-def ensure_faiss_index():
-    """index.faiss 가 없거나 text 파일이 새로 수정됐으면 자동 생성."""
-    idx_path = Path(config.INDEX_PATH)
-    txt_path = Path(config.TEXT_PATH)
-    if not idx_path.exists() or (txt_path.exists() and txt_path.stat().st_mtime > idx_path.stat().st_mtime):
-        print("[INFO] FAISS 인덱스를 다시 만드는 중... 잠시 기다려.")
-        try:
-            from experiments.generate_embedding import build_index
-            chunks = load_chunks()
-            build_index(chunks)
-            print("[OK] index.faiss 생성 완료.")
-        except Exception as e:
-            print(f"[ERROR] Faiss 인덱스 생성 실패: {e}")
-
 def embed_text(text: str):
     try:
-        emb = client.embeddings.create(input=text, model=config.EMBED_MODEL).data[0].embedding
-        return np.asarray(emb, dtype="float32").reshape(1, -1)
+        return get_embedder().embed_text(text)
+    except CallFailed as e:
+        raise embedding_unavailable(e)
+    except Rejected as e:
+        raise upstream_rejected(e)
     except Exception as e:
-        # OpenAI API에서 에러가 나면, 서버가 죽는 대신 클라이언트에게 알려준다.
+        # 임베딩 API/모델에서 에러가 나면, 서버가 죽는 대신 클라이언트에게 알려준다.
         raise HTTPException(status_code=500, detail=f"임베딩 생성 오류: {e}")
 
+def embedding_unavailable(e: CallFailed) -> HTTPException:
+    """재시도까지 실패한 임베딩 호출: 일시 장애(타임아웃, 429, 5xx)면 503 + Retry-After, 아니면 500."""
+    if e.retryable:
+        return HTTPException(status_code=503, detail=f"임베딩 서비스가 일시적으로 응답하지 않습니다: {e}",
+                             headers={"Retry-After": "1"})
+    return HTTPException(status_code=500, detail=f"임베딩 생성 오류: {e}")
+
+def upstream_rejected(e: Rejected) -> HTTPException:
+    """입장 제어가 호출을 보내지 않았다 (회로 차단기가 열렸거나 대기열이 넘쳤다): 503 + Retry-After."""
+    return HTTPException(status_code=503, detail=f"{e}", headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+def create_chat_completion(messages: List[dict], **kwargs):
+    """채팅 API 호출 (interactive 차선). 스트리밍이면 응답이 시작될 때 자리를 돌려준다."""
+    tokens = estimate_tokens(m["content"] for m in messages) + config.CHAT_COMPLETION_TOKENS_ESTIMATE
+    return chat_admission.call(
+        "interactive", lambda: get_client().chat.completions.create(model=config.CHAT_MODEL, messages=messages, **kwargs),
+        tokens=tokens)
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """여러 텍스트를 배치로 임베딩한다 (API는 EMBED_BATCH_SIZE개씩 한 번에 호출, 예외는 호출자에게)."""
+    return get_embedder().embed_texts(texts)
+
 # ---------- 파일 업로드 처리 함수들 ─────────────────
 def extract_text_from_file(file: UploadFile) -> str:
     """파일에서 텍스트를 추출합니다."""
@@ -92,6 +169,7 @@ def extract_text_from_file(file: UploadFile) -> str:
             return content.decode('utf-8')
         
         elif file.filename.endswith('.pdf'):
+            import PyPDF2
             pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
             text = ""
             for page in pdf_reader.pages:
@@ -99,6 +177,7 @@ def extract_text_from_file(file: UploadFile) -> str:
             return text
         
         elif file.filename.endswith('.docx'):
+            from docx import Document
             doc = Document(io.BytesIO(content))
             text = ""
             for paragraph in doc.paragraphs:
@@ -116,15 +195,14 @@ def extract_text_from_file(file: UploadFile) -> str:
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"파일 처리 오류: {str(e)}")
 
-def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> list:
-    """텍스트를 청크로 나눕니다."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""]
-    )
-    return text_splitter.split_text(text)
+def chunk_text(text: str, chunk_size: int, chunk_overlap: int, length_mode: Optional[str] = None) -> list:
+    """텍스트를 청크로 나눕니다. length_mode가 tokens면 chunk_size/overlap을 토큰 수로 해석합니다."""
+    try:
+        chunker = make_chunker(chunk_size, chunk_overlap, length_mode or config.CHUNK_LENGTH_MODE,
+                               separators=config.CHUNK_SEPARATORS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return chunker.split_text(text)
 
 def rebuild_index(chunks: list) -> dict:
     """새로운 청크들로 FAISS 인덱스를 재구성합니다."""
@@ -140,15 +218,8 @@ def rebuild_index_for_paths(chunks: list, index_path: str, text_path: str) -> di
         all_chunks = existing_chunks + chunks
         
         # 임베딩 생성
-        print(f"🔄 {len(all_chunks)}개 청크의 임베딩을 생성하는 중...")
-        embeddings = []
-        for i, chunk in enumerate(all_chunks):
-            if i % 10 == 0:
-                print(f"진행률: {i}/{len(all_chunks)}")
-            emb = client.embeddings.create(input=chunk, model=config.EMBED_MODEL).data[0].embedding
-            embeddings.append(emb)
-        
-        embeddings = np.array(embeddings, dtype='float32')
+        print(f"🔄 {len(all_chunks)}개 청크의 임베딩을 생성하는 중... ({get_embedder().name})")
+        embeddings = embed_texts(all_chunks)
         
         # FAISS 인덱스 생성
         dimension = embeddings.shape[1]
@@ -158,6 +229,7 @@ def rebuild_index_for_paths(chunks: list, index_path: str, text_path: str) -> di
         # 인덱스 저장
         Path(index_path).parent.mkdir(parents=True, exist_ok=True)
         faiss.write_index(index, index_path)
+        write_embedding_record(None, index_path, embedders.embedding_record(get_embedder(), dimension))
         
         # 새 청크들을 텍스트 파일에 추가
         Path(text_path).parent.mkdir(parents=True, exist_ok=True)
@@ -174,18 +246,33 @@ def rebuild_index_for_paths(chunks: list, index_path: str, text_path: str) -> di
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"인덱스 재구성 오류: {str(e)}")
 
-def get_s3_store() -> Optional[S3Store]:
+def get_s3_store() -> Optional["S3Store"]:
+    """USE_S3일 때만 boto3를 불러오고, 만든 S3Store는 재사용한다."""
+    global _s3_store
     if getattr(config, "USE_S3", False) and config.S3_BUCKET:
-        return S3Store(
-            bucket=config.S3_BUCKET,
-            region=config.S3_REGION,
-            prefix=config.S3_PREFIX,
-            aws_access_key_id=config.AWS_ACCESS_KEY_ID or None,
-            aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY or None,
-            aws_session_token=config.AWS_SESSION_TOKEN or None,
-        )
+        if _s3_store is None:
+            from utils.s3_store import S3Store
+            _s3_store = S3Store(
+                bucket=config.S3_BUCKET,
+                region=config.S3_REGION,
+                prefix=config.S3_PREFIX,
+                aws_access_key_id=config.AWS_ACCESS_KEY_ID or None,
+                aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY or None,
+                aws_session_token=config.AWS_SESSION_TOKEN or None,
+            )
+        return _s3_store
     return None
 
+def get_catalog(session_id: Optional[str] = None) -> Catalog:
+    """파일 카탈로그. session_id를 주면 그 세션의 예전 files.json을 먼저 옮겨 둔다."""
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog(config.CATALOG_PATH)
+    if session_id is not None:
+        index_path, _ = get_paths_for_session(session_id)
+        _catalog.migrate_json(session_id, os.path.join(os.path.dirname(index_path), "files.json"))
+    return _catalog
+
 def get_paths_for_session(session_id: Optional[str]) -> Tuple[str, str]:
     if not session_id:
         return config.INDEX_PATH, config.TEXT_PATH
@@ -194,6 +281,762 @@ def get_paths_for_session(session_id: Optional[str]) -> Tuple[str, str]:
     text_path = str(base / "text_chunks.txt")
     return index_path, text_path
 
+def get_lexical_path(index_path: str) -> str:
+    """FAISS 인덱스 옆에 두는 BM25 색인 경로."""
+    return str(Path(index_path).with_name("lexical.idx"))
+
+def _lexical_kwargs() -> dict:
+    return {"ngram": config.LEXICAL_NGRAM, "k1": config.BM25_K1, "b": config.BM25_B}
+
+def storable_chunk(chunk: str) -> str:
+    """text_chunks.txt는 빈 줄로 청크를 구분하므로, 청크 내부의 빈 줄은 한 줄바꿈으로 접는다.
+    (그대로 두면 다시 읽을 때 청크가 쪼개져 인덱스 순서와 어긋난다)"""
+    return re.sub(r"\n\s*\n", "\n", chunk).strip()
+
+def get_meta_path(index_path: str) -> str:
+    """청크별 메타데이터(출처, 토큰 수) 경로. text_chunks.txt와 줄 단위로 순서가 같다."""
+    return str(Path(index_path).with_name("chunk_meta.jsonl"))
+
+def load_chunk_meta(session_id: Optional[str], index_path: str, n_chunks: Optional[int]) -> Optional[list]:
+    """청크 메타데이터를 읽는다. 없거나 청크 수와 맞지 않으면(예전 세션) None. n_chunks가 None이면 개수를 확인하지 않는다."""
+    try:
+        s3 = get_s3_store()
+        if session_id and s3:
+            if not s3.exists(session_id, "chunk_meta.jsonl"):
+                return None
+            lines = s3.get_text(session_id, "chunk_meta.jsonl").splitlines()
+        else:
+            meta_path = get_meta_path(index_path)
+            if not os.path.exists(meta_path):
+                return None
+            with open(meta_path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        meta = [json.loads(line) for line in lines if line.strip()]
+    except Exception as e:
+        print(f"⚠️ 청크 메타데이터를 읽지 못했습니다: {e}")
+        return None
+    if n_chunks is None:
+        return meta
+    # 커밋 전 쓰기가 덧붙인 줄이 있으면 앞부분(커밋된 버전)만 쓴다.
+    return meta[:n_chunks] if len(meta) >= n_chunks else None
+
+def assemble_context(hits: List[Tuple[int, float]], chunks: list, meta: Optional[list], token_budget: int):
+    """검색 결과를 토큰 예산 안의 컨텍스트 항목으로 조립한다 (이웃 청크 병합, 중복 제거)."""
+    return context_builder.build_context(
+        hits, chunks, tokens.count_tokens, token_budget,
+        meta=meta,
+        dedup_threshold=config.CONTEXT_DEDUP_THRESHOLD,
+        truncate=tokens.truncate_to_tokens,
+    )
+
+def parse_token_budget(body: dict) -> int:
+    """요청의 컨텍스트 토큰 예산 (token_budget). 양의 정수가 아니면 400."""
+    value = body.get("token_budget", config.CONTEXT_TOKEN_BUDGET)
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        value = None
+    try:
+        budget = int(value)
+    except (TypeError, ValueError):
+        budget = 0
+    if budget <= 0:
+        raise HTTPException(status_code=400, detail="token_budget은 양의 정수여야 합니다.")
+    return budget
+
+def chunks_payload(items: list, mode: str) -> List[dict]:
+    """응답의 top_chunks. score는 모든 모드에서 클수록 관련 있다 (vector: 내적, lexical: BM25, hybrid: RRF).
+    distance는 예전 클라이언트를 위해 vector/local 모드에서만 같은 값으로 함께 보낸다."""
+    payload = []
+    for r, it in enumerate(items):
+        entry = {"rank": r + 1, "text": it["text"], "score": it["score"], "tokens": it["tokens"], "chunk_ids": it["ids"]}
+        if mode in ("vector", "local"):
+            entry["distance"] = it["score"]
+        payload.append(entry)
+    return payload
+
+def get_near_dup_path(index_path: str) -> str:
+    """청크별 MinHash 서명 파일 경로 (FAISS 인덱스와 같은 순서)."""
+    return str(Path(index_path).with_name("near_dup.sig"))
+
+def _near_dup_kwargs() -> dict:
+    return {"num_perm": config.MINHASH_PERMS, "bands": config.LSH_BANDS, "seed": config.MINHASH_SEED}
+
+def load_near_dup_index(index_path: str, text_path: str, current_total: int, session_id: Optional[str] = None):
+    """서명 파일을 읽어 LSH 색인을 만든다. 없거나 청크 수와 어긋나면 기존 청크 텍스트로 다시 계산한다.
+    반환: (색인, 파일 전체를 다시 써야 하는지)"""
+    s3 = get_s3_store()
+    data = b""
+    if session_id and s3:
+        if s3.exists(session_id, "near_dup.sig"):
+            data = s3.get_bytes(session_id, "near_dup.sig")
+    elif Path(get_near_dup_path(index_path)).exists():
+        data = Path(get_near_dup_path(index_path)).read_bytes()
+    nd = near_dup.NearDupIndex.from_bytes(data, **_near_dup_kwargs()) if data else None
+    if nd is not None and len(nd) == current_total:
+        return nd, False
+    existing = []
+    if current_total:
+        existing = load_s3_chunks(s3, session_id) if (session_id and s3) else load_chunks(path=text_path)
+    print(f"🔁 근사 중복 서명을 기존 청크 {len(existing)}개로부터 다시 계산합니다.")
+    return near_dup.build(existing, **_near_dup_kwargs()), True
+
+def save_near_dup_index(nd: near_dup.NearDupIndex, new_sigs: list, rewrite: bool, index_path: str, session_id: Optional[str] = None):
+    s3 = get_s3_store()
+    if session_id and s3:
+        s3.put_bytes(session_id, "near_dup.sig", nd.to_bytes())
+        return
+    sig_path = Path(get_near_dup_path(index_path))
+    if rewrite or not sig_path.exists():
+        tmp = sig_path.with_name(sig_path.name + ".tmp")
+        tmp.write_bytes(nd.to_bytes())
+        tmp.replace(sig_path)
+    else:
+        with open(sig_path, "ab") as f:
+            f.write(nd.encode(new_sigs))
+
+def get_tombstone_path(index_path: str) -> str:
+    """삭제된 청크 범위 기록 (세션 인덱스 옆)."""
+    return str(Path(index_path).with_name("tombstones.json"))
+
+def load_tombstones(session_id: Optional[str], index_path: str) -> Tombstones:
+    s3 = get_s3_store()
+    if session_id and s3:
+        if not s3.exists(session_id, "tombstones.json"):
+            return Tombstones()
+        return Tombstones.from_bytes(s3.get_bytes(session_id, "tombstones.json"))
+    path = Path(get_tombstone_path(index_path))
+    return Tombstones.from_bytes(path.read_bytes()) if path.exists() else Tombstones()
+
+def save_tombstones(ts: Tombstones, session_id: Optional[str], index_path: str):
+    s3 = get_s3_store()
+    if session_id and s3:
+        s3.put_bytes(session_id, "tombstones.json", ts.to_bytes())
+        return
+    path = Path(get_tombstone_path(index_path))
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(ts.to_bytes())
+    tmp.replace(path)
+
+# 세션별 잠금 (스레드 + 잠금 파일이라 여러 uvicorn 워커 사이에서도 직렬화된다. 검색은 잠그지 않는다)
+# - session_lock: 업로드(append)와 백그라운드 압축이 같은 인덱스를 동시에 고쳐 쓰지 않도록 한다.
+# - tombstone_lock: tombstones.json 읽고-고쳐-쓰기 (압축이 오래 걸려도 삭제 요청은 기다리지 않는다).
+# 세션의 잠금 파일은 세션 디렉터리 밖(data/sessions/.<id>.<kind>.lock)에 둔다. 세션 삭제가 디렉터리를 지워도
+# 잠금 파일은 남으므로, 그동안 기다리던 다른 워커와 새로 잠그는 워커가 같은 파일(inode)을 잠근다.
+_session_locks: Dict[Tuple[str, str], FileLock] = {}
+_session_locks_guard = threading.Lock()
+
+def session_lock(session_id: Optional[str], kind: str = "index") -> FileLock:
+    with _session_locks_guard:
+        key = (kind, session_id or "")
+        if key not in _session_locks:
+            if session_id:
+                path = Path("data/sessions") / f".{session_id}.{kind}.lock"
+            else:
+                path = Path(config.INDEX_PATH).with_name(f".{kind}.lock")
+            _session_locks[key] = FileLock(str(path))
+        return _session_locks[key]
+
+def tombstone_lock(session_id: Optional[str]) -> FileLock:
+    return session_lock(session_id, kind="tombstones")
+
+# ---------- 인덱스별 임베딩 기록 (utils/embedders.py 참고) ────────
+def read_embedding_record(session_id: Optional[str], index_path: str) -> Optional[dict]:
+    """인덱스를 만든 임베딩 백엔드/차원. 기록이 없는 예전 인덱스면 None."""
+    s3 = get_s3_store()
+    try:
+        if session_id and s3:
+            if not s3.exists(session_id, embedders.RECORD_FILE):
+                return None
+            data = s3.get_bytes(session_id, embedders.RECORD_FILE)
+        else:
+            data = Path(embedders.record_path(index_path)).read_bytes()
+        return json.loads(data.decode("utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+def write_embedding_record(session_id: Optional[str], index_path: str, record: dict):
+    data = json.dumps(record).encode("utf-8")
+    s3 = get_s3_store()
+    if session_id and s3:
+        s3.put_bytes(session_id, embedders.RECORD_FILE, data)
+        return
+    path = embedders.record_path(index_path)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+def check_embedding(session_id: Optional[str], index_path: str, index_dim: Optional[int]) -> Optional[dict]:
+    """현재 임베딩 백엔드로 이 인덱스를 검색/추가할 수 있는지 확인하고 기록을 돌려준다. 다른 백엔드로 만든 인덱스면 409."""
+    record = read_embedding_record(session_id, index_path)
+    reason = embedders.incompatibility(record, get_embedder(), index_dim)
+    if reason:
+        raise HTTPException(status_code=409, detail=reason)
+    return record
+
+# ---------- 버전 포인터 (utils/snapshots.py 참고) ────────
+def get_version_path(index_path: str) -> str:
+    return str(Path(index_path).with_name(VERSION_FILE))
+
+def read_version(session_id: Optional[str], index_path: str) -> Optional[dict]:
+    """커밋된 버전 포인터. 포인터가 없는 예전 세션이면 None."""
+    s3 = get_s3_store()
+    if session_id and s3:
+        return parse_version(s3.get_bytes(session_id, VERSION_FILE)) if s3.exists(session_id, VERSION_FILE) else None
+    try:
+        return parse_version(Path(get_version_path(index_path)).read_bytes())
+    except FileNotFoundError:
+        return None
+
+def _stored_size(session_id: Optional[str], path: str) -> int:
+    s3 = get_s3_store()
+    if session_id and s3:
+        return s3.size(session_id, Path(path).name)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def publish_version(session_id: Optional[str], index_path: str, text_path: str, prev: Optional[dict], chunks: int) -> dict:
+    """새 버전 포인터를 원자적으로 올린다 (쓰기의 커밋 지점). 세션 잠금 안에서 부른다."""
+    s3 = get_s3_store()
+    log_bytes = 0 if (session_id and s3) else _stored_size(None, get_vector_log_path(index_path))
+    version = next_version(prev, chunks, _stored_size(session_id, text_path), _stored_size(session_id, get_meta_path(index_path)),
+                           log_bytes)
+    if session_id and s3:
+        s3.put_bytes(session_id, VERSION_FILE, version_bytes(version))
+    else:
+        path = get_version_path(index_path)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(version_bytes(version))
+        os.replace(tmp, path)
+    return version
+
+def recover_uncommitted(session_id: Optional[str], index_path: str, text_path: str, committed: Optional[dict],
+                        index: Optional[faiss.Index]) -> Optional[faiss.Index]:
+    """이전 쓰기가 커밋 전에 멈췄다면 텍스트/메타의 꼬리와 커밋 전 벡터를 잘라 committed 버전으로 되돌린다.
+    BM25 색인과 근사 중복 서명은 문서 수가 어긋나면 다음 쓰기에서 스스로 다시 만든다. 세션 잠금 안에서 부른다."""
+    if committed is None:
+        return index
+    s3 = get_s3_store()
+    for path, size in ((text_path, committed["text_bytes"]), (get_meta_path(index_path), committed["meta_bytes"])):
+        if _stored_size(session_id, path) <= size:
+            continue
+        print(f"♻️ 커밋되지 않은 꼬리를 잘라냅니다: {path} → {size}바이트")
+        if session_id and s3:
+            s3.put_bytes(session_id, Path(path).name, s3.get_bytes(session_id, Path(path).name)[:size])
+        else:
+            os.truncate(path, size)
+    if not (session_id and s3) and vector_log.truncate(get_vector_log_path(index_path), committed.get("log_bytes", 0)):
+        print(f"♻️ 벡터 로그의 커밋되지 않은 레코드를 잘라냅니다: {get_vector_log_path(index_path)}")
+    n = committed["chunks"]
+    if index is None:
+        return None
+    if isinstance(index, faiss.IndexIDMap2):
+        index.remove_ids(faiss.IDSelectorRange(n, 2 ** 62))
+    elif index.ntotal > n:
+        flat = faiss.IndexFlatIP(index.d)
+        flat.add(index.reconstruct_n(0, n))
+        index = flat
+    return index
+
+def to_id_map(index: faiss.Index) -> faiss.IndexIDMap2:
+    """예전 세션의 위치 기반 인덱스를 청크 id(=위치)를 가진 IndexIDMap2로 바꾼다. 재임베딩은 없다."""
+    if isinstance(index, faiss.IndexIDMap2):
+        return index
+    id_map = faiss.IndexIDMap2(faiss.IndexFlatIP(index.d))
+    if index.ntotal:
+        id_map.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype="int64"))
+    return id_map
+
+def write_index_file(index: faiss.Index, index_path: str):
+    tmp = index_path + ".tmp"
+    faiss.write_index(index, tmp)
+    os.replace(tmp, index_path)
+
+# ---------- 벡터 로그 (utils/vector_log.py 참고) ────────
+# 로컬 세션은 업로드마다 index.faiss를 다시 쓰지 않고 새 벡터만 vectors.log에 덧붙인다.
+# 로그가 base보다 VECTOR_LOG_MERGE_RATIO배 이상 커지면 백그라운드에서 base로 병합한다. (S3 세션은 예전처럼 통째로 올린다)
+def get_vector_log_path(index_path: str) -> str:
+    return str(Path(index_path).with_name("vectors.log"))
+
+def read_session_index(index_path: str, committed: Optional[dict]) -> faiss.Index:
+    """base(index.faiss) + 커밋된 길이까지의 벡터 로그로 메모리 인덱스를 만든다."""
+    index = faiss.read_index(index_path)
+    log_bytes = committed.get("log_bytes", 0) if committed else 0
+    if log_bytes:
+        index = to_id_map(index)
+        vector_log.apply(index, get_vector_log_path(index_path), log_bytes)
+    return index
+
+def fold_vector_log(session_id: str, index_path: str, index: faiss.Index):
+    """로그까지 합친 인덱스를 base로 쓰고 로그를 지운다. 세션 잠금 안에서 부르고, 그 뒤에 버전을 올린다.
+    base를 쓴 뒤 로그를 지우기 전에 멈춰도, 로그에서 base에 이미 있는 id는 건너뛰므로 중복되지 않는다."""
+    write_index_file(index, index_path)
+    try:
+        os.remove(get_vector_log_path(index_path))
+    except FileNotFoundError:
+        pass
+
+def merge_vector_log(session_id: str):
+    index_path, text_path = get_paths_for_session(session_id)
+    with session_lock(session_id):
+        committed = read_version(session_id, index_path)
+        if committed is None or not committed.get("log_bytes"):
+            return
+        t0 = time.time()
+        index = read_session_index(index_path, committed)
+        fold_vector_log(session_id, index_path, index)
+        publish_version(session_id, index_path, text_path, committed, committed["chunks"])
+        print(f"🗜️ 세션 {session_id} 벡터 로그 병합: {committed['log_bytes'] / (1024 * 1024):.1f}MB ({time.time() - t0:.2f}초)")
+
+_merging: set = set()
+
+def schedule_log_merge(session_id: str) -> bool:
+    """벡터 로그 병합을 백그라운드로 시작한다. 이미 진행 중이면 False."""
+    with _session_locks_guard:
+        if session_id in _merging:
+            return False
+        _merging.add(session_id)
+
+    def run():
+        try:
+            merge_vector_log(session_id)
+        except Exception as e:
+            print(f"⚠️ 세션 {session_id} 벡터 로그 병합 실패 (다음 업로드 때 다시 시도): {e}")
+        finally:
+            with _session_locks_guard:
+                _merging.discard(session_id)
+
+    threading.Thread(target=run, name=f"log-merge-{session_id}", daemon=True).start()
+    return True
+
+def vector_log_needs_merge(index_path: str) -> bool:
+    log_size = _stored_size(None, get_vector_log_path(index_path))
+    return (log_size >= config.VECTOR_LOG_MERGE_MIN_MB * 1024 * 1024
+            and log_size >= config.VECTOR_LOG_MERGE_RATIO * _stored_size(None, index_path))
+
+def compact_session(session_id: str):
+    """삭제 표시된 청크를 FAISS 인덱스에서 빼고, 텍스트는 자리 표시 문자열로 바꾸고, BM25 색인을 다시 만든다.
+    청크 id는 바뀌지 않으므로 메타데이터/서명 파일은 그대로 둔다. 중간에 멈춰도 다시 실행하면 된다."""
+    index_path, text_path = get_paths_for_session(session_id)
+    with session_lock(session_id):
+        ts = load_tombstones(session_id, index_path)
+        if not ts.pending:
+            return
+        done = list(ts.pending)
+        t0 = time.time()
+        s3 = get_s3_store()
+        committed = read_version(session_id, index_path)
+        if s3:
+            index = s3.get_faiss(session_id, "index.faiss")
+        else:
+            index = read_session_index(index_path, committed)
+        index = to_id_map(recover_uncommitted(session_id, index_path, text_path, committed, index))
+        chunks = load_s3_chunks(s3, session_id) if s3 else load_chunks(path=text_path)
+        removed = index.remove_ids(ts.pending_ids())
+        chunks = [DELETED_PLACEHOLDER if i in ts else c for i, c in enumerate(chunks)]
+        text = "".join(c + "\n\n" for c in chunks)
+        lex = lexical_index.build(["" if i in ts else c for i, c in enumerate(chunks)], **_lexical_kwargs())
+        if s3:
+            s3.put_faiss(session_id, "index.faiss", index)
+            s3.put_text(session_id, "text_chunks.txt", text)
+            s3.put_bytes(session_id, "lexical.idx", lex.to_bytes())
+        else:
+            fold_vector_log(session_id, index_path, index)
+            tmp = text_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, text_path)
+            lex.save(get_lexical_path(index_path))
+        # 청크 id는 그대로지만 텍스트 길이가 바뀌었으므로 새 버전으로 올린다.
+        publish_version(session_id, index_path, text_path, committed, len(chunks))
+        with tombstone_lock(session_id):
+            fresh = load_tombstones(session_id, index_path)
+            fresh.mark_compacted(done)
+            save_tombstones(fresh, session_id, index_path)
+        print(f"🗜️ 세션 {session_id} 압축: 벡터 {removed}개 제거 ({time.time() - t0:.2f}초)")
+
+_compacting: set = set()
+
+def schedule_compaction(session_id: str) -> bool:
+    """백그라운드 압축을 시작한다. 이미 진행 중이면 False."""
+    with _session_locks_guard:
+        if session_id in _compacting:
+            return False
+        _compacting.add(session_id)
+
+    def run():
+        try:
+            compact_session(session_id)
+        except Exception as e:
+            print(f"⚠️ 세션 {session_id} 압축 실패 (다음 삭제 때 다시 시도): {e}")
+        finally:
+            with _session_locks_guard:
+                _compacting.discard(session_id)
+
+    threading.Thread(target=run, name=f"compact-{session_id}", daemon=True).start()
+    return True
+
+# ---------- 세션 수명 관리 (TTL, 할당량) ────────────
+SESSIONS_DIR = Path("data/sessions")
+
+def _session_dir(session_id: str) -> Path:
+    """세션 디렉터리. 세션 id로 sessions 밖을 가리키지 못하게 막는다."""
+    path = (SESSIONS_DIR / session_id).resolve()
+    if not session_id or path.parent != SESSIONS_DIR.resolve():
+        raise ValueError(f"잘못된 세션 ID: {session_id!r}")
+    return path
+
+def _dir_usage(path: Path) -> Tuple[float, int]:
+    """(가장 최근 수정 시각, 총 바이트)"""
+    latest, total = path.stat().st_mtime, 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            latest, total = max(latest, st.st_mtime), total + st.st_size
+    return latest, total
+
+def scan_sessions() -> Dict[str, Tuple[float, int]]:
+    """세션 id -> (마지막 접근 또는 수정 시각, 사용 바이트). 로컬 디렉터리, S3, 카탈로그를 합친다."""
+    sessions: Dict[str, Tuple[float, int]] = {}
+    if SESSIONS_DIR.exists():
+        for entry in os.scandir(SESSIONS_DIR):
+            if entry.is_dir():
+                sessions[entry.name] = _dir_usage(Path(entry.path))
+    s3 = get_s3_store()
+    if s3:
+        for sid, (modified, size) in s3.list_sessions().items():
+            last, local = sessions.get(sid, (0.0, 0))
+            sessions[sid] = (max(last, modified), local + size)
+    for sid, accessed in get_catalog().list_sessions().items():
+        if sid:  # "" = 공용 말뭉치
+            last, size = sessions.get(sid, (0.0, 0))
+            sessions[sid] = (max(last, accessed or 0.0), size)
+    return sessions
+
+def session_usage_bytes(session_id: str) -> int:
+    path = _session_dir(session_id)
+    used = _dir_usage(path)[1] if path.exists() else 0
+    s3 = get_s3_store()
+    return used + (s3.usage(session_id) if s3 else 0)
+
+def delete_session_data(session_id: str) -> int:
+    """세션의 로컬 파일, S3 객체, 카탈로그 항목, 메모리 캐시를 모두 지운다. 지운 바이트 수를 돌려준다."""
+    path = _session_dir(session_id)
+    freed = 0
+    with session_lock(session_id):
+        if path.exists():
+            freed += _dir_usage(path)[1]
+            shutil.rmtree(path, ignore_errors=True)
+        s3 = get_s3_store()
+        if s3:
+            freed += s3.delete_session(session_id)
+        get_catalog().delete_session(session_id)
+        prefix = str(path) + os.sep
+        for cache in (_lexical_cache, _full_vector_cache):
+            for key in [k for k in cache if str(Path(k).resolve()).startswith(prefix)]:
+                cache.pop(key, None)
+        _snapshots.invalidate_prefix(prefix)
+        _snapshots.invalidate_prefix("s3:" + prefix)
+    with _session_locks_guard:
+        for kind in ("index", "tombstones"):
+            _session_locks.pop((kind, session_id), None)
+    return freed
+
+def enforce_session_quota(session_id: Optional[str]):
+    """세션 사용량이 할당량 이상이면 업로드를 막는다."""
+    if session_id and lifecycle.over_quota(session_id):
+        raise HTTPException(status_code=413, detail=f"세션 저장 공간 할당량({config.SESSION_QUOTA_MB}MB)을 초과했습니다. 파일을 삭제하거나 세션을 비우세요.")
+
+def load_s3_chunks(s3: "S3Store", session_id: str) -> list:
+    content = s3.get_text(session_id, "text_chunks.txt")
+    parts = re.split(r"\n{2,}", content)
+    return [c.strip() for c in parts if c.strip()]
+
+def append_lexical_for_paths(chunks: list, index_path: str, text_path: str, doc_base: int, session_id: Optional[str] = None):
+    """BM25 색인에 새 청크 세그먼트만 덧붙인다 (텍스트 파일 append 이후 호출).
+    색인의 문서 수가 doc_base와 어긋나면(예전 세션, 중단된 쓰기) 텍스트 전체로 다시 만든다."""
+    s3 = get_s3_store()
+    if session_id and s3:
+        data = s3.get_bytes(session_id, "lexical.idx") if s3.exists(session_id, "lexical.idx") else b""
+        n_docs, segments = lexical_index.scan(io.BytesIO(data))
+        if n_docs != doc_base or segments >= config.LEXICAL_MAX_SEGMENTS:
+            data = lexical_index.build(load_s3_chunks(s3, session_id), **_lexical_kwargs()).to_bytes()
+        else:
+            data += lexical_index.encode_documents(chunks, doc_base, ngram=config.LEXICAL_NGRAM)
+        s3.put_bytes(session_id, "lexical.idx", data)
+        return
+
+    lex_path = get_lexical_path(index_path)
+    n_docs, segments = lexical_index.scan_file(lex_path)
+    if n_docs != doc_base:
+        lexical_index.build(load_chunks(path=text_path), **_lexical_kwargs()).save(lex_path)
+    elif segments >= config.LEXICAL_MAX_SEGMENTS:
+        lex = lexical_index.LexicalIndex.load(lex_path, **_lexical_kwargs())
+        lex.add(chunks)
+        lex.save(lex_path)
+    else:
+        with open(lex_path, "ab") as f:
+            f.write(lexical_index.encode_documents(chunks, doc_base, ngram=config.LEXICAL_NGRAM))
+
+# 로컬 BM25 색인 캐시: 경로 -> ((mtime_ns, size), 색인). 파일이 바뀌면 다시 읽는다.
+_lexical_cache: Dict[str, Tuple[Tuple[int, int], lexical_index.LexicalIndex]] = {}
+
+def get_lexical_index(session_id: Optional[str], index_path: str, text_path: str, chunks: list) -> lexical_index.LexicalIndex:
+    """BM25 색인을 가져온다. 없거나 청크와 어긋나면 청크 텍스트로 다시 만든다 (API 호출 없음)."""
+    s3 = get_s3_store()
+    if session_id and s3:
+        lex = None
+        if s3.exists(session_id, "lexical.idx"):
+            lex = lexical_index.LexicalIndex.from_bytes(s3.get_bytes(session_id, "lexical.idx"), **_lexical_kwargs())
+        if lex is None or lex.n_docs < len(chunks):
+            lex = lexical_index.build(chunks, **_lexical_kwargs())
+            s3.put_bytes(session_id, "lexical.idx", lex.to_bytes())
+        return lex
+
+    lex_path = Path(get_lexical_path(index_path))
+    if lex_path.exists():
+        st = lex_path.stat()
+        # 텍스트가 색인보다 새로우면 다시 만든다. 버전 포인터가 있는 말뭉치는 쓰기가 커밋 전에 BM25를 먼저
+        # 갱신하므로, 텍스트 append 직후의 mtime 차이를 오래된 색인으로 보지 않는다 (문서 수로만 판단).
+        stale = (Path(text_path).exists() and Path(text_path).stat().st_mtime_ns > st.st_mtime_ns
+                 and read_version(session_id, index_path) is None)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _lexical_cache.get(str(lex_path))
+        # 색인이 커밋된 청크보다 앞서 있는 것(쓰기 진행 중)은 괜찮다: 범위 밖 결과는 검색에서 걸러진다.
+        if not stale and cached and cached[0] == key and cached[1].n_docs >= len(chunks):
+            return cached[1]
+        if not stale:
+            lex = lexical_index.LexicalIndex.load(str(lex_path), **_lexical_kwargs())
+            if lex.n_docs >= len(chunks):
+                _lexical_cache[str(lex_path)] = (key, lex)
+                return lex
+    print(f"🔤 BM25 색인을 텍스트에서 다시 만드는 중: {lex_path}")
+    lex = lexical_index.build(chunks, **_lexical_kwargs())
+    lex.save(str(lex_path))
+    try:
+        st = lex_path.stat()
+        _lexical_cache[str(lex_path)] = ((st.st_mtime_ns, st.st_size), lex)
+    except FileNotFoundError:  # 그사이 세션이 지워짐
+        pass
+    return lex
+
+# 전체 차원 벡터 메모리 맵 캐시 (2단계 검색): 경로 -> (행 수, 메모리 맵). 커밋된 청크가 늘면 다시 연다.
+_full_vector_cache: Dict[str, Tuple[int, np.ndarray]] = {}
+
+def get_full_vectors(index_path: str, n_rows: int, dim: int) -> Optional[np.ndarray]:
+    """세션의 전체 차원 벡터 앞 n_rows행. 축소 차원 인덱스가 아니면(파일이 없으면) None."""
+    path = full_vectors.path_for(index_path)
+    cached = _full_vector_cache.get(path)
+    if cached and cached[0] == n_rows and cached[1].shape[1] == dim:
+        return cached[1]
+    if not os.path.exists(path):
+        return None
+    rows = full_vectors.open_rows(path, n_rows, dim)
+    _full_vector_cache[path] = (n_rows, rows)
+    return rows
+
+# 세션 말뭉치 스냅샷 캐시: 버전 포인터가 같으면 인덱스/텍스트를 다시 읽지 않는다.
+_snapshots = SnapshotCache(config.SNAPSHOT_CACHE_SESSIONS)
+
+def load_search_corpus(session_id: Optional[str], index_path: str, text_path: str, need_index: bool = True):
+    """검색 대상 (FAISS 인덱스, 청크 목록)을 불러온다. lexical 모드는 인덱스를 읽지 않는다.
+    버전 포인터가 있는 말뭉치는 커밋된 버전의 스냅샷을 잠금 없이 읽는다 (쓰기와 동시에 돌아도 일관됨)."""
+    if not session_id and index_path == config.INDEX_PATH and global_index.status["state"] != "failed":
+        return _load_corpus_files(session_id, index_path, text_path, need_index)
+    version = read_version(session_id, index_path)
+    if version is None:
+        return _load_corpus_files(session_id, index_path, text_path, need_index)  # 포인터가 없는 예전 세션
+
+    def load():
+        index, chunks = _load_corpus_files(session_id, index_path, text_path, need_index, version)
+        return index, chunks[:version["chunks"]]
+
+    key = ("s3:" if session_id and get_s3_store() else "") + str(Path(index_path).resolve())
+    index, chunks = _snapshots.get(key, version["version"], load)
+    if need_index and index is None:  # lexical 검색이 캐시에 넣은 스냅샷에는 인덱스가 없다
+        _snapshots.invalidate(key)
+        index, chunks = _snapshots.get(key, version["version"], load)
+    return index, chunks
+
+def _load_corpus_files(session_id: Optional[str], index_path: str, text_path: str, need_index: bool,
+                       version: Optional[dict] = None):
+    index = None
+    s3 = get_s3_store()
+    if session_id and s3:
+        # 세션 + S3: 원격에서 로드
+        if not s3.exists(session_id, "index.faiss") or not s3.exists(session_id, "text_chunks.txt"):
+            raise HTTPException(status_code=404, detail="현재 세션에 업로드된 문서가 없습니다. 문서를 먼저 업로드하세요.")
+        if need_index:
+            try:
+                index = s3.get_faiss(session_id, "index.faiss")
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"S3에서 인덱스를 불러오는 중 오류: {e}")
+            check_embedding(session_id, index_path, index.d)
+        try:
+            chunks = load_s3_chunks(s3, session_id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"S3에서 텍스트를 불러오는 중 오류: {e}")
+    elif not session_id and index_path == config.INDEX_PATH and global_index.status["state"] != "failed":
+        # 공용 말뭉치: 백그라운드에서 구축한 (인덱스, 청크) 스냅샷을 그대로 쓴다.
+        snapshot = global_index.get()
+        if snapshot is None:
+            if global_index.status["state"] == "empty":
+                raise HTTPException(status_code=404, detail="텍스트 조각 파일이 없습니다. 문서를 먼저 업로드하세요.")
+            raise HTTPException(status_code=503, detail="공용 인덱스를 구축하는 중입니다. /ready 에서 진행 상황을 확인하세요.")
+        index, chunks = snapshot
+    else:
+        if need_index:
+            try:
+                index = read_session_index(index_path, version) if session_id else faiss.read_index(index_path)
+            except Exception as e:
+                raise HTTPException(status_code=404, detail=f"인덱스 파일을 읽을 수 없습니다. 문서를 먼저 업로드하세요. ({e})")
+            # 다른 임베딩 백엔드로 만든 인덱스면 409 (스냅샷을 읽을 때 한 번만 확인한다)
+            check_embedding(session_id, index_path, index.d)
+        try:
+            chunks = load_chunks(path=text_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="텍스트 조각 파일이 없습니다. 문서를 먼저 업로드하세요.")
+    if len(chunks) == 0 or (index is not None and index.ntotal == 0):
+        raise HTTPException(status_code=500, detail="검색 가능한 문서가 없습니다. 먼저 문서를 업로드하거나 말뭉치를 구축하세요.")
+    return index, chunks
+
+def search_corpus(q: str, vec: Optional[np.ndarray], top_k: int, mode: str, session_id: Optional[str],
+                  index_path: str, text_path: str, index, chunks: list) -> List[Tuple[int, float]]:
+    """불러온 말뭉치 하나를 mode에 따라 검색해 [(청크 번호, 점수)]를 반환한다. vec는 미리 만든 질문 임베딩."""
+    fetch = max(top_k, config.HYBRID_CANDIDATES) if mode == "hybrid" else top_k
+    # 삭제 표시된 청크는 압축 전까지 색인에 남아 있으므로 그만큼 더 가져와서 걸러낸다.
+    ts = load_tombstones(session_id, index_path) if session_id else Tombstones()
+
+    vector_hits: List[Tuple[int, float]] = []
+    if mode in ("vector", "hybrid"):
+        rows = None
+        if vec.shape[1] > index.d and session_id and not get_s3_store():
+            rows = get_full_vectors(index_path, len(chunks), vec.shape[1])
+        if vec.shape[1] != index.d and rows is None:
+            raise HTTPException(status_code=409, detail=f"인덱스 차원({index.d})과 질문 임베딩 차원({vec.shape[1]})이 다릅니다.")
+        if rows is None:
+            k = min(fetch + ts.pending_count, index.ntotal)
+            D, I = index.search(vec, k)
+            vector_hits = [(int(idx), float(D[0][rank])) for rank, idx in enumerate(I[0])
+                           if 0 <= idx < len(chunks) and idx not in ts][:fetch]
+        else:
+            # 2단계: 축소 차원 인덱스에서 후보를 넉넉히 찾고, 전체 차원 벡터로 다시 정렬한다.
+            k = min(max(fetch * config.RERANK_FACTOR, config.RERANK_CANDIDATES) + ts.pending_count, index.ntotal)
+            _, I = index.search(full_vectors.truncate(vec, index.d), k)
+            candidates = [int(idx) for idx in I[0] if 0 <= idx < len(chunks) and idx not in ts]
+            vector_hits = full_vectors.rerank(vec[0], candidates, rows)[:fetch]
+
+    lexical_hits: List[Tuple[int, float]] = []
+    if mode in ("lexical", "hybrid"):
+        lex = get_lexical_index(session_id, index_path, text_path, chunks)
+        lexical_hits = [(idx, score) for idx, score in lex.search(q, fetch + len(ts))
+                        if idx < len(chunks) and idx not in ts][:fetch]
+
+    if mode == "vector":
+        return vector_hits
+    if mode == "lexical":
+        return lexical_hits
+    return lexical_index.reciprocal_rank_fusion(
+        [[idx for idx, _ in vector_hits], [idx for idx, _ in lexical_hits]], top_k, k=config.RRF_K
+    )
+
+def chunk_vectors(index, ids: np.ndarray, index_path: str, n_chunks: int, dim: int) -> np.ndarray:
+    """청크 id들의 임베딩. 축소 차원 세션은 전체 차원 벡터 파일에서, 그 밖에는 인덱스에서 꺼낸다."""
+    if index.d < dim:
+        return np.asarray(get_full_vectors(index_path, n_chunks, dim)[ids], dtype="float32")
+    return index.reconstruct_batch(ids)
+
+def diversify_hits(vec: np.ndarray, hits: List[Tuple[int, float]], corpora: list, top_k: int,
+                   lambda_: float) -> List[Tuple[int, float]]:
+    """넉넉히 가져온 hits에서 MMR로 top_k개를 고른다.
+    corpora = [(청크 번호 시작, 인덱스, 인덱스 경로, 청크 수)] — 오버레이면 세션과 공용 두 개다."""
+    if len(hits) <= 1:
+        return hits[:top_k]
+    vectors = np.empty((len(hits), vec.shape[1]), dtype="float32")
+    for start, index, index_path, n_chunks in corpora:
+        pos = [p for p, (idx, _) in enumerate(hits) if start <= idx < start + n_chunks]
+        if pos:
+            ids = np.asarray([hits[p][0] - start for p in pos], dtype="int64")
+            vectors[pos] = chunk_vectors(index, ids, index_path, n_chunks, vec.shape[1])
+    return mmr.diversify(vec[0], hits, vectors, top_k, lambda_)
+
+# 여러 말뭉치(공용 + 세션)를 동시에 검색할 때 쓰는 스레드 풀. FAISS 검색은 GIL을 놓으므로 실제로 병렬로 돈다.
+_search_pool = ThreadPoolExecutor(max_workers=config.SEARCH_THREADS, thread_name_prefix="search")
+
+def retrieve(q: str, top_k: int, mode: str, session_id: Optional[str], index_path: str, text_path: str,
+             overlay: bool = False, mmr_lambda: Optional[float] = None
+             ) -> Tuple[list, List[Tuple[int, float]], Optional[list], Optional[dict]]:
+    """mode에 따라 검색하고 (청크 목록, [(청크 번호, 점수)], 청크 메타데이터, 오버레이 정보)를 반환한다.
+    lexical 모드는 임베딩 API를 호출하지 않는다.
+
+    overlay=True면 공용 말뭉치와 세션 말뭉치를 병렬로 검색해 점수 순으로 top_k를 합친다 (공용 벡터는 복사하지 않음).
+    이때 청크 목록은 [세션 청크..., 공용 청크...]이고, 공용 청크 번호는 base_offset만큼 밀린다.
+    공용 인덱스가 아직 구축 중(또는 비어 있음)이면 세션 결과만 돌려주고 오버레이 정보에 global_ready=False를 남긴다.
+
+    mmr_lambda가 있으면 후보를 top_k × MMR_FETCH_FACTOR개 가져와 MMR로 top_k개를 고른다 (lexical 모드는 질문 벡터가 없어 그대로)."""
+    if mode not in config.SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 검색 모드: {mode} (vector, lexical, hybrid 중 선택)")
+    need_index = mode != "lexical"
+    use_mmr = mmr_lambda is not None and need_index
+    fetch_k = top_k * max(config.MMR_FETCH_FACTOR, 1) if use_mmr else top_k
+    if not (overlay and session_id):
+        index, chunks = load_search_corpus(session_id, index_path, text_path, need_index=need_index)
+        vec = embed_text(q) if need_index else None
+        hits = search_corpus(q, vec, fetch_k, mode, session_id, index_path, text_path, index, chunks)
+        if use_mmr:
+            hits = diversify_hits(vec, hits, [(0, index, index_path, len(chunks))], top_k, mmr_lambda)
+        return chunks, hits, load_chunk_meta(session_id, index_path, len(chunks)), None
+
+    base_error = None
+    try:
+        base_index, base_chunks = load_search_corpus(None, config.INDEX_PATH, config.TEXT_PATH, need_index=need_index)
+    except HTTPException as e:
+        if e.status_code not in (404, 503):
+            raise
+        base_error, base_index, base_chunks = e, None, []  # 공용 인덱스 구축 중: 세션 말뭉치만 본다
+    try:
+        own_index, own_chunks = load_search_corpus(session_id, index_path, text_path, need_index=need_index)
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+        own_index, own_chunks = None, []  # 아직 업로드가 없는 세션은 공용 말뭉치만 본다
+    if base_error is not None and not own_chunks:
+        raise base_error
+    vec = embed_text(q) if need_index else None
+
+    base_job = _search_pool.submit(search_corpus, q, vec, fetch_k, mode, None, config.INDEX_PATH, config.TEXT_PATH,
+                                   base_index, base_chunks) if base_chunks else None
+    own_hits = search_corpus(q, vec, fetch_k, mode, session_id, index_path, text_path, own_index, own_chunks) if own_chunks else []
+    base_hits = base_job.result() if base_job else []
+
+    offset = len(own_chunks)
+    merged = heapq.nlargest(fetch_k, own_hits + [(idx + offset, score) for idx, score in base_hits], key=lambda h: h[1])
+    if use_mmr:
+        merged = diversify_hits(vec, merged, [(0, own_index, index_path, offset),
+                                              (offset, base_index, config.INDEX_PATH, len(base_chunks))], top_k, mmr_lambda)
+    own_meta = load_chunk_meta(session_id, index_path, len(own_chunks)) if own_chunks else []
+    base_meta = load_chunk_meta(None, config.INDEX_PATH, len(base_chunks)) if base_chunks else []
+    meta = (own_meta or [{}] * len(own_chunks)) + (base_meta or [{}] * len(base_chunks))
+    overlay_info = {
+        "base_offset": offset,
+        "session_hits": sum(1 for idx, _ in merged if idx < offset),
+        "base_hits": sum(1 for idx, _ in merged if idx >= offset),
+        "global_ready": base_error is None,
+    }
+    return own_chunks + base_chunks, merged, meta, overlay_info
+
+# 여러 세션 동시 검색(/admin/search) 전용 풀. 느린 샤드가 오버레이 검색 풀을 붙잡지 않도록 따로 둔다.
+_shard_pool = ThreadPoolExecutor(max_workers=config.SHARD_SEARCH_THREADS, thread_name_prefix="shard")
+
+def search_session_shard(session_id: str, q: str, vec: Optional[np.ndarray], top_k: int, mode: str) -> List[tuple]:
+    """세션 하나를 검색해 [(청크 번호, 점수, 텍스트, 출처)]를 반환한다 (샤드 작업 단위)."""
+    index_path, text_path = get_paths_for_session(session_id)
+    index, chunks = load_search_corpus(session_id, index_path, text_path, need_index=mode != "lexical")
+    hits = search_corpus(q, vec, top_k, mode, session_id, index_path, text_path, index, chunks)
+    meta = load_chunk_meta(session_id, index_path, len(chunks)) or []
+    return [(idx, score, chunks[idx], meta[idx].get("source") if idx < len(meta) else None) for idx, score in hits]
+
 # ---------- API 라우트 ─────────────────────────────
 @app.get("/")
 async def read_root():
@@ -216,25 +1059,137 @@ def get_session_id_from(req: Request, body: Optional[dict] = None) -> Optional[s
         sid = str(sid).strip()
     return sid or None
 
-def append_index_for_paths(chunks: list, index_path: str, text_path: str, session_id: Optional[str] = None) -> dict:
-    """기존 인덱스가 있으면 새로운 청크만 임베딩하여 추가하고, 없으면 새로 생성한다."""
+def parse_mmr(body: dict) -> Optional[float]:
+    """요청의 MMR 설정 (mmr, mmr_lambda). 끄면 None, 켜면 λ (0~1).
+    mmr은 true/false 또는 같은 뜻의 문자열("true", "false", "1", "0")만 받는다 ("false"가 켜지지 않도록)."""
+    enabled = body.get("mmr", config.MMR_ENABLED)
+    if isinstance(enabled, str) and enabled.strip().lower() in ("1", "true", "yes", "0", "false", "no"):
+        enabled = enabled.strip().lower() in ("1", "true", "yes")
+    if not isinstance(enabled, bool):
+        raise HTTPException(status_code=400, detail="mmr은 true 또는 false여야 합니다.")
+    if not enabled:
+        return None
+    value = body.get("mmr_lambda", config.MMR_LAMBDA)
+    try:
+        lambda_ = float(value) if not isinstance(value, bool) else math.nan
+    except (TypeError, ValueError):
+        lambda_ = math.nan
+    if not 0.0 <= lambda_ <= 1.0:
+        raise HTTPException(status_code=400, detail="mmr_lambda는 0과 1 사이여야 합니다.")
+    return lambda_
+
+def summarize_dedup(pairs: list, duplicates: list, max_links: int = 50) -> dict:
+    """업로드별 중복 제거 통계. links는 건너뛴 청크가 어떤 기존 청크 id와 겹쳤는지 보여준다."""
+    by_source: Dict[str, dict] = {}
+    for _, src in pairs:
+        by_source.setdefault(src or "", {"chunks": 0, "duplicates": 0})["chunks"] += 1
+    for pos, _, _ in duplicates:
+        by_source[pairs[pos][1] or ""]["duplicates"] += 1
+    return {
+        "checked": len(pairs),
+        "duplicates": len(duplicates),
+        "ratio": round(len(duplicates) / len(pairs), 4) if pairs else 0.0,
+        "by_source": by_source,
+        "links": [
+            {"source": pairs[pos][1], "duplicate_of": cid, "similarity": round(sim, 3)}
+            for pos, cid, sim in duplicates[:max_links]
+        ],
+    }
+
+def append_index_for_paths(chunks: list, index_path: str, text_path: str, session_id: Optional[str] = None,
+                           sources: Optional[list] = None) -> dict:
+    """기존 인덱스가 있으면 새로운 청크만 임베딩하여 추가하고, 없으면 새로 생성한다.
+    sources는 청크별 출처(파일명)로, 컨텍스트 조립 시 이웃 청크 병합에 쓰인다.
+    세션 인덱스는 청크 id(= text_chunks.txt 안의 위치)를 가진 IndexIDMap2로 저장한다.
+
+    같은 말뭉치에 동시에 들어온 추가 요청은 그룹 커밋으로 묶여 인덱스 변경/저장을 한 번만 하고,
+    각 요청은 자기 청크가 담긴 배치가 커밋(버전 포인터 갱신)된 뒤에 반환된다.
+    배치를 기다리는 동안 블록되므로 async 핸들러에서는 스레드로 넘겨 부른다 (이벤트 루프에서 부르면 묶이지 않는다)."""
+    return _append_committer.submit(index_path, (chunks, sources, text_path, session_id))
+
+def _apply_append_batch(index_path: str, items: list) -> List[dict]:
+    """그룹 커밋 배치 하나를 적용한다. items: [(chunks, sources, text_path, session_id)]"""
+    _, _, text_path, session_id = items[0]
+    with session_lock(session_id):
+        return _append_index_locked([(chunks, sources) for chunks, sources, _, _ in items], index_path, text_path, session_id)
+
+def _append_index_locked(groups: List[Tuple[list, Optional[list]]], index_path: str, text_path: str,
+                         session_id: Optional[str]) -> List[dict]:
+    """요청(그룹)별 (청크, 출처)를 한 번에 추가하고 요청별 결과를 같은 순서로 돌려준다."""
     try:
         Path(index_path).parent.mkdir(parents=True, exist_ok=True)
         Path(text_path).parent.mkdir(parents=True, exist_ok=True)
+        # group_pairs[g] = 요청 g의 [(청크, 출처)], owner[pos] = 전체 목록의 pos번째 청크가 속한 요청,
+        # inputs[pos] = 그 청크가 요청 안에서 몇 번째로 들어온 청크였는지 (빈 청크/중복을 빼도 따라간다)
+        group_pairs, group_inputs = [], []
+        for chunks, sources in groups:
+            if sources is None:
+                sources = [None] * len(chunks)
+            pairs = [(storable_chunk(c), src) for c, src in zip(chunks, sources)]
+            kept = [i for i, (c, _) in enumerate(pairs) if c]
+            group_pairs.append([pairs[i] for i in kept])
+            group_inputs.append(kept)
+        pairs = [p for gp in group_pairs for p in gp]
+        owner = [g for g, gp in enumerate(group_pairs) for _ in gp]
+        inputs = [i for gi in group_inputs for i in gi]
+        chunks = [c for c, _ in pairs]
 
         s3 = get_s3_store()
         index = None
         current_total = 0
+        committed = read_version(session_id, index_path)
+        # 커밋된 로컬 세션은 base를 읽지 않고 새 벡터만 로그에 덧붙인다 (추가 비용이 전체 벡터 수와 무관).
+        use_log = bool(session_id) and not s3 and committed is not None and Path(index_path).exists()
         if session_id and s3:
             # 원격에서 읽기 시도
             if s3.exists(session_id, "index.faiss"):
                 index = s3.get_faiss(session_id, "index.faiss")
                 current_total = index.ntotal
-        else:
+        elif not use_log:
             index_exists = Path(index_path).exists()
             if index_exists:
                 index = faiss.read_index(index_path)
                 current_total = index.ntotal
+        # 다른 임베딩 백엔드로 만든 인덱스에는 섞어 넣지 않는다 (임베딩 비용을 쓰기 전에 확인).
+        # 로그에 덧붙이는 세션은 base를 읽지 않으므로 헤더의 차원으로 비교한다.
+        base_dim = vector_log.index_dim(index_path) if use_log else None
+        embedding = check_embedding(session_id, index_path, index.d if index is not None else base_dim)
+        ts = load_tombstones(session_id, index_path) if session_id else Tombstones()
+        if committed is not None:
+            # 커밋된 버전이 기준: 이전 쓰기가 중간에 멈춘 흔적은 지우고, 다음 id는 커밋된 청크 수부터.
+            index = recover_uncommitted(session_id, index_path, text_path, committed, index)
+            current_total = committed["chunks"]
+        else:
+            # 포인터가 없는 예전 말뭉치: 압축으로 인덱스에서 빠진 청크도 id는 차지하므로 그만큼 뒤에서 시작한다.
+            current_total += ts.purged_count
+
+        # 근사 중복 제거: 이미 있는 청크(또는 같은 배치의 앞 청크)와 거의 같은 청크는 임베딩하지 않는다.
+        dedup_infos: List[Optional[dict]] = [None] * len(groups)
+        duplicate_inputs: List[List[int]] = [[] for _ in groups]
+        nd = None
+        if config.NEAR_DUP_ENABLED and chunks:
+            nd, nd_rewrite = load_near_dup_index(index_path, text_path, current_total, session_id=session_id)
+            keep, keep_sigs, duplicates = near_dup.filter_duplicates(nd, chunks, config.NEAR_DUP_THRESHOLD,
+                                                                       exclude=ts if len(ts) else None)
+            offsets = [0]
+            for gp in group_pairs:
+                offsets.append(offsets[-1] + len(gp))
+            for g, gp in enumerate(group_pairs):
+                dedup_infos[g] = summarize_dedup(gp, [(pos - offsets[g], cid, sim) for pos, cid, sim in duplicates if owner[pos] == g])
+            for pos, _, _ in duplicates:
+                duplicate_inputs[owner[pos]].append(inputs[pos])
+            pairs = [pairs[i] for i in keep]
+            owner = [owner[i] for i in keep]
+            inputs = [inputs[i] for i in keep]
+            chunks = [c for c, _ in pairs]
+            if duplicates:
+                print(f"🧹 근사 중복 청크 {len(duplicates)}개 건너뜀 (비율 {len(duplicates) / len(keep + duplicates):.1%})")
+
+        # 토큰 수는 업로드 시 한 번만 계산해 저장한다 (검색마다 다시 세지 않도록)
+        meta_lines = "".join(
+            json.dumps({"source": src, "tokens": tokens.count_tokens(c), "hash": chunk_hash(c)}, ensure_ascii=False) + "\n"
+            for c, src in pairs
+        )
 
         if not chunks:
             size_mb = 0.0
@@ -243,45 +1198,137 @@ def append_index_for_paths(chunks: list, index_path: str, text_path: str, sessio
                 size_mb = 0.0
             else:
                 size_mb = (os.path.getsize(index_path) / (1024 * 1024)) if Path(index_path).exists() else 0.0
-            return {"total_chunks": current_total, "new_chunks": 0, "index_size_mb": size_mb}
-
-        # 새로운 청크 임베딩
-        print(f"➕ 새 청크 {len(chunks)}개 임베딩 추가 중…")
-        new_embeds = []
-        for i, chunk in enumerate(chunks, 1):
-            if i % 10 == 0:
-                print(f"진행률: {i}/{len(chunks)}")
-            emb = client.embeddings.create(input=chunk, model=config.EMBED_MODEL).data[0].embedding
-            new_embeds.append(emb)
-
-        new_embeds = np.array(new_embeds, dtype='float32')
-
-        # 인덱스에 추가 또는 새로 생성
-        if index is None:
+            return [{"total_chunks": current_total - len(ts), "new_chunks": 0, "index_size_mb": size_mb, "dedup": dedup_infos[g],
+                     "chunk_ids": [None] * len(groups[g][0]), "duplicate_inputs": duplicate_inputs[g]} for g in range(len(groups))]
+
+        # 새로운 청크 임베딩 (백엔드가 배치로 나눠 호출한다)
+        print(f"➕ 새 청크 {len(chunks)}개 임베딩 추가 중… ({get_embedder().name})" + (f" (요청 {len(groups)}개 묶음)" if len(groups) > 1 else ""))
+        new_embeds = np.asarray(embed_texts(chunks), dtype="float32")
+        full_dim = new_embeds.shape[1]
+
+        # 축소 차원 세션(2단계 검색): 전체 벡터는 옆 파일에, 인덱스/로그에는 앞 search_dim 차원만 넣는다.
+        # 새 로컬 세션 인덱스에만 켜고, 이후에는 기록(embedding.json)을 따른다.
+        new_index = session_id and not s3 and not Path(index_path).exists()
+        if embedding is not None:
+            search_dim = embedding.get("search_dim")
+        else:
+            search_dim = config.EMBED_SEARCH_DIM if new_index and 0 < config.EMBED_SEARCH_DIM < full_dim else None
+        if use_log and (search_dim or full_dim) != base_dim:
+            # 기록도 임베더 차원도 없어 위에서 거르지 못한 경우: 어떤 파일도 쓰기 전에 막는다
+            raise HTTPException(status_code=409, detail=f"인덱스 차원({base_dim})과 새 임베딩 차원({search_dim or full_dim})이 다릅니다.")
+        if search_dim:
+            full_vectors.write_rows(full_vectors.path_for(index_path), current_total, new_embeds)
+            new_embeds = full_vectors.truncate(new_embeds, search_dim)
+
+        # 인덱스에 추가 또는 새로 생성 (로그를 쓰는 세션은 아래에서 로그에만 덧붙인다)
+        new_ids = np.arange(current_total, current_total + len(chunks), dtype="int64")
+        if use_log:
+            pass
+        elif session_id:
+            index = to_id_map(index) if index is not None else faiss.IndexIDMap2(faiss.IndexFlatIP(new_embeds.shape[1]))
+            index.add_with_ids(new_embeds, new_ids)
+        elif index is None:
             dim = new_embeds.shape[1]
             index = faiss.IndexFlatIP(dim)
             index.add(new_embeds)
         else:
             index.add(new_embeds)
 
-        # 저장: S3 우선, 없으면 로컬
+        # 저장 순서: 텍스트/메타 append → BM25/서명 → 인덱스 교체(또는 벡터 로그 append) → 버전 포인터 (= 커밋).
+        # 포인터를 올리기 전까지 검색은 이전 버전만 보고, 중간에 멈추면 다음 쓰기가 꼬리를 잘라낸다.
         if session_id and s3:
-            s3.put_faiss(session_id, "index.faiss", index)
-            # 텍스트 append
             s3.append_text(session_id, "text_chunks.txt", "".join([c + "\n\n" for c in chunks]))
-            size_mb = 0.0
+            s3.append_text(session_id, "chunk_meta.jsonl", meta_lines)
         else:
-            faiss.write_index(index, index_path)
             with open(text_path, 'a', encoding='utf-8') as f:
                 for chunk in chunks:
                     f.write(chunk + '\n\n')
-            size_mb = os.path.getsize(index_path) / (1024 * 1024)
+            with open(get_meta_path(index_path), 'a', encoding='utf-8') as f:
+                f.write(meta_lines)
 
-        total = current_total + len(chunks)
-        return {"total_chunks": total, "new_chunks": len(chunks), "index_size_mb": size_mb}
+        # BM25 색인은 임베딩 없이 만들 수 있으므로 실패해도 업로드는 성공시키고, 검색 시 재구성한다.
+        try:
+            append_lexical_for_paths(chunks, index_path, text_path, current_total, session_id=session_id)
+        except Exception as e:
+            print(f"⚠️ BM25 색인 갱신 실패 (검색 시 재구성): {e}")
+
+        if nd is not None:
+            try:
+                save_near_dup_index(nd, keep_sigs, nd_rewrite, index_path, session_id=session_id)
+            except Exception as e:
+                print(f"⚠️ 근사 중복 서명 저장 실패 (다음 업로드 때 재계산): {e}")
+
+        if session_id and s3:
+            s3.put_faiss(session_id, "index.faiss", index)
+            size_mb = 0.0
+        elif use_log:
+            log_size = vector_log.append(get_vector_log_path(index_path), new_ids, new_embeds)
+            size_mb = (os.path.getsize(index_path) + log_size) / (1024 * 1024)
+        else:
+            write_index_file(index, index_path)
+            size_mb = os.path.getsize(index_path) / (1024 * 1024)
+        if embedding is None:
+            # 새 인덱스(또는 기록이 없던 예전 인덱스)에 만든 백엔드/차원을 남긴다 (커밋 전에)
+            record = embedders.embedding_record(get_embedder(), full_dim)
+            if search_dim:
+                record["search_dim"] = int(search_dim)
+            write_embedding_record(session_id, index_path, record)
+        version = publish_version(session_id, index_path, text_path, committed, current_total + len(chunks))
+        if use_log and vector_log_needs_merge(index_path):
+            schedule_log_merge(session_id)
+
+        # 요청별로 들어온 청크 순서대로의 청크 id (빈 청크/중복으로 빠진 청크는 None) — 카탈로그 범위에 쓴다.
+        chunk_ids: List[List[Optional[int]]] = [[None] * len(group_chunks) for group_chunks, _ in groups]
+        new_counts = [0] * len(groups)
+        for cid, (g, i) in enumerate(zip(owner, inputs), start=current_total):
+            chunk_ids[g][i] = cid
+            new_counts[g] += 1
+
+        total = current_total + len(chunks) - len(ts)
+        return [{"total_chunks": total, "new_chunks": new_counts[g], "index_size_mb": size_mb, "dedup": dedup_infos[g],
+                 "chunk_ids": chunk_ids[g], "duplicate_inputs": duplicate_inputs[g], "version": version["version"], "batched_requests": len(groups)}
+                for g in range(len(groups))]
+    except HTTPException:
+        raise
+    except CallFailed as e:
+        raise embedding_unavailable(e)
+    except Rejected as e:
+        raise upstream_rejected(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"인덱스 추가 오류: {str(e)}")
 
+# 같은 말뭉치에 동시에 들어온 추가 요청을 묶어 인덱스 저장/커밋을 한 번만 한다.
+_append_committer = GroupCommitter(_apply_append_batch, window_seconds=config.GROUP_COMMIT_WINDOW_MS / 1000,
+                                   max_items=config.GROUP_COMMIT_MAX_REQUESTS)
+
+def record_files(session_id: Optional[str], entries: list, index_info: dict):
+    """업로드된 파일 항목에 청크 범위를 붙여 카탈로그에 추가한다 (entries에 id도 채움).
+    entries의 "chunks"는 추가 요청에 넘긴 순서대로의 파일별 청크 수이고, 실제로 색인된 청크 수로 바뀐다.
+    파일 이름이 같아도 항목마다 따로 범위와 중복 수를 잡는다."""
+    sid = session_id or ""
+    chunk_ids = index_info.get("chunk_ids") or []
+    duplicate_inputs = index_info.get("duplicate_inputs") or []
+    offset = 0
+    for entry in entries:
+        end = offset + entry["chunks"]
+        kept = [cid for cid in chunk_ids[offset:end] if cid is not None]
+        if index_info.get("dedup"):
+            entry["duplicates"] = sum(offset <= i < end for i in duplicate_inputs)
+        offset = end
+        entry["chunks"] = len(kept)
+        if kept:
+            entry["chunk_start"], entry["chunk_end"] = kept[0], kept[-1] + 1
+    ids = get_catalog(sid).add_files(sid, entries)
+    for entry, file_id in zip(entries, ids):
+        entry["id"] = file_id
+
+# /search, /search-stream의 검색(질문 임베딩 포함)과 답변 생성 호출은 이 풀에서 돈다.
+# asyncio 기본 실행기(코어 수 + 4 스레드)보다 많은 검색이 동시에 진행되어야 질문 임베딩이 마이크로 배치로 묶인다.
+_request_pool = ThreadPoolExecutor(max_workers=config.SEARCH_REQUEST_THREADS, thread_name_prefix="request")
+
+async def in_request_pool(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(_request_pool, functools.partial(fn, *args, **kwargs))
+
 @app.post("/search")
 async def search(req: Request):
     """RAG 검색을 수행하고 GPT 답변과 참조 문서를 반환한다."""
@@ -295,55 +1342,35 @@ async def search(req: Request):
         temp  = float(body.get("temperature", 0.7))
         sys_p = body.get("system_prompt", "다음 문단들을 참고하여 사용자의 질문에 명확하고 간결하게 답변해주세요.")
         session_id = get_session_id_from(req, body)
+        lifecycle.touch(session_id)
         index_path, text_path = get_paths_for_session(session_id)
         local_ctx = body.get("local_context")
+        mode  = body.get("mode") or config.DEFAULT_SEARCH_MODE
+        token_budget = parse_token_budget(body)
+        overlay = bool(body.get("overlay", config.OVERLAY_BASE_CORPUS))
+        mmr_lambda = parse_mmr(body)
         
         if not q:
             raise HTTPException(status_code=400, detail="질문이 비어있습니다.")
         
         # 세션 기반 경로가 지정되었지만 아직 업로드된 문서가 없는 경우, 명확한 안내 제공
-        if session_id and (not Path(index_path).exists() or not Path(text_path).exists()):
+        if session_id and not overlay and (not Path(index_path).exists() or not Path(text_path).exists()):
             if not local_ctx:
                 raise HTTPException(status_code=404, detail="현재 세션에 업로드된 문서가 없습니다. 문서를 먼저 업로드하거나 세션을 초기화하세요.")
         
         # 1. Retrieval or fallback to local context
         used_local = False
+        overlay_info = None
         if local_ctx:
-            top_chunks = [c for c in str(local_ctx).split("\n\n") if c.strip()][:top_k]
+            chunks = [c for c in str(local_ctx).split("\n\n") if c.strip()][:top_k]
+            hits = [(i, 0.0) for i in range(len(chunks))]
+            meta = None
             used_local = True
         else:
-            vec = embed_text(q)
-            s3 = get_s3_store()
-            if session_id and s3:
-                # 세션 + S3: 원격에서 로드
-                if not s3.exists(session_id, "index.faiss") or not s3.exists(session_id, "text_chunks.txt"):
-                    raise HTTPException(status_code=404, detail="현재 세션에 업로드된 문서가 없습니다. 문서를 먼저 업로드하세요.")
-                try:
-                    index = s3.get_faiss(session_id, "index.faiss")
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"S3에서 인덱스를 불러오는 중 오류: {e}")
-                try:
-                    import re
-                    content = s3.get_text(session_id, "text_chunks.txt")
-                    parts = re.split(r"\n{2,}", content)
-                    chunks = [c.strip() for c in parts if c.strip()]
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"S3에서 텍스트를 불러오는 중 오류: {e}")
-            else:
-                try:
-                    index = faiss.read_index(index_path)
-                except Exception as e:
-                    raise HTTPException(status_code=404, detail=f"인덱스 파일을 읽을 수 없습니다. 문서를 먼저 업로드하세요. ({e})")
-                try:
-                    chunks = load_chunks(path=text_path)
-                except FileNotFoundError:
-                    raise HTTPException(status_code=404, detail="텍스트 조각 파일이 없습니다. 문서를 먼저 업로드하세요.")
-            if len(chunks) == 0 or index.ntotal == 0:
-                raise HTTPException(status_code=500, detail="검색 가능한 문서가 없습니다. 먼저 문서를 업로드하거나 말뭉치를 구축하세요.")
-            k = min(top_k, index.ntotal, len(chunks))
-            D, I = index.search(vec, k)
-            valid_pairs = [(rank, idx, float(D[0][rank])) for rank, idx in enumerate(I[0]) if 0 <= idx < len(chunks)]
-            top_chunks = [chunks[idx] for _, idx, _ in valid_pairs]
+            chunks, hits, meta, overlay_info = await in_request_pool(
+                retrieve, q, top_k, mode, session_id, index_path, text_path, overlay=overlay, mmr_lambda=mmr_lambda)
+        items, context_stats = assemble_context(hits, chunks, meta, token_budget)
+        top_chunks = [it["text"] for it in items]
 
         # 2. Generation
         ctx = "\n\n".join(top_chunks)
@@ -351,19 +1378,13 @@ async def search(req: Request):
             {"role": "system", "content": sys_p},
             {"role": "user", "content": f"{ctx}\n\n질문: {q}"}
         ]
-        res = client.chat.completions.create(model=config.CHAT_MODEL, messages=messages, temperature=temp)
+        try:
+            res = await in_request_pool(create_chat_completion, messages, temperature=temp)
+        except Rejected as e:
+            raise upstream_rejected(e)
         ans = res.choices[0].message.content.strip()
 
-        if used_local:
-            top_chunks_payload = [
-                {"rank": r + 1, "text": text, "distance": 0.0}
-                for r, text in enumerate(top_chunks)
-            ]
-        else:
-            top_chunks_payload = [
-                {"rank": r + 1, "text": chunks[idx], "distance": dist}
-                for r, (_, idx, dist) in enumerate(valid_pairs)
-            ]
+        top_chunks_payload = chunks_payload(items, "local" if used_local else mode)
 
         return {
             "question": q,
@@ -371,9 +1392,15 @@ async def search(req: Request):
             "temperature": temp,
             "system_prompt": sys_p,
             "session_id": session_id,
+            "mode": "local" if used_local else mode,
             "top_chunks": top_chunks_payload,
+            "context": context_stats,
+            "overlay": overlay_info,
+            "mmr_lambda": mmr_lambda,
             "gpt_answer": ans
         }
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Faiss 인덱스 또는 텍스트 파일을 찾을 수 없습니다.")
     except Exception as e:
@@ -390,6 +1417,8 @@ async def search_stream(req: Request):
     # generator 밖에서 먼저 body 파싱 (중요!)
     body = await req.json()
     session_id_header = req.headers.get("X-Session-Id")
+    token_budget = parse_token_budget(body)  # 잘못된 요청은 스트림을 열기 전에 400
+    mmr_lambda = parse_mmr(body)
 
     async def generate():
         try:
@@ -401,64 +1430,35 @@ async def search_stream(req: Request):
             temp = float(body.get("temperature", 0.7))
             sys_p = body.get("system_prompt", "다음 문단들을 참고하여 사용자의 질문에 명확하고 간결하게 답변해주세요.")
             session_id = get_session_id_from(req, body)
+            lifecycle.touch(session_id)
             index_path, text_path = get_paths_for_session(session_id)
             local_ctx = body.get("local_context")
+            mode = body.get("mode") or config.DEFAULT_SEARCH_MODE
+            overlay = bool(body.get("overlay", config.OVERLAY_BASE_CORPUS))
 
             if not q:
                 yield f"data: {json.dumps({'error': '질문이 비어있습니다.'}, ensure_ascii=False)}\n\n"
                 return
 
             # 1. Retrieval
-            used_local = False
             if local_ctx:
-                top_chunks = [c for c in str(local_ctx).split("\n\n") if c.strip()][:top_k]
-                used_local = True
+                chunks = [c for c in str(local_ctx).split("\n\n") if c.strip()][:top_k]
+                hits = [(i, 0.0) for i in range(len(chunks))]
+                meta = None
             else:
-                vec = embed_text(q)
-                s3 = get_s3_store()
-                if session_id and s3:
-                    if not s3.exists(session_id, "index.faiss") or not s3.exists(session_id, "text_chunks.txt"):
-                        yield f"data: {json.dumps({'error': '현재 세션에 업로드된 문서가 없습니다.'}, ensure_ascii=False)}\n\n"
-                        return
-                    index = s3.get_faiss(session_id, "index.faiss")
-                    import re
-                    content = s3.get_text(session_id, "text_chunks.txt")
-                    parts = re.split(r"\n{2,}", content)
-                    chunks = [c.strip() for c in parts if c.strip()]
-                else:
-                    try:
-                        index = faiss.read_index(index_path)
-                    except Exception:
-                        yield f"data: {json.dumps({'error': '인덱스 파일을 읽을 수 없습니다.'}, ensure_ascii=False)}\n\n"
-                        return
-                    try:
-                        chunks = load_chunks(path=text_path)
-                    except FileNotFoundError:
-                        yield f"data: {json.dumps({'error': '텍스트 조각 파일이 없습니다.'}, ensure_ascii=False)}\n\n"
-                        return
-
-                if len(chunks) == 0 or index.ntotal == 0:
-                    yield f"data: {json.dumps({'error': '검색 가능한 문서가 없습니다.'}, ensure_ascii=False)}\n\n"
+                try:
+                    chunks, hits, meta, _ = await in_request_pool(
+                        retrieve, q, top_k, mode, session_id, index_path, text_path, overlay=overlay, mmr_lambda=mmr_lambda)
+                except HTTPException as e:
+                    yield f"data: {json.dumps({'error': e.detail}, ensure_ascii=False)}\n\n"
                     return
-
-                k = min(top_k, index.ntotal, len(chunks))
-                D, I = index.search(vec, k)
-                valid_pairs = [(rank, idx, float(D[0][rank])) for rank, idx in enumerate(I[0]) if 0 <= idx < len(chunks)]
-                top_chunks = [chunks[idx] for _, idx, _ in valid_pairs]
+            items, context_stats = assemble_context(hits, chunks, meta, token_budget)
+            top_chunks = [it["text"] for it in items]
 
             # 참조 문서 먼저 전송
-            if used_local:
-                top_chunks_payload = [
-                    {"rank": r + 1, "text": text, "distance": 0.0}
-                    for r, text in enumerate(top_chunks)
-                ]
-            else:
-                top_chunks_payload = [
-                    {"rank": r + 1, "text": chunks[idx], "distance": dist}
-                    for r, (_, idx, dist) in enumerate(valid_pairs)
-                ]
+            top_chunks_payload = chunks_payload(items, "local" if local_ctx else mode)
 
-            yield f"data: {json.dumps({'type': 'chunks', 'chunks': top_chunks_payload}, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'type': 'chunks', 'chunks': top_chunks_payload, 'context': context_stats}, ensure_ascii=False)}\n\n"
 
             # 2. GPT 스트리밍 생성
             ctx = "\n\n".join(top_chunks)
@@ -467,18 +1467,17 @@ async def search_stream(req: Request):
                 {"role": "user", "content": f"{ctx}\n\n질문: {q}"}
             ]
 
-            stream = client.chat.completions.create(
-                model=config.CHAT_MODEL,
-                messages=messages,
-                temperature=temp,
-                stream=True
-            )
+            stream = await in_request_pool(create_chat_completion, messages, temperature=temp, stream=True)
 
-            for chunk in stream:
+            # 동기 스트림은 다음 조각이 올 때까지 블록되므로 조각마다 요청 풀에서 꺼낸다 (이벤트 루프를 막지 않도록)
+            pieces = iter(stream)
+            while True:
+                chunk = await in_request_pool(next, pieces, None)
+                if chunk is None:
+                    break
                 if chunk.choices[0].delta.content is not None:
                     content = chunk.choices[0].delta.content
                     yield f"data: {json.dumps({'type': 'token', 'content': content}, ensure_ascii=False)}\n\n"
-                    await asyncio.sleep(0)  # 다른 태스크에 제어권 양도
 
             # 완료 신호
             yield f"data: {json.dumps({'type': 'done'}, ensure_ascii=False)}\n\n"
@@ -489,79 +1488,85 @@ async def search_stream(req: Request):
     return StreamingResponse(generate(), media_type="text/event-stream")
 
 @app.get("/files")
-async def list_files(req: Request, session_id: Optional[str] = None):
-    """업로드된 파일 목록 조회"""
+async def list_files(req: Request, session_id: Optional[str] = None, limit: int = 100, cursor: Optional[int] = None):
+    """업로드된 파일 목록 조회 (cursor: 이전 응답의 next_cursor)"""
     try:
-        import json
         sid = session_id or req.headers.get("X-Session-Id") or ""
-        index_path, text_path = get_paths_for_session(sid)
-        metadata_path = os.path.join(os.path.dirname(index_path), "files.json")
-
-        print(f"📂 [DEBUG /files] Session ID: {sid}")
-        print(f"📂 [DEBUG /files] Metadata path: {metadata_path}")
-        print(f"📂 [DEBUG /files] File exists: {os.path.exists(metadata_path)}")
-
-        files_list = []
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    files_list = json.load(f)
-                print(f"📂 [DEBUG /files] Loaded {len(files_list)} files")
-                print(f"📂 [DEBUG /files] Files: {files_list}")
-            except Exception as e:
-                print(f"❌ [DEBUG /files] Error loading: {e}")
-
-        print(f"📤 [DEBUG /files] Returning {len(files_list)} files")
-        return JSONResponse({"files": files_list, "session_id": sid})
+        limit = max(1, min(limit, config.FILES_PAGE_MAX))
+        lifecycle.touch(sid)
+        catalog = get_catalog(sid)
+        files_list, next_cursor = catalog.list_files(sid, limit=limit, cursor=cursor)
+        session = catalog.get_session(sid)
+        return JSONResponse({
+            "files": files_list,
+            "session_id": sid,
+            "total": session["file_count"] if session else 0,
+            "next_cursor": next_cursor,
+        })
     except Exception as e:
-        print(f"❌ [DEBUG /files] Exception: {e}")
+        print(f"❌ [/files] 파일 목록 조회 실패: {e}")
         return JSONResponse(status_code=500, content={"message": f"파일 목록 조회 실패: {e}"})
 
 @app.delete("/files/{filename}")
 async def delete_file(req: Request, filename: str, session_id: Optional[str] = None):
-    """특정 파일 삭제"""
+    """특정 파일 삭제. 파일의 청크 범위를 삭제 표시(tombstone)하고 검색에서 걸러낸다 (재임베딩 없음).
+    인덱스에 남은 삭제 청크가 임계치를 넘으면 백그라운드 압축으로 공간을 회수한다."""
     try:
         sid = session_id or req.headers.get("X-Session-Id") or ""
-        s3 = get_s3_store()
-
-        if sid and s3:
-            # S3에서 파일 삭제
-            s3.delete_file(sid, filename)
-            return JSONResponse({"message": f"파일 '{filename}' 삭제 완료"})
-        else:
-            return JSONResponse(status_code=400, content={"message": "로컬 모드에서는 개별 파일 삭제가 지원되지 않습니다."})
+        if not sid:
+            return JSONResponse(status_code=400, content={"message": "공용 말뭉치는 파일 단위 삭제를 지원하지 않습니다. 세션 ID를 지정하세요."})
+        lifecycle.touch(sid)
+        index_path, _ = get_paths_for_session(sid)
+        catalog = get_catalog(sid)
+        entries = catalog.find_files(sid, filename)
+        if not entries:
+            return JSONResponse(status_code=404, content={"message": f"파일 '{filename}'을(를) 찾을 수 없습니다."})
+
+        ranges = [(e["chunk_start"], e["chunk_end"]) for e in entries if e.get("chunk_start") is not None]
+        legacy_ids = []
+        if len(ranges) < len(entries):
+            # 청크 범위가 없는 예전 항목: 청크 메타데이터의 출처로 찾는다.
+            meta = load_chunk_meta(sid, index_path, None) or []
+            legacy_ids = [i for i, m in enumerate(meta) if m.get("source") == filename]
+        with tombstone_lock(sid):
+            ts = load_tombstones(sid, index_path)
+            before = len(ts)
+            # 같은 이름으로 이미 지운(압축까지 끝났을 수 있는) 청크는 다시 pending에 넣지 않는다.
+            ranges += [(i, i + 1) for i in legacy_ids if i not in ts]
+            for start, end in ranges:
+                ts.add(start, end)
+            save_tombstones(ts, sid, index_path)
+        catalog.delete_file(sid, filename)
+
+        session = catalog.get_session(sid) or {}
+        live = session.get("chunk_count", 0)
+        compacting = False
+        if ts.pending_count >= config.COMPACT_MIN_TOMBSTONES and \
+                ts.pending_count >= config.COMPACT_TOMBSTONE_RATIO * (live + ts.pending_count):
+            compacting = schedule_compaction(sid)
+        return JSONResponse({
+            "message": f"파일 '{filename}' 삭제 완료",
+            "chunks_deleted": len(ts) - before,
+            "pending_tombstones": ts.pending_count,
+            "compaction_started": compacting,
+        })
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": f"파일 삭제 실패: {e}"})
 
 @app.delete("/session")
 async def clear_session(req: Request):
-    """현재 세션의 모든 데이터 삭제"""
+    """현재 세션의 모든 데이터 삭제 (로컬 디렉터리 전체, S3 객체, 카탈로그, 캐시)"""
     try:
         session_id = req.headers.get("X-Session-Id") or ""
 
         if not session_id:
             return JSONResponse(status_code=400, content={"message": "세션 ID가 없습니다."})
 
-        index_path, text_path = get_paths_for_session(session_id)
-
-        # 로컬 파일 삭제
-        if os.path.exists(index_path):
-            os.remove(index_path)
-        if os.path.exists(text_path):
-            os.remove(text_path)
-
-        # S3 데이터 삭제 (있으면)
-        s3 = get_s3_store()
-        if s3:
-            try:
-                if s3.exists(session_id, "index.faiss"):
-                    s3.delete(session_id, "index.faiss")
-                if s3.exists(session_id, "text_chunks.txt"):
-                    s3.delete(session_id, "text_chunks.txt")
-            except:
-                pass  # S3 에러는 무시
-
-        return JSONResponse({"message": "세션 데이터 삭제 완료", "session_id": session_id})
+        freed = delete_session_data(session_id)
+        lifecycle.forget(session_id)
+        return JSONResponse({"message": "세션 데이터 삭제 완료", "session_id": session_id, "bytes_freed": freed})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": f"세션 삭제 실패: {e}"})
 
@@ -571,12 +1576,15 @@ async def upload_files(
     files: list[UploadFile] = File(...),
     chunk_size: int = Form(512),
     chunk_overlap: int = Form(100),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    length_mode: Optional[str] = Form(None)
 ):
     """파일을 업로드하고 RAG 시스템에 추가합니다."""
     try:
         # 레이트 리밋: 업로드는 일일 제한만 (버스트 공격 방지 서버단에서는 같은 함수 사용)
-        check_limits(req, name="upload", daily_limit=config.UPLOAD_DAILY_LIMIT, burst_limit=5, session_id=session_id)
+        check_limits(req, name="upload", daily_limit=config.UPLOAD_DAILY_LIMIT, burst_limit=config.UPLOAD_BURST_LIMIT, session_id=session_id)
+        lifecycle.touch(session_id)
+        enforce_session_quota(session_id)
         start_time = time.time()
         index_path, text_path = get_paths_for_session(session_id)
         
@@ -584,6 +1592,7 @@ async def upload_files(
             raise HTTPException(status_code=400, detail="업로드할 파일이 없습니다.")
         
         all_chunks = []
+        all_sources = []
         processed_files = 0
         file_metadata = []  # 업로드된 파일 정보 저장
 
@@ -606,8 +1615,9 @@ async def upload_files(
             text = extract_text_from_file(file)
             
             # 청킹
-            chunks = chunk_text(text, chunk_size, chunk_overlap)
+            chunks = chunk_text(text, chunk_size, chunk_overlap, length_mode)
             all_chunks.extend(chunks)
+            all_sources.extend([file.filename] * len(chunks))
             processed_files += 1
 
             # 파일 메타데이터 저장
@@ -624,20 +1634,12 @@ async def upload_files(
             raise HTTPException(status_code=400, detail="처리할 수 있는 텍스트가 없습니다.")
         
         # 인덱스에 새 청크만 추가 (재구성 대신)
-        index_info = append_index_for_paths(all_chunks, index_path, text_path, session_id=session_id)
+        index_info = await asyncio.to_thread(append_index_for_paths, all_chunks, index_path, text_path,
+                                             session_id=session_id, sources=all_sources)
+        dedup_info = index_info.get("dedup")
 
-        # 파일 메타데이터를 JSON으로 저장
-        metadata_path = os.path.join(os.path.dirname(index_path), "files.json")
-        existing_metadata = []
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    existing_metadata = json.load(f)
-            except:
-                pass
-        existing_metadata.extend(file_metadata)
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(existing_metadata, f, ensure_ascii=False, indent=2)
+        # 파일 메타데이터(색인된 청크 범위/수, 중복 수)를 카탈로그에 기록 (한 트랜잭션)
+        record_files(session_id, file_metadata, index_info)
 
         processing_time = time.time() - start_time
 
@@ -648,6 +1650,8 @@ async def upload_files(
             "index_size": round(index_info["index_size_mb"], 2),
             "total_chunks": index_info["total_chunks"],
             "uploaded_files": file_metadata,
+            "dedup": dedup_info,
+            "version": index_info.get("version"),
             "session_id": session_id
         }
         
@@ -663,12 +1667,15 @@ async def add_text_document(
     content: str = Form(...),
     chunk_size: int = Form(512),
     chunk_overlap: int = Form(100),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    length_mode: Optional[str] = Form(None)
 ):
     """텍스트를 직접 입력하여 RAG 시스템에 추가합니다."""
     try:
         # 레이트 리밋: 텍스트 추가도 일일 제한
-        check_limits(req, name="add_text", daily_limit=config.ADDTEXT_DAILY_LIMIT, burst_limit=10, session_id=session_id)
+        check_limits(req, name="add_text", daily_limit=config.ADDTEXT_DAILY_LIMIT, burst_limit=config.ADDTEXT_BURST_LIMIT, session_id=session_id)
+        lifecycle.touch(session_id)
+        enforce_session_quota(session_id)
         start_time = time.time()
         index_path, text_path = get_paths_for_session(session_id)
         
@@ -696,35 +1703,16 @@ async def add_text_document(
             raise HTTPException(status_code=400, detail="청크 겹침은 0 이상이고 청크 크기보다 작아야 합니다.")
         
         # 청킹
-        chunks = chunk_text(content, chunk_size, chunk_overlap)
+        chunks = chunk_text(content, chunk_size, chunk_overlap, length_mode)
         
         if not chunks:
             raise HTTPException(status_code=400, detail="처리할 수 있는 텍스트가 없습니다.")
         
         # 인덱스에 새 청크만 추가 (재구성 대신)
-        index_info = append_index_for_paths(chunks, index_path, text_path, session_id=session_id)
-
-        # 파일 메타데이터를 JSON으로 저장
-        import json
-        metadata_dir = os.path.dirname(index_path)
-        metadata_path = os.path.join(metadata_dir, "files.json")
-
-        # 디렉토리가 없으면 생성
-        os.makedirs(metadata_dir, exist_ok=True)
-
-        print(f"📁 [DEBUG] Metadata path: {metadata_path}")
-        print(f"📁 [DEBUG] Session ID: {session_id}")
+        index_info = await asyncio.to_thread(append_index_for_paths, chunks, index_path, text_path, session_id=session_id,
+                                             sources=[f"{title}.txt"] * len(chunks))
 
-        existing_metadata = []
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    existing_metadata = json.load(f)
-                print(f"📝 [DEBUG] Loaded {len(existing_metadata)} existing files")
-            except Exception as e:
-                print(f"⚠️ [DEBUG] Failed to load existing metadata: {e}")
-
-        # 텍스트 입력 메타데이터 추가
+        # 텍스트 입력 메타데이터를 카탈로그에 기록
         text_metadata = {
             "name": f"{title}.txt",
             "size": len(content_bytes),
@@ -732,12 +1720,7 @@ async def add_text_document(
             "uploaded_at": datetime.now().isoformat(),
             "type": "text_input"
         }
-        existing_metadata.append(text_metadata)
-        print(f"✅ [DEBUG] Adding file metadata: {text_metadata['name']}")
-
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(existing_metadata, f, ensure_ascii=False, indent=2)
-        print(f"💾 [DEBUG] Saved metadata to {metadata_path}")
+        record_files(session_id, [text_metadata], index_info)
 
         processing_time = time.time() - start_time
 
@@ -755,6 +1738,8 @@ async def add_text_document(
             "index_size": round(index_info["index_size_mb"], 2),
             "total_chunks": index_info["total_chunks"],
             "content_size_bytes": len(content_bytes),
+            "dedup": index_info.get("dedup"),
+            "version": index_info.get("version"),
             "session_id": session_id
         }
         
@@ -763,35 +1748,19 @@ async def add_text_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"텍스트 처리 중 오류 발생: {str(e)}")
 
+# 결과 요약은 파일별로 한 번 계산해 두고, grid_run이 덧붙인 행만 읽어 갱신한다 (utils/results_summary.py).
+results_summary = ResultsSummary("experiments/results")
+
 @app.get("/results")
-async def get_results():
-    """실험 결과 CSV 파일을 읽어 JSON으로 반환한다."""
+async def get_results(req: Request):
+    """실험 결과 CSV 파일을 읽어 JSON으로 반환한다. ETag가 같으면 304."""
     try:
-        results_dir = Path("experiments/results")
-        csv_files = sorted(results_dir.glob("grid_search_*.csv"), key=os.path.getmtime, reverse=True)
-        if not csv_files:
-            raise FileNotFoundError
-
-        latest_csv = csv_files[0]
-        df = pd.read_csv(latest_csv)
-        
-        if 'cost_cents' in df.columns:
-            df['cost_dollars'] = (df['cost_cents']).round(4)
-
-        top_10 = df.nlargest(10, ['recall@5', 'f1']).to_dict(orient='records')
-
-        summary = {
-            "total_experiments": len(df),
-            "best_recall": df['recall@5'].max(),
-            "best_f1": df['f1'].max(),
-            "avg_latency_ms": df['latency_ms'].mean(),
-            "avg_cost": df['cost_dollars'].mean() if 'cost_dollars' in df.columns else df['cost_cents'].mean(),
-            "perfect_scores": len(df[(df['recall@5'] == 1.0) & (df['f1'] == 1.0)])
-        }
-        
-        # 브라우저가 응답을 캐싱하지 않도록 헤더 추가
-        headers = {"Cache-Control": "no-cache, no-store, must-revalidate"}
-        return JSONResponse(content={"summary": summary, "top_results": top_10}, headers=headers)
+        etag, payload = await asyncio.to_thread(results_summary.get)
+        # 브라우저/대시보드가 매번 재검증하도록 (바뀌지 않았으면 본문 없이 304)
+        headers = {"Cache-Control": "no-cache", "ETag": etag}
+        if etag in [t.strip() for t in req.headers.get("If-None-Match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(content=payload, headers=headers)
 
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="실험 결과 파일을 찾을 수 없습니다.")
@@ -801,7 +1770,113 @@ async def get_results():
         raise HTTPException(status_code=500, detail=f"결과 처리 중 오류 발생: {e}")
 
 # ---------- 앱 시작 시 인덱스 확인 ─────────────────
-ensure_faiss_index()
+# 공용 인덱스는 서버 시작을 막지 않고 백그라운드에서 구축/갱신한 뒤 스냅샷을 교체한다.
+global_index = GlobalIndex(config.INDEX_PATH, config.TEXT_PATH, get_meta_path(config.INDEX_PATH),
+                           embed_texts, batch_size=config.EMBED_BATCH_SIZE,
+                           write_lock=lambda: session_lock(None),
+                           backend=lambda: get_embedder().name)
+
+# 세션 수명 관리: TTL이 지난 세션과 전역 할당량을 넘긴 오래된 세션을 주기적으로 지운다.
+lifecycle = SessionLifecycle(
+    scan=scan_sessions,
+    usage=session_usage_bytes,
+    evict=delete_session_data,
+    persist=lambda sid, at: get_catalog().touch(sid, at),
+    ttl_seconds=config.SESSION_TTL_SECONDS,
+    session_quota_bytes=config.SESSION_QUOTA_MB * 1024 * 1024,
+    global_quota_bytes=config.SESSIONS_GLOBAL_QUOTA_MB * 1024 * 1024,
+    hot_seconds=config.SESSION_HOT_SECONDS,
+    interval_seconds=config.SESSION_SWEEP_INTERVAL,
+    on_sweep=prune_expired,
+)
+
+@app.on_event("startup")
+def start_global_index_build():
+    global_index.start()
+
+@app.on_event("startup")
+def start_session_lifecycle():
+    lifecycle.start()
+
+def require_admin(req: Request):
+    if not config.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="관리 API가 비활성화되어 있습니다 (ADMIN_API_KEY 미설정).")
+    if req.headers.get("X-Admin-Key") != config.ADMIN_API_KEY:
+        raise HTTPException(status_code=401, detail="관리 키가 올바르지 않습니다.")
+
+@app.put("/sessions/{session_id}/tags")
+async def set_session_tags(session_id: str, req: Request):
+    """세션 태그를 지정한다 (예: 팀 이름). /admin/search에서 tag로 묶어 검색할 때 쓴다."""
+    require_admin(req)
+    body = await req.json()
+    tags = sorted({str(t).strip() for t in body.get("tags", []) if str(t).strip()})
+    try:
+        _session_dir(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    get_catalog().set_tags(session_id, tags)
+    return {"session_id": session_id, "tags": tags}
+
+@app.post("/admin/search")
+async def admin_search(req: Request):
+    """여러 세션을 한 번에 검색한다 (session_ids 또는 tag). 답변 생성 없이 전체 top_k 청크만 돌려준다.
+    shard_timeout 안에 끝나지 않은 세션은 빼고 부분 결과로 응답하며, shards에 세션별 상태가 남는다."""
+    require_admin(req)
+    body = await req.json()
+    q = body.get("question", "")
+    top_k = int(body.get("top_k", 10))
+    mode = body.get("mode") or config.DEFAULT_SEARCH_MODE
+    timeout = float(body.get("shard_timeout", config.SHARD_TIMEOUT_SECONDS))
+    if not q:
+        raise HTTPException(status_code=400, detail="질문이 비어있습니다.")
+    if mode not in config.SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 검색 모드: {mode} (vector, lexical, hybrid 중 선택)")
+    session_ids = [str(s) for s in body.get("session_ids") or []]
+    if body.get("tag"):
+        session_ids += get_catalog().sessions_with_tag(str(body["tag"]))
+    session_ids = list(dict.fromkeys(s for s in session_ids if s))
+    if not session_ids:
+        raise HTTPException(status_code=400, detail="검색할 세션이 없습니다 (session_ids 또는 tag 지정).")
+    if len(session_ids) > config.SHARD_MAX_SESSIONS:
+        raise HTTPException(status_code=400, detail=f"한 번에 검색할 수 있는 세션은 {config.SHARD_MAX_SESSIONS}개까지입니다.")
+    for sid in session_ids:
+        try:
+            _session_dir(sid)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    t0 = time.perf_counter()
+    vec = await asyncio.to_thread(embed_text, q) if mode != "lexical" else None  # 질문 임베딩은 한 번만
+    shards = {sid: (lambda sid=sid: search_session_shard(sid, q, vec, top_k, mode)) for sid in session_ids}
+    merged, status = await asyncio.to_thread(search_shards, shards, top_k, _shard_pool, timeout)
+    return {
+        "question": q,
+        "mode": mode,
+        "top_k": top_k,
+        "results": [
+            {"rank": r + 1, "session_id": sid, "chunk_id": idx, "score": score, "source": source, "text": text}
+            for r, (sid, (idx, score, text, source)) in enumerate(merged)
+        ],
+        "shards": status,
+        "partial": any(st["state"] != "ok" for st in status.values()),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+@app.get("/sessions/metrics")
+async def session_metrics():
+    """세션 수명 관리 지표 (세션 수, 사용량, 정리 횟수 등)"""
+    batcher = getattr(_embedder, "query_batcher", None)
+    return JSONResponse(content=dict(lifecycle.metrics(), snapshots=_snapshots.stats(),
+                                     group_commit=dict(_append_committer.stats), embedding_calls=embed_caller.stats(),
+                                     admission={"embeddings": embed_admission.stats(), "chat": chat_admission.stats()},
+                                     query_batching=dict(batcher.stats) if batcher else None))
+
+@app.get("/ready")
+async def readiness():
+    """공용 인덱스 준비 여부와 구축 진행 상황. 준비 전에는 503."""
+    status = dict(global_index.status)
+    status["ready"] = global_index.ready
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
 
 # ---------- 서버 실행 ─────────────────────────────
 if __name__ == "__main__":
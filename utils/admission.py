@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from utils.resilient_call import is_retryable
+
+# 상위 API(OpenAI) 호출 입장 제어. 업스트림(임베딩, 채팅)마다 하나씩 두고 프로세스 안의 모든 호출이 거친다.
+# - 동시 호출 한도(limit)를 AIMD로 조절한다: 정상 응답마다 +1/limit (한도만큼 응답이 오면 +1),
+#   응답이 최근 최소 지연의 slow_factor배를 넘으면 ×0.9, 과부하 신호(429, 5xx, 타임아웃)면 ×0.5.
+#   업스트림이 느려지면 호출을 더 밀어 넣지 않고 줄을 세워, 지연이 모두에게 무너지지 않게 한다.
+# - 우선순위 차선: interactive(검색)와 bulk(업로드/말뭉치 임베딩). 빈자리는 기다리는 interactive가 먼저 받고,
+#   bulk는 한도의 bulk_share까지만 쓰며, 분당 예산도 reserve 비율은 interactive 몫으로 남긴다.
+#   줄에서 queue_timeout을 넘기면 Overloaded.
+# - 분당 요청 수(rpm)와 토큰 수(tpm) 예산: 토큰 버킷으로 미리 예상치를 빼고, 응답의 usage로 실제 값에 맞춘다.
+# - 회로 차단기: 과부하 신호가 연속 failure_threshold번이거나 최근 window개 중 failure_ratio 이상이면 열린다.
+#   열려 있는 동안(open_seconds부터 두 배씩, 최대 max_open_seconds)은 호출하지 않고 바로 CircuitOpen을 던지고,
+#   시간이 지나면 시험 호출 하나만 보내(half-open) 성공하면 닫고 실패하면 다시 연다.
+# 재시도/헤지를 하는 호출(utils/resilient_call.py)은 그 바깥에서 한 번만 자리를 얻는다. 시도마다 자리를 얻으면
+# 호출자가 이미 포기한 시도가 대기열에 남았다가 자리가 나면 요청을 보내 부하를 키운다.
+# 거부 예외(Rejected)는 retryable=False이고, 호출자는 503으로 바꾼다.
+
+LANES = ("interactive", "bulk")
+
+
+class Rejected(Exception):
+    """호출을 보내지 않고 거부했다. retry_after초 뒤에 다시 시도할 수 있다."""
+    retryable = False
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(Rejected):
+    pass
+
+
+class Overloaded(Rejected):
+    pass
+
+
+def estimate_tokens(texts: Iterable[str]) -> int:
+    """호출 전 토큰 수 예상치 (글자 수 / 2). 한국어는 적게, 영어는 많게 잡히지만 응답 usage로 다시 맞춘다."""
+    return max(1, sum(len(t) for t in texts) // 2)
+
+
+def response_tokens(response: Any) -> Optional[int]:
+    """OpenAI 응답의 실제 사용 토큰 (usage.total_tokens). 없으면 None (스트리밍 등)."""
+    usage = getattr(response, "usage", None)
+    total = getattr(usage, "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
+class _Bucket:
+    """분당 한도 per_minute인 토큰 버킷 (0이면 제한 없음)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._at = time.monotonic()
+
+    def refill(self, now: float):
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level + (now - self._at) * self.capacity / 60.0)
+        self._at = now
+
+    def wait_time(self, amount: float, keep: float = 0.0) -> float:
+        """amount를 빼고도 keep 비율이 남으려면 기다려야 하는 초 (0이면 바로 가능)."""
+        if self.capacity <= 0:
+            return 0.0
+        need = min(amount, self.capacity * (1 - keep)) + self.capacity * keep - self.level
+        return max(0.0, need * 60.0 / self.capacity)
+
+
+class AdmissionController:
+    def __init__(self, name: str, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 bulk_share: float = 0.5, reserve: float = 0.2,
+                 queue_timeout: Optional[Dict[str, float]] = None, slow_factor: float = 2.0,
+                 rpm: float = 0, tpm: float = 0,
+                 failure_threshold: int = 5, failure_ratio: float = 0.5, window: int = 20,
+                 open_seconds: float = 5.0, max_open_seconds: float = 60.0):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.bulk_share = bulk_share
+        self.reserve = reserve
+        self.queue_timeout = {"interactive": 2.0, "bulk": 60.0, **(queue_timeout or {})}
+        self.slow_factor = slow_factor
+        self.failure_threshold = failure_threshold
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._cond = threading.Condition()
+        self._inflight = {lane: 0 for lane in LANES}
+        self._waiting = {lane: 0 for lane in LANES}
+        self._latencies = {lane: deque(maxlen=100) for lane in LANES}  # 차선별 최근 정상 지연, 최솟값이 기준 지연
+        self._outcomes = deque(maxlen=window)  # 최근 호출이 과부하 신호였는지
+        self._consecutive_failures = 0
+        self._state = "closed"                # closed / open / half_open
+        self._open_until = 0.0
+        self._trips = 0
+        self._probe_inflight = False
+        self.counters = {lane: {"admitted": 0, "overloaded": 0, "circuit_open": 0, "queued_ms": 0.0} for lane in LANES}
+        self.counters["limit_increases"] = 0
+        self.counters["limit_decreases"] = 0
+
+    # ---------- 입장 ----------
+
+    def call(self, lane: str, fn: Callable[[], Any], tokens: int = 1,
+             usage: Optional[Callable[[Any], Optional[int]]] = response_tokens) -> Any:
+        """자리를 얻어 fn()을 부르고 결과를 돌려준다. 거부되면 CircuitOpen/Overloaded."""
+        probe = self._acquire(lane, tokens)
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self._release(lane, probe, time.perf_counter() - started, error=e)
+            raise
+        used = usage(result) if usage else None
+        self._release(lane, probe, time.perf_counter() - started, tokens_delta=(used - tokens) if used is not None else 0)
+        return result
+
+    def _check_circuit(self, now: float) -> bool:
+        """열려 있으면 CircuitOpen. 시험 호출로 들어가면 True."""
+        if self._state == "open" and now >= self._open_until:
+            self._state = "half_open"
+        if self._state == "open" or (self._state == "half_open" and self._probe_inflight):
+            raise CircuitOpen(f"{self.name} 업스트림이 불안정해 호출을 잠시 멈췄습니다",
+                              retry_after=max(self._open_until - now, 1.0))
+        if self._state == "half_open":
+            self._probe_inflight = True
+            return True
+        return False
+
+    def _admissible(self, lane: str, tokens: int, now: float) -> float:
+        """지금 들어갈 수 있으면 0, 아니면 다시 확인할 때까지 기다릴 초."""
+        limit = max(self.min_limit, int(self.limit))
+        if sum(self._inflight.values()) >= limit:
+            return 0.05
+        if lane == "bulk":
+            if self._waiting["interactive"] or self._inflight["bulk"] >= max(1, int(limit * self.bulk_share)):
+                return 0.05
+        keep = self.reserve if lane == "bulk" else 0.0
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        return max(self._requests.wait_time(1, keep), self._tokens.wait_time(tokens, keep))
+
+    def _acquire(self, lane: str, tokens: int) -> bool:
+        t0 = time.monotonic()
+        deadline = t0 + self.queue_timeout[lane]
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    try:
+                        probe = self._check_circuit(now)
+                    except CircuitOpen:
+                        self.counters[lane]["circuit_open"] += 1
+                        raise
+                    wait = self._admissible(lane, tokens, now)
+                    if wait <= 0:
+                        break
+                    if probe:
+                        self._probe_inflight = False
+                    if now >= deadline:
+                        self.counters[lane]["overloaded"] += 1
+                        raise Overloaded(f"{self.name} 호출 대기열이 가득 찼습니다 ({lane})", retry_after=max(wait, 1.0))
+                    self._cond.wait(min(wait, max(deadline - now, 0.001)))
+            finally:
+                self._waiting[lane] -= 1
+            self._inflight[lane] += 1
+            self._requests.level -= 1
+            self._tokens.level -= tokens
+            self.counters[lane]["admitted"] += 1
+            self.counters[lane]["queued_ms"] += (time.monotonic() - t0) * 1000
+            return probe
+
+    # ---------- 결과 반영 ----------
+
+    def _release(self, lane: str, probe: bool, latency: float, error: Optional[Exception] = None, tokens_delta: int = 0):
+        overload = error is not None and is_retryable(error)
+        with self._cond:
+            busy = sum(self._inflight.values()) >= self.limit * 0.5  # 한도를 절반도 안 쓰면 늘리지 않는다
+            self._inflight[lane] -= 1
+            self._tokens.level -= tokens_delta
+            if probe:
+                self._probe_inflight = False
+            if overload:
+                self.limit = max(self.min_limit, self.limit * 0.5)
+                self.counters["limit_decreases"] += 1
+            elif error is None:
+                latencies = self._latencies[lane]
+                baseline = min(latencies) if latencies else latency
+                latencies.append(latency)
+                if latency > self.slow_factor * baseline:
+                    self.limit = max(self.min_limit, self.limit * 0.9)
+                    self.counters["limit_decreases"] += 1
+                elif busy and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                    self.counters["limit_increases"] += 1
+            if error is None or overload:  # 400 같은 요청 오류는 업스트림 상태와 무관하다
+                self._record_outcome(overload, probe)
+            self._cond.notify_all()
+
+    def _record_outcome(self, failed: bool, probe: bool):
+        self._outcomes.append(failed)
+        self._consecutive_failures = self._consecutive_failures + 1 if failed else 0
+        if probe:
+            if failed:
+                self._open()
+            else:
+                self._state, self._trips = "closed", 0
+                self._outcomes.clear()
+            return
+        if self._state != "closed":  # 열리기 전에 보낸 호출의 결과는 시험 호출 판정에 쓰지 않는다
+            return
+        ratio_tripped = (len(self._outcomes) >= self._outcomes.maxlen // 2
+                         and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio)
+        if self._consecutive_failures >= self.failure_threshold or ratio_tripped:
+            self._open()
+
+    def _open(self):
+        self._trips += 1
+        self._state = "open"
+        self._open_until = time.monotonic() + min(self.max_open_seconds, self.open_seconds * 2 ** (self._trips - 1))
+        self._outcomes.clear()
+        self._consecutive_failures = 0
+        print(f"⚠️ {self.name} 회로 차단기 열림 ({self._open_until - time.monotonic():.0f}초)")
+
+    # ---------- 지표 ----------
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": dict(self._inflight),
+                "waiting": dict(self._waiting),
+                "circuit": self._state,
+                "circuit_open_for_s": round(max(self._open_until - now, 0.0), 2) if self._state == "open" else 0.0,
+                "trips": self._trips,
+                "baseline_latency_ms": {lane: round(min(v) * 1000, 2) if v else None for lane, v in self._latencies.items()},
+                "rpm_available": round(self._requests.level, 1) if self._requests.capacity else None,
+                "tpm_available": round(self._tokens.level, 1) if self._tokens.capacity else None,
+                "lanes": {lane: {k: round(v, 1) for k, v in self.counters[lane].items()} for lane in LANES},
+                "limit_increases": self.counters["limit_increases"],
+                "limit_decreases": self.counters["limit_decreases"],
+            }
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 배포 단위 SQLite 카탈로그: 세션, 업로드 파일, 파일별 청크 범위.
+# - WAL 모드라 읽기는 쓰기와 동시에 진행되고, 추가는 한 트랜잭션으로 처리되어 동시 업로드에도 항목이 사라지지 않는다.
+# - 세션별 파일 수/청크 수는 sessions 행에 카운터로 유지하므로 목록 총개수 조회가 O(1)이다.
+# - 파일 목록은 (session_id, id) 인덱스를 타는 커서 기반 페이지네이션.
+# - 예전 files.json은 해당 세션을 처음 조회/갱신할 때 한 번 옮기고 files.json.migrated로 이름을 바꾼다.
+# - 세션 태그(session_tags)로 여러 세션을 묶어 한 번에 검색할 수 있다 (예: 팀 단위).
+# 세션이 없는 공용 말뭉치는 session_id ""로 기록한다.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    accessed_at REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER,
+    type TEXT,
+    uploaded_at TEXT NOT NULL,
+    chunk_start INTEGER,
+    chunk_end INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_session ON files(session_id, id);
+CREATE INDEX IF NOT EXISTS files_session_name ON files(session_id, name);
+CREATE TABLE IF NOT EXISTS session_tags (
+    session_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (session_id, tag)
+);
+CREATE INDEX IF NOT EXISTS session_tags_tag ON session_tags(tag, session_id);
+"""
+
+_FILE_COLUMNS = ("id", "name", "size", "chunks", "duplicates", "type", "uploaded_at", "chunk_start", "chunk_end")
+
+
+def _row_to_file(row) -> dict:
+    entry = dict(zip(_FILE_COLUMNS, row))
+    # 값이 없는 선택 필드는 예전 files.json 항목 모양 그대로 생략한다.
+    return {k: v for k, v in entry.items() if v is not None or k in ("chunk_start", "chunk_end")}
+
+
+class Catalog:
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._migrated = set()
+        self._migrate_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "accessed_at" not in columns:  # 마지막 접근 시각 이전에 만든 카탈로그
+            conn.execute("ALTER TABLE sessions ADD COLUMN accessed_at REAL")
+
+    def _conn(self) -> sqlite3.Connection:
+        """스레드마다 연결 하나를 재사용한다."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _connect(self, write: bool = False) -> "_Transaction":
+        return _Transaction(self._conn(), write)
+
+    # ---------- 세션 ───────────────────────────
+    def _touch_session(self, conn, session_id: str, files: int = 0, chunks: int = 0):
+        now = time.time()
+        conn.execute(
+            "INSERT INTO sessions (id, created_at, updated_at, file_count, chunk_count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, "
+            "file_count = file_count + excluded.file_count, chunk_count = chunk_count + excluded.chunk_count",
+            (session_id, now, now, files, chunks),
+        )
+
+    def get_session(self, session_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, created_at, updated_at, file_count, chunk_count FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "created_at", "updated_at", "file_count", "chunk_count"), row))
+
+    def touch(self, session_id: str, at: float):
+        """마지막 접근 시각을 기록한다 (세션 수명 관리용)."""
+        with self._connect(write=True) as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, created_at, updated_at, accessed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET accessed_at = MAX(COALESCE(accessed_at, 0), excluded.accessed_at)",
+                (session_id, at, at, at),
+            )
+
+    def list_sessions(self) -> Dict[str, float]:
+        """세션 id -> 마지막 접근(없으면 마지막 수정) 시각."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, MAX(COALESCE(accessed_at, 0), updated_at) FROM sessions").fetchall()
+        return dict(rows)
+
+    def delete_session(self, session_id: str):
+        with self._connect(write=True) as conn:
+            conn.execute("DELETE FROM files WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM session_tags WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    # ---------- 태그 ───────────────────────────
+    def set_tags(self, session_id: str, tags: List[str]):
+        """세션의 태그를 통째로 바꾼다."""
+        with self._connect(write=True) as conn:
+            conn.execute("DELETE FROM session_tags WHERE session_id = ?", (session_id,))
+            conn.executemany("INSERT OR IGNORE INTO session_tags (session_id, tag) VALUES (?, ?)",
+                             [(session_id, t) for t in tags])
+            self._touch_session(conn, session_id)
+
+    def get_tags(self, session_id: str) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT tag FROM session_tags WHERE session_id = ? ORDER BY tag", (session_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    def sessions_with_tag(self, tag: str) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT session_id FROM session_tags WHERE tag = ? ORDER BY session_id", (tag,)).fetchall()
+        return [r[0] for r in rows]
+
+    # ---------- 파일 ───────────────────────────
+    def add_files(self, session_id: str, entries: List[dict]) -> List[int]:
+        """파일 항목들을 한 트랜잭션으로 추가하고 id를 돌려준다."""
+        ids = []
+        with self._connect(write=True) as conn:
+            for e in entries:
+                cur = conn.execute(
+                    "INSERT INTO files (session_id, name, size, chunks, duplicates, type, uploaded_at, chunk_start, chunk_end) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, e["name"], e.get("size", 0), e.get("chunks", 0), e.get("duplicates"),
+                     e.get("type"), e["uploaded_at"], e.get("chunk_start"), e.get("chunk_end")),
+                )
+                ids.append(cur.lastrowid)
+            self._touch_session(conn, session_id, files=len(entries), chunks=sum(e.get("chunks", 0) for e in entries))
+        return ids
+
+    def list_files(self, session_id: str, limit: int = 100, cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """cursor(마지막으로 받은 id) 다음부터 limit개. 반환: (파일 목록, 다음 커서 또는 None)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_FILE_COLUMNS)} FROM files WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (session_id, cursor or 0, limit + 1),
+            ).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [_row_to_file(r) for r in rows[:limit]], next_cursor
+
+    def find_files(self, session_id: str, name: str) -> List[dict]:
+        """이름이 같은 항목 전부 (같은 파일을 여러 번 올린 경우 포함)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_FILE_COLUMNS)} FROM files WHERE session_id = ? AND name = ? ORDER BY id",
+                (session_id, name),
+            ).fetchall()
+        return [_row_to_file(r) for r in rows]
+
+    def delete_file(self, session_id: str, name: str) -> int:
+        """이름이 같은 항목을 모두 지우고 지운 개수를 돌려준다."""
+        with self._connect(write=True) as conn:
+            files, chunks = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM files WHERE session_id = ? AND name = ?", (session_id, name)
+            ).fetchone()
+            if files:
+                conn.execute("DELETE FROM files WHERE session_id = ? AND name = ?", (session_id, name))
+                self._touch_session(conn, session_id, files=-files, chunks=-chunks)
+        return files
+
+    # ---------- files.json 마이그레이션 ─────────────
+    def migrate_json(self, session_id: str, json_path: str) -> int:
+        """files.json이 있으면 카탈로그로 옮긴다. 옮긴 항목 수를 돌려준다.
+        먼저 files.json.migrated로 이름을 바꿔 선점하므로 여러 워커가 동시에 불러도 한 번만 옮겨진다."""
+        if session_id in self._migrated:
+            return 0
+        with self._migrate_lock:
+            if session_id in self._migrated:
+                return 0
+            moved = 0
+            claimed = json_path + ".migrated"
+            try:
+                os.replace(json_path, claimed)
+            except FileNotFoundError:
+                claimed = None
+            if claimed:
+                try:
+                    with open(claimed, "r", encoding="utf-8") as f:
+                        entries = json.load(f)
+                except Exception as e:
+                    print(f"⚠️ files.json을 읽지 못해 마이그레이션을 건너뜁니다: {json_path} ({e})")
+                    entries = []
+                entries = [e for e in entries if isinstance(e, dict) and e.get("name")]
+                for e in entries:
+                    e.setdefault("uploaded_at", "")
+                if entries:
+                    try:
+                        self.add_files(session_id, entries)
+                    except Exception:
+                        os.replace(claimed, json_path)
+                        raise
+                    moved = len(entries)
+                print(f"📦 files.json → 카탈로그 마이그레이션: {session_id or '(공용)'} {moved}개")
+            self._migrated.add(session_id)
+            return moved
+
+
+class _Transaction:
+    """with 블록을 트랜잭션으로 감싼다. 쓰기는 BEGIN IMMEDIATE로 잠금을 먼저 잡아 갱신 손실을 막는다."""
+
+    def __init__(self, conn: sqlite3.Connection, write: bool):
+        self.conn = conn
+        self.write = write
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,208 @@
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional
+
+# LangChain RecursiveCharacterTextSplitter(keep_separator=True)와 같은 결과를 내는 자체 청커.
+# - 정규식 대신 str.split을 쓰고, 구분자는 다음 조각 앞에 붙인다 (keep_separator=True와 동일).
+# - 조각 길이는 한 번만 계산하고, 겹침(overlap) 창은 deque로 밀어내므로 병합이 조각 수에 선형이다.
+# - length_function을 바꾸면 글자 수 대신 토큰 수 기준으로 자른다 (임베딩 모델 토큰 한도에 맞추기 위함).
+# - iter_chunks는 텍스트 스트림을 받아 첫 번째 구분자 단위로 완성된 청크부터 내보낸다.
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+class _Merger:
+    """작은 조각들을 chunk_size 이하로 이어 붙이고, 끝의 chunk_overlap만큼을 다음 청크로 넘긴다.
+    (스트리밍용. 배치 경로는 TextChunker._split 안에 같은 로직을 인라인으로 둔다)"""
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, strip: bool):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.strip = strip
+        self.pieces: deque = deque()
+        self.lengths: deque = deque()
+        self.total = 0
+
+    def _join(self) -> Optional[str]:
+        text = "".join(self.pieces)
+        if self.strip:
+            text = text.strip()
+        return text or None
+
+    def feed(self, piece: str, length: int) -> List[str]:
+        out = []
+        if self.total + length > self.chunk_size and self.pieces:
+            doc = self._join()
+            if doc is not None:
+                out.append(doc)
+            while self.total > self.chunk_overlap or (self.total + length > self.chunk_size and self.total > 0):
+                self.pieces.popleft()
+                self.total -= self.lengths.popleft()
+        self.pieces.append(piece)
+        self.lengths.append(length)
+        self.total += length
+        return out
+
+    def flush(self) -> List[str]:
+        doc = self._join() if self.pieces else None
+        self.pieces.clear()
+        self.lengths.clear()
+        self.total = 0
+        return [doc] if doc is not None else []
+
+
+def _split_keep(text: str, separator: str) -> List[str]:
+    """구분자를 뒤 조각의 앞에 붙여 나눈다. 빈 조각은 버린다."""
+    if not separator:
+        return list(text)
+    parts = text.split(separator)
+    splits = [parts[0]] + [separator + p for p in parts[1:]]
+    return [s for s in splits if s]
+
+
+class TextChunker:
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        separators: Optional[List[str]] = None,
+        length_function: Callable[[str], int] = len,
+        strip_whitespace: bool = True,
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap({chunk_overlap})이 chunk_size({chunk_size})보다 큽니다.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators or DEFAULT_SEPARATORS)
+        self.length = length_function
+        self.strip = strip_whitespace
+
+    def _merger(self) -> _Merger:
+        return _Merger(self.chunk_size, self.chunk_overlap, self.strip)
+
+    def _pick_separator(self, text: str, separators: List[str]):
+        for i, sep in enumerate(separators):
+            if sep == "":
+                return "", []
+            if sep in text:
+                return sep, separators[i + 1:]
+        return separators[-1], []
+
+    def _split(self, text: str, separators: List[str]) -> List[str]:
+        separator, rest = self._pick_separator(text, separators)
+        # 조각마다 메서드를 부르는 비용이 처리량을 좌우하므로 병합 로직(_Merger와 동일)을 지역 변수로 인라인한다.
+        length = self.length
+        size, overlap, strip = self.chunk_size, self.chunk_overlap, self.strip
+        chunks: List[str] = []
+        pieces: deque = deque()
+        lengths: deque = deque()
+        total = 0
+        for piece in _split_keep(text, separator):
+            n = length(piece)
+            if n < size:
+                if total + n > size and pieces:
+                    doc = "".join(pieces)
+                    if strip:
+                        doc = doc.strip()
+                    if doc:
+                        chunks.append(doc)
+                    while total > overlap or (total + n > size and total > 0):
+                        pieces.popleft()
+                        total -= lengths.popleft()
+                pieces.append(piece)
+                lengths.append(n)
+                total += n
+                continue
+            if pieces:
+                doc = "".join(pieces)
+                if strip:
+                    doc = doc.strip()
+                if doc:
+                    chunks.append(doc)
+                pieces.clear()
+                lengths.clear()
+                total = 0
+            if rest:
+                chunks.extend(self._split(piece, rest))
+            else:
+                chunks.append(piece)
+        if pieces:
+            doc = "".join(pieces)
+            if strip:
+                doc = doc.strip()
+            if doc:
+                chunks.append(doc)
+        return chunks
+
+    def _place(self, piece: str, rest: List[str], merger: _Merger, out: List[str]):
+        """작은 조각은 병합기에, 큰 조각은 지금까지를 내보낸 뒤 다음 구분자로 다시 나눈다."""
+        length = self.length(piece)
+        if length < self.chunk_size:
+            out.extend(merger.feed(piece, length))
+            return
+        out.extend(merger.flush())
+        if rest:
+            out.extend(self._split(piece, rest))
+        else:
+            out.append(piece)
+
+    def split_text(self, text: str) -> List[str]:
+        return self._split(text, self.separators)
+
+    def iter_chunks(self, stream: Iterable[str]) -> Iterator[str]:
+        """텍스트 조각 스트림을 받아 청크를 순서대로 내보낸다. split_text(전체 텍스트)와 결과가 같다.
+
+        첫 번째 구분자가 나타나기 전까지는 버퍼에 모으고(전체 텍스트 기준 구분자 선택이 달라질 수 있으므로),
+        나타난 뒤에는 완성된 조각 단위로 병합기에 넣어 바로 청크를 내보낸다.
+        """
+        top = self.separators[0]
+        rest = self.separators[1:]
+        buf = ""
+        prefix = ""
+        seen_top = False
+        merger = self._merger()
+        out: List[str] = []
+        for piece in stream:
+            if not piece:
+                continue
+            buf += piece
+            if not seen_top:
+                # 새로 들어온 부분(+ 경계에 걸친 구분자)만 확인한다.
+                if not top or top not in buf[-(len(piece) + len(top) - 1):]:
+                    continue
+                seen_top = True
+            parts = buf.split(top)
+            if len(parts) == 1:
+                continue
+            # 마지막 부분은 뒤에 글자가 더 붙을 수 있으므로 남겨 둔다.
+            complete = [prefix + parts[0]] + [top + p for p in parts[1:-1]]
+            buf, prefix = parts[-1], top
+            for split in complete:
+                if split:
+                    self._place(split, rest, merger, out)
+            yield from out
+            out.clear()
+
+        if not seen_top:
+            yield from self.split_text(buf)
+            return
+        if prefix + buf:
+            self._place(prefix + buf, rest, merger, out)
+        out.extend(merger.flush())
+        yield from out
+
+
+def token_length_function() -> Callable[[str], int]:
+    """tiktoken 기준 토큰 수 (인코더를 못 불러오면 추정치)."""
+    from utils.tokens import count_tokens
+    return count_tokens
+
+
+def make_chunker(chunk_size: int, chunk_overlap: int, length_mode: str = "chars",
+                 separators: Optional[List[str]] = None) -> TextChunker:
+    if length_mode == "chars":
+        length_function = len
+    elif length_mode == "tokens":
+        length_function = token_length_function()
+    else:
+        raise ValueError(f"지원하지 않는 길이 기준: {length_mode} (chars 또는 tokens)")
+    return TextChunker(chunk_size, chunk_overlap, separators=separators, length_function=length_function)
@@ -0,0 +1,181 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+# 임베딩 백엔드: 배포마다 EMBED_BACKEND로 고른다.
+# - openai: OpenAI 호환 API (config.EMBED_MODEL). 질문마다 네트워크 왕복이 든다.
+# - onnx:   로컬 경로(EMBED_MODEL_PATH)의 model.onnx + tokenizer.json을 CPU에서 돌린다 (onnxruntime, tokenizers).
+#           여러 배치는 스레드 풀에서 병렬로 추론하고 (onnxruntime은 추론 중 GIL을 놓는다), 질문 하나는 바로 돈다.
+# - hash:   utils.local_embedder.HashingEmbedder. 결정적이고 의존성이 없어 테스트/부하 테스트용이다.
+# 백엔드는 모두 embed_texts(texts) -> (n, dim) float32, embed_text(text) -> (1, dim)과 name, dim을 가진다.
+# openai 호출은 caller(utils.resilient_call.ResilientCaller)를 주면 시도별 timeout/재시도를 거치고 (SDK 자체 재시도는 끈다),
+# 질문 하나(embed_text)는 헤징도 한다. 배치(embed_texts)는 커서 두 번 보내면 부하가 크므로 재시도만 한다.
+# admission(utils.admission.AdmissionController)을 주면 호출 하나(재시도/헤지 포함)가 입장 제어를 한 번 거친다:
+# 질문은 interactive 차선, 배치는 bulk 차선이다. 자리를 얻은 뒤에만 시도를 보내므로, 대기열에서 포기된 호출이
+# 나중에 요청을 보내는 일은 없다.
+# query_window > 0이면 여러 요청의 질문 임베딩을 utils.micro_batch.MicroBatcher로 모아 한 번의 다건 요청으로 보낸다
+# (최대 query_batch_max개, 같은 질문은 한 번만). 동시 검색이 많을 때 API 요청 수가 배치 크기만큼 준다.
+#
+# 인덱스마다 어떤 백엔드와 차원으로 만들었는지 index.faiss 옆 embedding.json에 남긴다.
+# 다른 백엔드의 질문 벡터는 같은 차원이어도 다른 공간이므로, 기록이 다르면 검색/추가를 거부한다.
+
+RECORD_FILE = "embedding.json"
+BACKENDS = ("openai", "onnx", "hash")
+
+
+class OpenAIEmbedder:
+    def __init__(self, get_client: Callable, model: str, batch_size: int = 100, caller=None, admission=None,
+                 query_window: float = 0.0, query_batch_max: int = 32):
+        self._get_client = get_client  # 호출할 때마다 부른다 (클라이언트는 처음 쓸 때 만들어진다)
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.caller = caller
+        self.admission = admission
+        self.name = f"openai:{model}"
+        self.dim: Optional[int] = None  # 첫 응답으로 정한다 (호환 서버/모델마다 다르다)
+        self._base_client = None
+        self._no_retry_client = None
+        self.query_batcher = None
+        if query_window > 0 and query_batch_max > 1:
+            from utils.micro_batch import MicroBatcher
+            self.query_batcher = MicroBatcher(self._embed_queries, window_seconds=query_window, max_items=query_batch_max)
+
+    def _client(self):
+        client = self._get_client()
+        if self.caller is None:
+            return client
+        if client is not self._base_client:  # 재시도는 caller가 하므로 SDK 재시도는 끈 사본을 쓴다
+            self._base_client, self._no_retry_client = client, client.with_options(max_retries=0)
+        return self._no_retry_client
+
+    def _send(self, inputs, hedge: bool):
+        if self.caller is None:
+            return self._client().embeddings.create(input=inputs, model=self.model)
+        return self.caller.call(
+            lambda timeout: self._client().embeddings.create(input=inputs, model=self.model, timeout=timeout), hedge=hedge)
+
+    def _create(self, inputs, hedge: bool = False, lane: str = "bulk") -> np.ndarray:
+        if self.admission is None:
+            data = self._send(inputs, hedge).data
+        else:
+            from utils.admission import estimate_tokens
+            tokens = estimate_tokens([inputs] if isinstance(inputs, str) else inputs)
+            data = self.admission.call(lane, lambda: self._send(inputs, hedge), tokens=tokens).data
+        vectors = np.asarray([d.embedding for d in sorted(data, key=lambda d: d.index)], dtype="float32")
+        if len(vectors):
+            self.dim = vectors.shape[1]
+        return vectors
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype="float32")
+        return np.vstack([self._create(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)])
+
+    def embed_text(self, text: str) -> np.ndarray:
+        if self.query_batcher is not None:
+            return self.query_batcher.submit(text).reshape(1, -1)
+        return self._create(text, hedge=True, lane="interactive").reshape(1, -1)
+
+    def _embed_queries(self, texts: List[str]) -> List[np.ndarray]:
+        unique = list(dict.fromkeys(texts))
+        vectors = self._create(unique[0] if len(unique) == 1 else unique, hedge=True, lane="interactive")
+        row = {text: i for i, text in enumerate(unique)}
+        return [vectors[row[text]] for text in texts]
+
+
+class OnnxEmbedder:
+    """문장 임베딩 ONNX 모델 (예: multilingual-e5-small, bge-m3를 ONNX로 내보낸 것).
+    출력이 (배치, 토큰, 차원)이면 attention mask로 평균 풀링하고, (배치, 차원)이면 그대로 쓴다. 결과는 L2 정규화한다."""
+
+    def __init__(self, model_path: str, batch_size: int = 32, threads: int = 2, max_length: int = 256):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("EMBED_BACKEND=onnx에는 onnxruntime과 tokenizers 패키지가 필요합니다.") from e
+        path = Path(model_path)
+        model_dir = path if path.is_dir() else path.parent
+        model_file = path / "model.onnx" if path.is_dir() else path
+        if not model_file.exists() or not (model_dir / "tokenizer.json").exists():
+            raise RuntimeError(f"ONNX 임베딩 모델을 찾을 수 없습니다: {model_file} (+ tokenizer.json)")
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        if self.tokenizer.padding is None:
+            self.tokenizer.enable_padding()
+        threads = max(1, threads)
+        options = ort.SessionOptions()
+        # 배치 병렬(threads) × 연산자 병렬이 코어 수를 넘지 않도록 나눈다.
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // threads)
+        self.session = ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="embed") if threads > 1 else None
+        self.batch_size = max(1, batch_size)
+        self.name = f"onnx:{model_dir.name}"
+        self.dim: int = self._run(["warmup"]).shape[1]  # 워밍업 겸 차원 확인
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.asarray([e.ids for e in encodings], dtype="int64")
+        mask = np.asarray([e.attention_mask for e in encodings], dtype="int64")
+        feeds = {"input_ids": ids, "attention_mask": mask, "token_type_ids": np.zeros_like(ids)}
+        out = self.session.run(None, {k: v for k, v in feeds.items() if k in self._inputs})[0]
+        if out.ndim == 3:
+            weights = mask[..., None].astype("float32")
+            out = (out * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        out = np.ascontiguousarray(out, dtype="float32")
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype="float32")
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self._pool is None:
+            return np.vstack([self._run(b) for b in batches])
+        return np.vstack(list(self._pool.map(self._run, batches)))
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self._run([text])
+
+
+def make_embedder(backend: str, get_client: Optional[Callable] = None, model: str = "text-embedding-3-small",
+                  model_path: str = "", batch_size: int = 100, threads: int = 2, max_length: int = 256,
+                  dim: int = 384, caller=None, admission=None, query_window: float = 0.0, query_batch_max: int = 32):
+    if backend == "openai":
+        return OpenAIEmbedder(get_client, model, batch_size=batch_size, caller=caller, admission=admission,
+                              query_window=query_window, query_batch_max=query_batch_max)
+    if backend == "onnx":
+        if not model_path:
+            raise RuntimeError("EMBED_BACKEND=onnx에는 EMBED_MODEL_PATH(모델 디렉터리 또는 .onnx 파일)가 필요합니다.")
+        return OnnxEmbedder(model_path, batch_size=min(batch_size, 64), threads=threads, max_length=max_length)
+    if backend == "hash":
+        from utils.local_embedder import HashingEmbedder
+        return HashingEmbedder(dim=dim)
+    raise ValueError(f"지원하지 않는 임베딩 백엔드: {backend} ({', '.join(BACKENDS)} 중 선택)")
+
+
+# ---------- 인덱스별 임베딩 기록 ----------
+
+def record_path(index_path: str) -> str:
+    return str(Path(index_path).with_name(RECORD_FILE))
+
+
+def embedding_record(embedder, dim: Optional[int] = None) -> dict:
+    return {"backend": embedder.name, "dim": int(dim if dim is not None else embedder.dim)}
+
+
+def incompatibility(record: Optional[dict], embedder, index_dim: Optional[int] = None) -> Optional[str]:
+    """인덱스(기록 record, 차원 index_dim)를 이 임베더의 벡터로 검색/추가할 수 없으면 이유, 괜찮으면 None.
+    기록이 없는 예전 인덱스는 차원만 비교한다 (임베더 차원을 아직 모르면 비교하지 않는다)."""
+    if record and record.get("backend") != embedder.name:
+        return (f"이 인덱스는 다른 임베딩 백엔드({record.get('backend')}, {record.get('dim')}차원)로 만들어졌습니다. "
+                f"현재 백엔드: {embedder.name}")
+    expected = (record or {}).get("dim") or index_dim
+    if expected and embedder.dim and int(expected) != int(embedder.dim):
+        return f"인덱스 차원({expected})과 현재 임베딩 차원({embedder.dim}, {embedder.name})이 다릅니다."
+    return None
@@ -0,0 +1,101 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 영구 임베딩 캐시 (SQLite). 키는 (모델, 텍스트 sha256), 값은 float32 벡터 바이트.
+# - 같은 텍스트는 모델이 같으면 다시 임베딩하지 않는다 (실험 재실행, 청크 크기별 중복 청크, 같은 질문 세트).
+# - embed_cached는 캐시에 없는 텍스트만 모아 batch_size 단위로 embed_fn을 부르고 결과를 저장한다.
+# - 여러 스레드에서 써도 되도록 스레드마다 연결을 따로 연다 (WAL).
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    key TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model, key)
+);
+"""
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """캐시에 있는 텍스트만 {텍스트 키: 벡터}로 돌려준다."""
+        keys = list({text_key(t) for t in texts})
+        found: Dict[str, np.ndarray] = {}
+        conn = self._conn()
+        for start in range(0, len(keys), 500):  # SQLite 변수 수 제한
+            part = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(part))})",
+                [model, *part],
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="<f4")
+        return found
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        rows = [(model, text_key(t), vectors.shape[1], vectors[i].tobytes()) for i, t in enumerate(texts)]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (model, key, dim, vector) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def embed_cached(self, model: str, texts: List[str], embed_fn: Callable[[List[str]], np.ndarray],
+                     batch_size: int = 100) -> np.ndarray:
+        """texts 순서대로 (len(texts), dim) 배열을 돌려준다. 캐시에 없는 (중복 제거한) 텍스트만 임베딩한다."""
+        found = self.get_many(model, texts)
+        missing: List[str] = []
+        seen = set()
+        for t in texts:
+            key = text_key(t)
+            if key not in found and key not in seen:
+                seen.add(key)
+                missing.append(t)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            vectors = np.asarray(embed_fn(batch), dtype="float32")
+            self.put_many(model, batch, vectors)
+            for t, v in zip(batch, vectors):
+                found[text_key(t)] = v
+        if not texts:
+            return np.empty((0, 0), dtype="float32")
+        return np.vstack([found[text_key(t)] for t in texts]).astype("float32")
+
+    def close(self):
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
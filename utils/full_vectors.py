@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# 축소 차원 검색 + 전체 차원 재정렬 (2단계 검색).
+# text-embedding-3 계열은 앞쪽 차원만 잘라 다시 L2 정규화해도 쓸 만한 임베딩이 된다 (API의 dimensions 파라미터와 같은 방식).
+# - 세션 FAISS 인덱스에는 앞 search_dim 차원만 넣어 작고 빠르게 후보를 찾고,
+# - 전체 차원 벡터는 index.faiss 옆 vectors.f32에 두었다가 후보 행만 메모리 맵으로 읽어 전체 내적으로 다시 정렬한다.
+#
+# vectors.f32: 헤더 없는 float32 행의 연속이고 행 번호가 청크 id다 (세션 청크 id는 0부터 빈틈없이 늘어난다).
+# - 쓰기는 새 청크 id 자리에 덮어쓰므로, 커밋 전에 멈춘 꼬리는 다음 쓰기가 같은 자리를 다시 쓴다.
+# - 읽는 쪽은 커밋된 청크 수만큼만 매핑한다. 삭제(압축)된 청크의 행은 남지만 인덱스 후보로 나오지 않는다.
+# - 세션 벡터 차원(record["dim"])은 인덱스별 임베딩 기록(embedding.json, utils/embedders.py)에 있다.
+
+FILE_NAME = "vectors.f32"
+_ROW_DTYPE = np.dtype("<f4")
+
+
+def path_for(index_path: str) -> str:
+    return str(Path(index_path).with_name(FILE_NAME))
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """앞 dim 차원만 남기고 다시 L2 정규화한다 ((n, D) 또는 (D,))."""
+    out = np.array(vectors[..., :dim], dtype="float32")
+    norms = np.linalg.norm(out, axis=-1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+def write_rows(path: str, start_id: int, vectors: np.ndarray):
+    """start_id번 행부터 벡터를 쓴다 (파일이 짧으면 늘어난다)."""
+    vectors = np.ascontiguousarray(vectors, dtype=_ROW_DTYPE)
+    row_bytes = vectors.shape[1] * _ROW_DTYPE.itemsize
+    with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as f:
+        f.seek(start_id * row_bytes)
+        f.write(vectors.tobytes())
+
+
+def open_rows(path: str, n_rows: int, dim: int) -> np.ndarray:
+    """앞 n_rows행을 읽기 전용 메모리 맵 (n_rows, dim)으로 연다. 파일이 그보다 짧으면 ValueError."""
+    available = os.path.getsize(path) // (dim * _ROW_DTYPE.itemsize)
+    if available < n_rows:
+        raise ValueError(f"{path}: 전체 차원 벡터가 {available}행뿐입니다 (필요: {n_rows}행)")
+    if n_rows == 0:
+        return np.empty((0, dim), dtype=_ROW_DTYPE)
+    return np.memmap(path, dtype=_ROW_DTYPE, mode="r", shape=(n_rows, dim))
+
+
+def rerank(query: np.ndarray, candidates: Sequence[int], rows: np.ndarray) -> List[Tuple[int, float]]:
+    """후보 청크를 전체 차원 내적으로 다시 매긴 [(청크 id, 점수)] (점수 내림차순).
+    행은 id 순서로 모아 읽는다 (메모리 맵에서 필요한 페이지만 순서대로 읽도록)."""
+    ids = np.unique(np.asarray([i for i in candidates if 0 <= i < len(rows)], dtype="int64"))
+    if not len(ids):
+        return []
+    scores = np.asarray(rows[ids], dtype="float32") @ np.asarray(query, dtype="float32").reshape(-1)
+    order = np.argsort(-scores, kind="stable")
+    return [(int(ids[i]), float(scores[i])) for i in order]
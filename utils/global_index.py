@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from contextlib import nullcontext
+from typing import Callable, ContextManager, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from utils.data_loader import load_chunks
+from utils.embedders import record_path
+
+# 공용 말뭉치(data/index.faiss + data/text_chunks.txt)를 백그라운드에서 구축/갱신한다.
+# - 서버는 바로 요청을 받고, 구축이 끝나면 (인덱스, 청크) 스냅샷을 한 번에 교체한다.
+# - 청크 내용 해시(chunk_meta.jsonl의 hash)가 같은 청크는 기존 인덱스에서 벡터를 꺼내 재사용하고,
+#   바뀐 청크만 다시 임베딩한다.
+# - 디스크 파일이 바뀐 것을 감지하면(직접 수정, 세션 없는 업로드) 다시 증분 갱신한다.
+# - 디스크에 다시 쓸 때는 업로드와 같은 쓰기 잠금(write_lock)을 잡고, 읽은 뒤 파일이 바뀌었으면 쓰지 않는다.
+# - 만든 임베딩 백엔드를 embedding.json에 남기고, 백엔드가 바뀌면 (다른 벡터 공간이므로) 재사용하지 않고 전부 다시 임베딩한다.
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _file_sig(*paths: str) -> Tuple:
+    sig = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def _read_record(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _read_meta(meta_path: str) -> List[dict]:
+    if not os.path.exists(meta_path):
+        return []
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class GlobalIndex:
+    def __init__(self, index_path: str, text_path: str, meta_path: str,
+                 embed_batch: Callable[[List[str]], np.ndarray], batch_size: int = 100,
+                 write_lock: Optional[Callable[[], ContextManager]] = None,
+                 backend: Optional[Callable[[], str]] = None):
+        self.index_path = index_path
+        self.text_path = text_path
+        self.meta_path = meta_path
+        self.embed_batch = embed_batch
+        self.batch_size = batch_size
+        self.write_lock = write_lock or nullcontext
+        self.backend = backend  # 현재 임베딩 백엔드 이름 (구축할 때마다 부른다)
+        self.record_path = record_path(index_path)
+        self.snapshot: Optional[Tuple[faiss.Index, List[str]]] = None
+        self._snapshot_sig: Optional[Tuple] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status = {"state": "idle", "total": 0, "reused": 0, "embedded": 0, "error": None,
+                       "started_at": None, "finished_at": None}
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None or self.status["state"] == "empty"
+
+    def start(self) -> bool:
+        """백그라운드 구축을 시작한다. 이미 진행 중이면 False."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run, name="global-index-build", daemon=True)
+            self._thread.start()
+            return True
+
+    def get(self) -> Optional[Tuple[faiss.Index, List[str]]]:
+        """현재 스냅샷. 디스크가 바뀌었으면 갱신을 시작하되, 끝날 때까지는 이전 스냅샷을 그대로 준다."""
+        if self.status["state"] == "idle" or (
+                self._snapshot_sig is not None and _file_sig(self.index_path, self.text_path) != self._snapshot_sig):
+            self.start()
+        return self.snapshot
+
+    def _run(self):
+        self.status.update({"state": "building", "error": None, "started_at": time.time(), "finished_at": None,
+                            "reused": 0, "embedded": 0})
+        try:
+            self.refresh()
+        except Exception as e:
+            self.status.update({"state": "failed", "error": str(e)})
+            print(f"[ERROR] 공용 인덱스 구축 실패: {e}")
+        finally:
+            self.status["finished_at"] = time.time()
+
+    def refresh(self):
+        if not Path(self.text_path).exists():
+            self.status["state"] = "empty"
+            return
+        sig_before = _file_sig(self.index_path, self.text_path)
+        chunks = load_chunks(path=self.text_path)
+        self.status["total"] = len(chunks)
+        if not chunks:
+            self.status["state"] = "empty"
+            return
+        hashes = [chunk_hash(c) for c in chunks]
+
+        old_index = faiss.read_index(self.index_path) if Path(self.index_path).exists() else None
+        old_meta = _read_meta(self.meta_path)
+        old_hashes = [m.get("hash") for m in old_meta]
+        if old_index is not None and (len(old_hashes) != old_index.ntotal or not all(old_hashes)):
+            # 해시가 없는 예전 인덱스: 인덱스가 텍스트보다 새롭고 개수가 같으면 순서대로 일치한다고 본다.
+            idx_mtime = Path(self.index_path).stat().st_mtime
+            txt_mtime = Path(self.text_path).stat().st_mtime
+            old_hashes = hashes if (old_index.ntotal == len(chunks) and idx_mtime >= txt_mtime) else []
+
+        backend = self.backend() if self.backend else None
+        stored = _read_record(self.record_path)
+        if old_index is not None and backend and stored and stored.get("backend") != backend:
+            print(f"[INFO] 공용 인덱스: 임베딩 백엔드가 바뀌어({stored.get('backend')} → {backend}) 전체를 다시 임베딩합니다.")
+            old_hashes = []
+
+        position = {h: i for i, h in enumerate(old_hashes) if h and old_index is not None and i < old_index.ntotal}
+        old_vectors = old_index.reconstruct_n(0, old_index.ntotal) if position else None
+
+        vectors: List[Optional[np.ndarray]] = [None] * len(chunks)
+        missing = []
+        for i, h in enumerate(hashes):
+            if h in position:
+                vectors[i] = old_vectors[position[h]]
+            else:
+                missing.append(i)
+        self.status["reused"] = len(chunks) - len(missing)
+        if missing:
+            print(f"[INFO] 공용 인덱스: {len(chunks)}개 중 {len(missing)}개 청크만 새로 임베딩합니다.")
+        self._embed(chunks, missing, vectors)
+        if missing and old_vectors is not None and len(vectors[missing[0]]) != old_vectors.shape[1]:
+            # 기록이 없는 예전 인덱스인데 차원이 다르다: 다른 백엔드로 만든 것이므로 나머지도 다시 임베딩한다.
+            embedded = set(missing)
+            reused = [i for i in range(len(chunks)) if i not in embedded]
+            print(f"[INFO] 공용 인덱스: 기존 벡터 차원({old_vectors.shape[1]})이 달라 {len(reused)}개를 다시 임베딩합니다.")
+            self._embed(chunks, reused, vectors)
+            self.status["reused"] = 0
+            old_hashes = []
+
+        xb = np.vstack(vectors).astype("float32")
+        index = faiss.IndexFlatIP(xb.shape[1])
+        index.add(xb)
+        record = {"backend": backend, "dim": int(xb.shape[1])} if backend else None
+
+        if (missing or old_index is None or len(old_meta) != len(chunks) or old_hashes != hashes
+                or (record is not None and stored != record)):
+            with self.write_lock():
+                if _file_sig(self.index_path, self.text_path) == sig_before:
+                    self._write(index, chunks, hashes, old_meta, old_hashes, record)
+                # 구축 중에 업로드가 있었다면 쓰지 않는다: 스냅샷만 바꾸고, 다음 get()이 다시 갱신한다.
+        self.snapshot = (index, chunks)
+        # 텍스트 서명은 읽기 전 값을 남긴다: 구축 중에 텍스트가 또 바뀌었다면 다음 get()에서 다시 갱신된다.
+        self._snapshot_sig = (_file_sig(self.index_path)[0], sig_before[1])
+        self.status["state"] = "ready"
+        print(f"[OK] 공용 인덱스 준비 완료: {len(chunks)}개 (재사용 {self.status['reused']}, 신규 {self.status['embedded']})")
+
+    def _embed(self, chunks: List[str], positions: List[int], vectors: List[Optional[np.ndarray]]):
+        for start in range(0, len(positions), self.batch_size):
+            batch = positions[start:start + self.batch_size]
+            embeds = self.embed_batch([chunks[i] for i in batch])
+            for i, vec in zip(batch, embeds):
+                vectors[i] = vec
+            self.status["embedded"] += len(batch)
+
+    def _write(self, index: faiss.Index, chunks: List[str], hashes: List[str], old_meta: List[dict], old_hashes: List[str],
+               record: Optional[dict] = None):
+        """인덱스와 메타데이터(와 임베딩 기록)를 임시 파일에 쓴 뒤 rename으로 교체한다."""
+        by_hash = {h: m for h, m in zip(old_hashes, old_meta) if h} if len(old_hashes) == len(old_meta) else {}
+        Path(self.index_path).parent.mkdir(parents=True, exist_ok=True)
+        meta_tmp = self.meta_path + ".tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            for h in hashes:
+                m = dict(by_hash.get(h, {}))
+                m["hash"] = h
+                f.write(json.dumps(m, ensure_ascii=False) + "\n")
+        index_tmp = self.index_path + ".tmp"
+        faiss.write_index(index, index_tmp)
+        os.replace(meta_tmp, self.meta_path)
+        os.replace(index_tmp, self.index_path)
+        if record is not None:
+            record_tmp = self.record_path + ".tmp"
+            with open(record_tmp, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(record_tmp, self.record_path)
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# 그룹 커밋: 같은 키(말뭉치)에 동시에 들어온 쓰기 요청을 한 배치로 묶어 한 번에 적용한다.
+# - 먼저 온 요청이 리더가 되어 window초 동안 다른 요청을 모은 뒤 apply_batch(key, items)를 한 번 부른다.
+# - 배치를 적용하는 동안 들어온 요청은 다음 배치로 모이고, 리더는 끝나면 대기 중인 첫 요청에게 리더를 넘긴다
+#   (넘겨받은 리더는 이미 쌓인 요청이 있으므로 기다리지 않고 바로 적용한다).
+# - 각 요청은 자기 항목이 들어간 배치가 끝나야(= 저장/커밋 완료) 결과를 받는다. 배치가 실패하면 모두 같은 예외를 받는다.
+# 배경 스레드 없이 요청 스레드가 직접 적용하므로, 쓰기가 한 건뿐이면 window만큼만 늦어진다.
+
+
+class _Pending:
+    __slots__ = ("item", "wake", "done", "result", "error")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.wake = threading.Event()  # 결과가 나왔거나 리더로 지목됨
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitter:
+    def __init__(self, apply_batch: Callable[[Hashable, List[Any]], List[Any]],
+                 window_seconds: float = 0.02, max_items: int = 64):
+        self.apply_batch = apply_batch
+        self.window = window_seconds
+        self.max_items = max_items
+        self._queues: Dict[Hashable, List[_Pending]] = {}
+        self._leading: set = set()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0}
+
+    def submit(self, key: Hashable, item: Any) -> Any:
+        """항목을 넣고, 그 항목이 들어간 배치가 적용될 때까지 기다려 결과를 돌려준다."""
+        pending = _Pending(item)
+        with self._lock:
+            self._queues.setdefault(key, []).append(pending)
+            lead = key not in self._leading
+            if lead:
+                self._leading.add(key)
+        if lead:
+            if self.window > 0:
+                time.sleep(self.window)  # 동시에 들어오는 요청을 모은다
+            self._lead(key)
+        while not pending.done:
+            pending.wake.wait()
+            pending.wake.clear()
+            if not pending.done:
+                self._lead(key)  # 이전 리더가 넘겨줌
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _lead(self, key: Hashable):
+        with self._lock:
+            queue = self._queues.get(key, [])
+            batch, self._queues[key] = queue[:self.max_items], queue[self.max_items:]
+        try:
+            results = self.apply_batch(key, [p.item for p in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"배치 결과 수가 맞지 않습니다: {len(results)} != {len(batch)}")
+            for p, result in zip(batch, results):
+                p.result = result
+        except BaseException as e:
+            for p in batch:
+                p.error = e
+        with self._lock:
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            queue = self._queues.get(key)
+            if queue:
+                queue[0].wake.set()  # 리더를 넘긴다
+            else:
+                self._queues.pop(key, None)
+                self._leading.discard(key)
+        for p in batch:
+            p.done = True
+            p.wake.set()
@@ -0,0 +1,269 @@
+import heapq
+import math
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# 문자 n-gram 기반 BM25 역색인.
+# 형태소 분석기 없이도 한국어 검색이 되도록 공백 단위 토큰을 n글자씩 잘라 색인한다.
+# 임베딩 API를 전혀 호출하지 않으므로 API 장애/레이트리밋 상황에서도 검색이 가능하다.
+#
+# 디스크 포맷 (lexical.idx): 세그먼트가 이어 붙은 append-only 파일
+#   세그먼트 = MAGIC(4B) + body_len(u32 LE) + body
+#   body     = varint doc_base, varint n_docs, n_docs × varint doc_len,
+#              varint n_terms, 항목마다 [varint term_len, term(utf-8), varint df,
+#              df × (varint doc_gap, varint tf)]
+# 문서 id는 세그먼트 안에서 delta(gap) 인코딩되므로 포스팅 리스트가 작다.
+# 업로드마다 새 세그먼트만 덧붙이고(O(새 청크)), 세그먼트가 많아지면 하나로 합친다.
+
+MAGIC = b"LXS1"
+_HEADER = struct.Struct("<4sI")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _write_varint(buf: bytearray, value: int):
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(data, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def tokenize(text: str, ngram: int = 2) -> List[str]:
+    """공백으로 나눈 각 토큰을 n글자 단위로 잘라 반환 (n보다 짧은 토큰은 그대로)."""
+    terms = []
+    for word in _SPACE_RE.split(text.lower()):
+        if not word:
+            continue
+        if len(word) <= ngram:
+            terms.append(word)
+            continue
+        terms.extend(word[i:i + ngram] for i in range(len(word) - ngram + 1))
+    return terms
+
+
+class LexicalIndex:
+    def __init__(self, ngram: int = 2, k1: float = 1.2, b: float = 0.75):
+        self.ngram = ngram
+        self.k1 = k1
+        self.b = b
+        self.doc_lens = array("I")
+        self.total_len = 0
+        # term -> (문서 id 배열, tf 배열). 문서 id는 오름차순.
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.segments = 0
+        self._norm = None  # 문서 길이 정규화 항 캐시 (문서 수가 바뀌면 다시 계산)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_lens)
+
+    # ---------- 색인 ─────────────────────────────
+    def add(self, texts: Iterable[str]) -> bytes:
+        """문서를 추가하고, 추가분만 담은 세그먼트 바이트를 반환한다."""
+        doc_base = self.n_docs
+        seg_lens, seg_postings = _index_documents(texts, doc_base, self.ngram)
+        self._merge(doc_base, seg_lens, seg_postings)
+        self.segments += 1
+        return _encode_segment(doc_base, seg_lens, seg_postings)
+
+    def _merge(self, doc_base: int, doc_lens: List[int], postings: Dict[str, List[Tuple[int, int]]]):
+        if doc_base != self.n_docs:
+            raise ValueError(f"세그먼트 순서가 맞지 않습니다: doc_base={doc_base}, n_docs={self.n_docs}")
+        self.doc_lens.extend(doc_lens)
+        self.total_len += sum(doc_lens)
+        for term, plist in postings.items():
+            ids, tfs = self.postings.setdefault(term, (array("I"), array("I")))
+            for doc_id, tf in plist:
+                ids.append(doc_id)
+                tfs.append(tf)
+
+    # ---------- 검색 ─────────────────────────────
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """BM25 점수 상위 top_k개의 (문서 id, 점수)를 반환한다."""
+        n = self.n_docs
+        if n == 0 or top_k <= 0:
+            return []
+        k1 = self.k1
+        if self._norm is None or len(self._norm) != n:
+            doc_lens = np.frombuffer(self.doc_lens, dtype=np.uint32).astype(np.float32)
+            avgdl = self.total_len / n or 1.0
+            self._norm = k1 * (1.0 - self.b + self.b * doc_lens / avgdl)
+        scores = np.zeros(n, dtype=np.float32)
+        for term, qtf in Counter(tokenize(query, self.ngram)).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            # 한 term 안에서 문서 id는 중복되지 않으므로 fancy-index 누적이 안전하다.
+            ids = np.frombuffer(posting[0], dtype=np.uint32)
+            tfs = np.frombuffer(posting[1], dtype=np.uint32).astype(np.float32)
+            df = len(ids)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5)) * qtf
+            scores[ids] += idf * tfs * (k1 + 1.0) / (tfs + self._norm[ids])
+        k = min(top_k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    # ---------- 직렬화 ───────────────────────────
+    def to_bytes(self) -> bytes:
+        """전체 색인을 단일 세그먼트로 직렬화한다 (컴팩션용)."""
+        postings: Dict[str, List[Tuple[int, int]]] = {
+            term: list(zip(ids, tfs)) for term, (ids, tfs) in self.postings.items()
+        }
+        return _encode_segment(0, list(self.doc_lens), postings)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, ngram: int = 2, k1: float = 1.2, b: float = 0.75) -> "LexicalIndex":
+        idx = cls(ngram=ngram, k1=k1, b=b)
+        for doc_base, doc_lens, postings in _iter_segments(data):
+            idx._merge(doc_base, doc_lens, postings)
+            idx.segments += 1
+        return idx
+
+    @classmethod
+    def load(cls, path: str, ngram: int = 2, k1: float = 1.2, b: float = 0.75) -> "LexicalIndex":
+        return cls.from_bytes(Path(path).read_bytes(), ngram=ngram, k1=k1, b=b)
+
+    def save(self, path: str):
+        """단일 세그먼트로 원자적으로 다시 쓴다."""
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        # 여러 스레드/워커가 동시에 다시 만들어도 임시 파일이 겹치지 않게 한다.
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(self.to_bytes())
+        tmp.replace(p)
+        self.segments = 1
+
+
+def _index_documents(texts: Iterable[str], doc_base: int, ngram: int):
+    doc_lens = []
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for offset, text in enumerate(texts):
+        terms = tokenize(text, ngram)
+        doc_lens.append(len(terms))
+        for term, tf in Counter(terms).items():
+            postings.setdefault(term, []).append((doc_base + offset, tf))
+    return doc_lens, postings
+
+
+def encode_documents(texts: Iterable[str], doc_base: int, ngram: int = 2) -> bytes:
+    """문서 id가 doc_base부터 시작하는 세그먼트를 만든다 (파일 끝에 덧붙이는 용도)."""
+    doc_lens, postings = _index_documents(texts, doc_base, ngram)
+    return _encode_segment(doc_base, doc_lens, postings)
+
+
+def _encode_segment(doc_base: int, doc_lens: List[int], postings: Dict[str, List[Tuple[int, int]]]) -> bytes:
+    body = bytearray()
+    _write_varint(body, doc_base)
+    _write_varint(body, len(doc_lens))
+    for dl in doc_lens:
+        _write_varint(body, dl)
+    _write_varint(body, len(postings))
+    for term, plist in postings.items():
+        tb = term.encode("utf-8")
+        _write_varint(body, len(tb))
+        body += tb
+        _write_varint(body, len(plist))
+        prev = doc_base
+        for doc_id, tf in plist:
+            _write_varint(body, doc_id - prev)
+            _write_varint(body, tf)
+            prev = doc_id
+    return _HEADER.pack(MAGIC, len(body)) + bytes(body)
+
+
+def _iter_segments(data: bytes):
+    """세그먼트를 순서대로 해석한다. 잘린 꼬리(쓰기 도중 중단)는 무시한다."""
+    view = memoryview(data)
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        magic, body_len = _HEADER.unpack_from(data, pos)
+        start = pos + _HEADER.size
+        if magic != MAGIC or start + body_len > len(data):
+            break
+        body = view[start:start + body_len]
+        p = 0
+        doc_base, p = _read_varint(body, p)
+        n_docs, p = _read_varint(body, p)
+        doc_lens = []
+        for _ in range(n_docs):
+            dl, p = _read_varint(body, p)
+            doc_lens.append(dl)
+        n_terms, p = _read_varint(body, p)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for _ in range(n_terms):
+            tlen, p = _read_varint(body, p)
+            term = bytes(body[p:p + tlen]).decode("utf-8")
+            p += tlen
+            df, p = _read_varint(body, p)
+            plist = []
+            prev = doc_base
+            for _ in range(df):
+                gap, p = _read_varint(body, p)
+                tf, p = _read_varint(body, p)
+                prev += gap
+                plist.append((prev, tf))
+            postings[term] = plist
+        yield doc_base, doc_lens, postings
+        pos = start + body_len
+
+
+def scan(f: BinaryIO) -> Tuple[int, int]:
+    """세그먼트 헤더만 건너뛰며 읽어 (문서 수, 세그먼트 수)를 반환한다."""
+    size = f.seek(0, 2)
+    pos = f.seek(0)
+    n_docs = 0
+    segments = 0
+    while pos + _HEADER.size <= size:
+        magic, body_len = _HEADER.unpack(f.read(_HEADER.size))
+        start = pos + _HEADER.size
+        if magic != MAGIC or start + body_len > size:
+            break
+        head = f.read(min(body_len, 20))
+        doc_base, p = _read_varint(head, 0)
+        count, _ = _read_varint(head, p)
+        n_docs = doc_base + count
+        segments += 1
+        pos = f.seek(start + body_len)
+    return n_docs, segments
+
+
+def scan_file(path: str) -> Tuple[int, int]:
+    if not Path(path).exists():
+        return 0, 0
+    with open(path, "rb") as f:
+        return scan(f)
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], top_k: int, k: int = 60) -> List[Tuple[int, float]]:
+    """여러 순위 목록을 RRF(1 / (k + rank))로 합친다."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return heapq.nlargest(top_k, fused.items(), key=lambda kv: kv[1])
+
+
+def build(texts: Iterable[str], ngram: int = 2, k1: float = 1.2, b: float = 0.75) -> LexicalIndex:
+    idx = LexicalIndex(ngram=ngram, k1=k1, b=b)
+    idx.add(texts)
+    return idx
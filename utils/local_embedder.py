@@ -0,0 +1,68 @@
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+# 결정적 로컬 임베더: 해시된 n-gram을 고정 차원으로 사영한다 (feature hashing, API 호출 없음).
+# - 특징: 단어 unigram, 인접 단어 bigram, 단어 안의 문자 n-gram (한국어 조사가 붙은 "GPT가" ~ "GPT" 가 가깝도록).
+# - 특징마다 crc32로 (차원, 부호)를 정하고 가중치를 더한 뒤 L2 정규화한다. 파이썬 hash()와 달리 프로세스/실행마다 같다.
+# - main.embed_text / embed_texts와 같은 모양 ((1, dim) / (n, dim) float32)을 돌려주므로
+#   벤치마크와 테스트에서 OpenAI 임베딩 대신 쓸 수 있다. 의미 유사도가 아니라 표면(어휘) 유사도만 반영한다.
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 384, char_ngram: int = 3, seed: int = 0):
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self.seed = seed
+        # 인덱스 기록(utils/embedders.py)에 남는 이름: 벡터를 바꾸는 설정이 다르면 이름도 다르다.
+        self.name = f"hash:{dim}" + (f":{char_ngram}:{seed}" if (char_ngram, seed) != (3, 0) else "")
+        # 같은 토큰/바이그램은 해시를 다시 계산하지 않는다 (말뭉치 어휘는 청크 수보다 훨씬 작다).
+        self._token_features = lru_cache(maxsize=1 << 18)(self._compute_token_features)
+        self._bigram_feature = lru_cache(maxsize=1 << 18)(self._compute_bigram_feature)
+
+    def _hash(self, feature: str) -> Tuple[int, float]:
+        h = zlib.crc32(feature.encode("utf-8"), self.seed)
+        return h % self.dim, (1.0 if (h >> 31) & 1 else -1.0)
+
+    def _compute_token_features(self, token: str) -> Tuple[Tuple[int, float], ...]:
+        features = [self._hash("w:" + token)]
+        n = self.char_ngram
+        if n and len(token) > n:
+            padded = f"<{token}>"
+            features += [(b, s * 0.5) for b, s in
+                         (self._hash("c:" + padded[i:i + n]) for i in range(len(padded) - n + 1))]
+        return tuple(features)
+
+    def _compute_bigram_feature(self, pair: Tuple[str, str]) -> Tuple[int, float]:
+        return self._hash("b:" + pair[0] + " " + pair[1])
+
+    def _features(self, text: str) -> List[Tuple[int, float]]:
+        tokens = _TOKEN.findall(text.lower())
+        features: List[Tuple[int, float]] = []
+        for token in tokens:
+            features.extend(self._token_features(token))
+        for pair in zip(tokens, tokens[1:]):
+            features.append(self._bigram_feature(pair))
+        return features
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        rows, cols, vals = [], [], []
+        for row, text in enumerate(texts):
+            for col, val in self._features(text):
+                rows.append(row)
+                cols.append(col)
+                vals.append(val)
+        if rows:
+            np.add.at(out, (np.asarray(rows), np.asarray(cols)), np.asarray(vals, dtype="float32"))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])
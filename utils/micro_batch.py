@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+# 마이크로 배치: 여러 요청 스레드가 거의 동시에 부른 단건 호출(질문 임베딩)을 한 번의 다건 호출로 묶는다.
+# - 먼저 온 요청이 리더가 되어 window초 동안 (또는 max_items개가 찰 때까지) 다른 요청을 모은 뒤
+#   run_batch(items)를 한 번 부르고, 각 요청은 자기 항목의 결과를 받는다. 배치가 실패하면 모두 같은 예외를 받는다.
+# - utils/group_commit.py와 달리 배치를 보내는 순간 리더 자리를 내놓으므로, 그동안 온 요청은 새 배치를 모아
+#   동시에 보낸다 (원격 호출은 순서대로 적용할 필요가 없다). max_items를 넘게 쌓이면 남은 첫 요청이 리더가 된다.
+# - 보내는 중인 배치가 없으면(한가할 때) 기다리지 않고 바로 보낸다. 부하가 있을 때만 window만큼 늦어진다.
+
+
+class _Pending:
+    __slots__ = ("item", "wake", "done", "result", "error")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.wake = threading.Event()  # 결과가 나왔거나 리더로 지목됨
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], window_seconds: float = 0.005, max_items: int = 32):
+        self.run_batch = run_batch
+        self.window = window_seconds
+        self.max_items = max(1, max_items)
+        self._queue: List[_Pending] = []
+        self._leading = False
+        self._inflight = 0  # 보내는 중인 배치 수
+        self._cond = threading.Condition()
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0, "waited_batches": 0}
+
+    def submit(self, item: Any) -> Any:
+        """항목을 넣고, 그 항목이 들어간 배치의 결과를 돌려준다."""
+        pending = _Pending(item)
+        with self._cond:
+            self._queue.append(pending)
+            lead = not self._leading
+            if lead:
+                self._leading = True
+            elif len(self._queue) >= self.max_items:
+                self._cond.notify_all()  # 가득 찼으니 리더가 바로 보낸다
+        if lead:
+            self._lead()
+        while not pending.done:
+            pending.wake.wait()
+            pending.wake.clear()
+            if not pending.done:
+                self._lead()  # 이전 배치에 못 들어가 리더를 넘겨받았다
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _lead(self):
+        with self._cond:
+            waited = self._inflight > 0 and self.window > 0 and len(self._queue) < self.max_items
+            if waited:
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_items:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            batch, self._queue = self._queue[:self.max_items], self._queue[self.max_items:]
+            if self._queue:
+                self._queue[0].wake.set()  # 남은 요청 중 첫 번째가 다음 리더
+            else:
+                self._leading = False
+            self._inflight += 1
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            self.stats["waited_batches"] += int(waited)
+        try:
+            results = self.run_batch([p.item for p in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"배치 결과 수가 맞지 않습니다: {len(results)} != {len(batch)}")
+            for p, result in zip(batch, results):
+                p.result = result
+        except BaseException as e:
+            for p in batch:
+                p.error = e
+        finally:
+            with self._cond:
+                self._inflight -= 1
+        for p in batch:
+            p.done = True
+            p.wake.set()
@@ -0,0 +1,46 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# MMR(max marginal relevance) 다양화: top-k가 청크 겹침(chunk_overlap)이나 같은 문서의 반복으로 거의 같은 청크들로
+# 채워지면 top_k를 늘려도 프롬프트 토큰만 늘고 정보는 늘지 않는다. 후보를 넉넉히 가져온 뒤
+#   다음 청크 = argmax  λ·sim(질문, c) − (1−λ)·max_{고른 s} sim(c, s)
+# 로 하나씩 골라 관련성과 다양성을 함께 본다 (λ=1이면 원래 순서, 작을수록 다양하게).
+# 전체 n×n 유사도 행렬은 만들지 않는다: 고를 때마다 고른 벡터와 후보 전체의 유사도(행렬-벡터 곱 한 번)로
+# "고른 것과의 최대 유사도" 벡터만 갱신한다 (후보 n개, k개 선택에 O(k·n·d)). 기본 후보 수(top_k 10 × 4 = 40개) × 1536차원이면 1코어에서도 0.5ms 안팎이다.
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    """행을 L2 정규화한다. 인덱스 벡터는 대개 이미 정규화되어 있으므로 그때는 나누지 않는다."""
+    norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    if np.allclose(norms, 1.0, atol=1e-3):
+        return vectors
+    return vectors / np.maximum(norms, 1e-12)[:, None]
+
+
+def select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_: float = 0.7) -> List[int]:
+    """candidates (n, d) 중 MMR로 고른 k개의 행 번호 (고른 순서). 벡터는 정규화해서 코사인으로 비교한다."""
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+    c = _normalized(np.asarray(candidates, dtype="float32"))
+    q = _normalized(np.asarray(query, dtype="float32").reshape(1, -1))[0]
+    relevance = lambda_ * (c @ q)
+
+    chosen = [int(np.argmax(relevance))]
+    max_sim = c @ c[chosen[0]]
+    available = np.ones(n, dtype=bool)
+    available[chosen[0]] = False
+    for _ in range(min(k, n) - 1):
+        score = np.where(available, relevance - (1 - lambda_) * max_sim, -np.inf)
+        best = int(np.argmax(score))
+        chosen.append(best)
+        available[best] = False
+        np.maximum(max_sim, c @ c[best], out=max_sim)
+    return chosen
+
+
+def diversify(query: np.ndarray, hits: Sequence[Tuple[int, float]], vectors: np.ndarray, k: int,
+              lambda_: float = 0.7) -> List[Tuple[int, float]]:
+    """검색 결과 hits [(청크 번호, 점수)]와 같은 순서의 벡터 (len(hits), d)로 k개를 고른다. 점수는 원래 점수를 유지한다."""
+    return [hits[i] for i in select(query, vectors, k, lambda_)]
@@ -0,0 +1,132 @@
+import struct
+import zlib
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 업로드 시점의 근사 중복 청크 탐지 (MinHash + LSH).
+# 청크를 문자 5-gram shingle 집합으로 보고, MinHash 서명으로 Jaccard 유사도를 추정한다.
+# LSH 밴드 버킷으로 후보만 골라 서명 일치율로 확인하므로 청크 수가 늘어도 조회 비용이 거의 일정하다.
+#
+# 디스크 포맷 (near_dup.sig): 헤더 + 청크별 서명(uint32 × num_perm)을 순서대로 이어 붙인 append-only 파일.
+#   헤더 = MAGIC(4B) + num_perm(u16) + bands(u16) + seed(u32)
+# i번째 서명은 i번째 청크(FAISS 인덱스 위치)와 같다. LSH 버킷은 로드할 때 메모리에서 다시 만든다.
+
+MAGIC = b"MNH1"
+_HEADER = struct.Struct("<4sHHI")
+_PRIME = 4294967291  # 2^32 미만 최대 소수
+SHINGLE_SIZE = 5
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    t = " ".join(text.split())
+    if len(t) <= SHINGLE_SIZE:
+        grams = [t]
+    else:
+        grams = {t[i:i + SHINGLE_SIZE] for i in range(len(t) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64)
+
+
+class NearDupIndex:
+    def __init__(self, num_perm: int = 128, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm은 bands로 나누어 떨어져야 합니다.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # a, b < 2^32 이므로 a*x+b 가 uint64 범위를 넘지 않는다.
+        self._a = rng.randint(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self.signatures: List[np.ndarray] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        x = shingle_hashes(text)
+        hashed = (np.outer(x, self._a) + self._b) % _PRIME
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, sig: np.ndarray) -> int:
+        chunk_id = len(self.signatures)
+        self.signatures.append(sig)
+        for band, key in self._band_keys(sig):
+            self._buckets[band].setdefault(key, []).append(chunk_id)
+        return chunk_id
+
+    def query(self, sig: np.ndarray, threshold: float, exclude: Optional[Container[int]] = None) -> Optional[Tuple[int, float]]:
+        """유사도가 threshold 이상인 기존 청크 중 가장 비슷한 (청크 id, 추정 Jaccard).
+        exclude에 든 청크(삭제된 청크 등)는 후보에서 뺀다."""
+        candidates = set()
+        for band, key in self._band_keys(sig):
+            candidates.update(self._buckets[band].get(key, ()))
+        best = None
+        for cid in candidates:
+            if exclude is not None and cid in exclude:
+                continue
+            sim = float(np.mean(self.signatures[cid] == sig))
+            if sim >= threshold and (best is None or sim > best[1]):
+                best = (cid, sim)
+        return best
+
+    # ---------- 직렬화 ───────────────────────────
+    def header(self) -> bytes:
+        return _HEADER.pack(MAGIC, self.num_perm, self.bands, self.seed)
+
+    def encode(self, sigs: Iterable[np.ndarray]) -> bytes:
+        """파일 끝에 덧붙일 서명 바이트."""
+        return b"".join(np.asarray(s, dtype="<u4").tobytes() for s in sigs)
+
+    def to_bytes(self) -> bytes:
+        return self.header() + self.encode(self.signatures)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, num_perm: int = 128, bands: int = 16, seed: int = 1) -> Optional["NearDupIndex"]:
+        """설정과 헤더가 다르면 None (서명을 다시 계산해야 함). 잘린 꼬리 레코드는 버린다."""
+        if len(data) < _HEADER.size:
+            return None
+        magic, f_perm, f_bands, f_seed = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or (f_perm, f_bands, f_seed) != (num_perm, bands, seed):
+            return None
+        idx = cls(num_perm=num_perm, bands=bands, seed=seed)
+        row_bytes = num_perm * 4
+        n = (len(data) - _HEADER.size) // row_bytes
+        rows = np.frombuffer(data, dtype="<u4", count=n * num_perm, offset=_HEADER.size).reshape(n, num_perm)
+        for row in rows:
+            idx.add(row.astype(np.uint32))
+        return idx
+
+
+def build(texts: Iterable[str], num_perm: int = 128, bands: int = 16, seed: int = 1) -> NearDupIndex:
+    idx = NearDupIndex(num_perm=num_perm, bands=bands, seed=seed)
+    for text in texts:
+        idx.add(idx.signature(text))
+    return idx
+
+
+def filter_duplicates(idx: NearDupIndex, texts: List[str], threshold: float, exclude: Optional[Container[int]] = None):
+    """새 청크 중 기존 청크(또는 앞선 새 청크)와 근사 중복인 것을 걸러낸다.
+
+    반환: (남길 위치 목록, 남길 서명 목록, [(중복 위치, 기존 청크 id, 유사도)])
+    남긴 청크는 idx에 바로 추가되므로, 같은 업로드 안의 중복도 잡힌다.
+    """
+    keep: List[int] = []
+    keep_sigs: List[np.ndarray] = []
+    duplicates: List[Tuple[int, int, float]] = []
+    for pos, text in enumerate(texts):
+        sig = idx.signature(text)
+        match = idx.query(sig, threshold, exclude=exclude)
+        if match is not None:
+            duplicates.append((pos, match[0], match[1]))
+            continue
+        idx.add(sig)
+        keep.append(pos)
+        keep_sigs.append(sig)
+    return keep, keep_sigs, duplicates
@@ -44,4 +44,15 @@ def check_limits(req: Request, name: str, daily_limit: int, burst_limit: int, se
         raise HTTPException(status_code=429, detail=f"일일 요청 제한을 초과했습니다. {ttl}초 후에 다시 시도하세요.")
     if b_count > burst_limit:
         ttl = int(config.BURST_WINDOW_SECONDS - (now - b_start))
-        raise HTTPException(status_code=429, detail=f"짧은 시간 내 요청이 너무 많습니다. {ttl}초 후에 다시 시도하세요.")
\ No newline at end of file
+        raise HTTPException(status_code=429, detail=f"짧은 시간 내 요청이 너무 많습니다. {ttl}초 후에 다시 시도하세요.")
+
+def prune_expired() -> int:
+    """윈도우가 지난 카운터를 지운다 (세션/IP가 계속 바뀌어도 메모리가 늘지 않도록). 지운 개수를 돌려준다."""
+    now = _now()
+    removed = 0
+    for counts, window in ((_daily_counts, config.RATE_WINDOW_SECONDS), (_burst_counts, config.BURST_WINDOW_SECONDS)):
+        expired = [k for k, (_, start) in list(counts.items()) if now - start >= window]
+        for k in expired:
+            counts.pop(k, None)
+        removed += len(expired)
+    return removed
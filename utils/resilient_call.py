@@ -0,0 +1,205 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# 원격 호출(임베딩 API)의 꼬리 지연과 일시 오류를 다루는 호출 계층.
+# - 시도마다 명시적 timeout을 넘기고, 그 시간이 지나면 응답을 기다리지 않는다 (늦은 스레드는 버려진다).
+#   시간은 시도가 풀 스레드에서 실제로 시작될 때부터 잰다 (풀 대기열에서 기다린 시간은 timeout/지연 통계에 넣지 않는다).
+#   라운드가 끝났는데 아직 시작하지 못한 시도(헤지 등)는 취소해 보내지 않는다.
+# - 재시도할 수 있는 오류(타임아웃, 연결 오류, 408/409/429/5xx)는 지수 백오프 + full jitter로 다시 보낸다.
+# - 헤징(선택): 시도가 최근 지연의 p95(hedge_quantile)를 넘기면 같은 요청을 하나 더 보내고 먼저 온 응답을 쓴다.
+#   느린 1~5%의 요청만 두 번 나가므로 부하는 조금 늘고 p99는 크게 준다.
+# - 추가 부하 예산: 재시도/헤지는 토큰을 하나씩 쓰고, 원래 호출마다 budget_ratio만큼 채워진다 (최대 budget_burst).
+#   API가 계속 실패해도 추가 호출이 원래 호출의 budget_ratio배를 넘지 않아 장애를 키우지 않는다.
+# 시도 종류(primary/retry/hedge)별 횟수, 결과, 지연 분위수와 최근 시도 목록을 stats()로 내보낸다.
+
+ATTEMPT_KINDS = ("primary", "retry", "hedge")
+
+
+class AttemptTimeout(TimeoutError):
+    """시도가 timeout 안에 끝나지 않았다."""
+
+
+class CallFailed(Exception):
+    """재시도까지 모두 실패했다. retryable이면 일시적인 장애(타임아웃, 429, 5xx)다."""
+
+    def __init__(self, message: str, retryable: bool, cause: Optional[BaseException] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.cause = cause
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """HTTP 상태 코드가 있으면 408/409/429/5xx, 없으면 타임아웃/연결 오류만 재시도한다 (openai 예외 포함).
+    예외에 retryable 속성이 있으면 그것을 따른다 (CallFailed, utils.admission.Rejected)."""
+    flag = getattr(exc, "retryable", None)
+    if isinstance(flag, bool):
+        return flag
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in ("APITimeoutError", "APIConnectionError")
+
+
+class ResilientCaller:
+    def __init__(self, timeout: float = 10.0, max_retries: int = 2, backoff_base: float = 0.2, backoff_max: float = 2.0,
+                 hedge: bool = True, hedge_quantile: float = 0.95, hedge_min_delay: float = 0.05,
+                 hedge_initial_delay: float = 0.5, hedge_min_samples: int = 20,
+                 budget_ratio: float = 0.1, budget_burst: float = 10.0,
+                 max_workers: int = 16, window: int = 1000, recent: int = 50):
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_initial_delay = hedge_initial_delay  # 지연 표본이 hedge_min_samples개 모이기 전의 헤지 지연
+        self.hedge_min_samples = hedge_min_samples
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self._tokens = budget_burst
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="remote-call")
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)                          # 성공한 시도의 지연(초), 헤지 지연 계산용
+        self._by_kind = {k: deque(maxlen=window) for k in ATTEMPT_KINDS}  # 종류별 시도 지연(초)
+        self._recent = deque(maxlen=recent)
+        self._hedge_delay: Optional[float] = None
+        self._new_samples = 0
+        self.counters: Dict[str, Any] = {
+            "calls": 0, "failures": 0, "hedge_wins": 0, "hedges_skipped_budget": 0, "retries_skipped_budget": 0,
+            "attempts": {k: {"count": 0, "ok": 0, "timeout": 0, "retryable_error": 0, "error": 0} for k in ATTEMPT_KINDS},
+        }
+
+    # ---------- 예산 / 헤지 지연 ----------
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def hedge_delay(self) -> float:
+        """최근 성공 지연의 hedge_quantile 분위수 (표본이 적으면 hedge_initial_delay). 성공 50번마다 다시 계산한다."""
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return self.hedge_initial_delay
+            if self._hedge_delay is None or self._new_samples >= 50:
+                quantile = float(np.quantile(np.asarray(self._latencies), self.hedge_quantile))
+                self._hedge_delay = max(self.hedge_min_delay, quantile)
+                self._new_samples = 0
+            return self._hedge_delay
+
+    # ---------- 시도 ----------
+
+    def _attempt(self, fn: Callable[[float], Any], kind: str) -> Tuple[Future, threading.Event]:
+        """시도를 풀에 넣는다. (Future, 시작 이벤트) — 이벤트는 풀 스레드가 시도를 시작할 때 켜진다."""
+        running = threading.Event()
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self.counters["attempts"][kind]["count"] += 1  # 취소되어 보내지 않은 시도는 세지 않는다
+            running.set()
+            try:
+                result = fn(self.timeout)
+            except Exception as e:
+                timed_out = isinstance(e, TimeoutError) or type(e).__name__ == "APITimeoutError"
+                self._record(kind, started, "timeout" if timed_out else "retryable_error" if is_retryable(e) else "error")
+                raise
+            self._record(kind, started, "ok")
+            return result
+
+        return self._pool.submit(run), running
+
+    def _record(self, kind: str, started: float, outcome: str):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.counters["attempts"][kind][outcome] += 1
+            self._by_kind[kind].append(elapsed)
+            if outcome == "ok":
+                self._latencies.append(elapsed)
+                self._new_samples += 1
+            self._recent.append({"kind": kind, "ms": round(elapsed * 1000, 2), "outcome": outcome, "at": round(time.time(), 3)})
+
+    def _round(self, fn: Callable[[float], Any], kind: str, hedge: bool) -> Any:
+        """시도 하나(+ 헤지)를 보내 먼저 성공한 결과를 돌려준다. 모두 실패하면 마지막 예외.
+        마지막 시도가 시작된 뒤 timeout이 지나도록 응답이 없으면 AttemptTimeout (남은 시도는 기다리지 않는다)."""
+        primary, running = self._attempt(fn, kind)
+        pending = {primary}
+        try:
+            running.wait()  # 헤지 지연과 timeout은 시도가 실제로 시작된 뒤부터 잰다
+            deadline = time.perf_counter() + self.timeout
+            if hedge and self.hedge:
+                done, _ = wait(pending, timeout=min(self.hedge_delay(), self.timeout))
+                if not done:
+                    if self._spend():
+                        pending.add(self._attempt(fn, "hedge")[0])
+                        deadline = time.perf_counter() + self.timeout
+                    else:
+                        with self._lock:
+                            self.counters["hedges_skipped_budget"] += 1
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = wait(pending, timeout=max(deadline - time.perf_counter(), 0.0), return_when=FIRST_COMPLETED)
+                if not done:
+                    raise AttemptTimeout(f"{self.timeout:.1f}초 안에 응답이 없습니다")
+                for f in done:
+                    if f.exception() is None:
+                        if f is not primary:
+                            with self._lock:
+                                self.counters["hedge_wins"] += 1
+                        return f.result()
+                    error = f.exception()
+            raise error
+        finally:
+            for f in pending:
+                f.cancel()  # 아직 시작하지 못한 시도는 보내지 않는다 (이미 도는 시도는 자기 timeout으로 끝난다)
+
+    def call(self, fn: Callable[[float], Any], hedge: bool = False) -> Any:
+        """fn(timeout)을 재시도/헤지와 함께 호출한다. 실패하면 CallFailed."""
+        with self._lock:
+            self.counters["calls"] += 1
+            self._tokens = min(self.budget_burst, self._tokens + self.budget_ratio)
+        kind = "primary"
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._round(fn, kind, hedge)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if not retryable or attempt == self.max_retries:
+                    return self._fail(e, retryable)
+                if not self._spend():
+                    with self._lock:
+                        self.counters["retries_skipped_budget"] += 1
+                    return self._fail(e, retryable)
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+                kind = "retry"
+
+    def _fail(self, error: Exception, retryable: bool):
+        with self._lock:
+            self.counters["failures"] += 1
+        raise CallFailed(f"{type(error).__name__}: {error}", retryable, error) from error
+
+    # ---------- 지표 ----------
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {k: v for k, v in self.counters.items() if k != "attempts"}
+            out["attempts"] = {}
+            for kind, counts in self.counters["attempts"].items():
+                entry = dict(counts)
+                if self._by_kind[kind]:
+                    ms = np.asarray(self._by_kind[kind]) * 1000
+                    entry.update({f"p{q}_ms": round(float(np.percentile(ms, q)), 2) for q in (50, 95, 99)})
+                out["attempts"][kind] = entry
+            out["budget_tokens"] = round(self._tokens, 2)
+            out["recent"] = list(self._recent)
+        out["hedge_delay_ms"] = round(self.hedge_delay() * 1000, 2) if self.hedge else None
+        return out
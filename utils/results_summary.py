@@ -0,0 +1,197 @@
+import csv
+import heapq
+import io
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 실험 결과 CSV(/results) 요약을 파일별로 한 번만 계산하고, 이어 쓴 행만 읽어 갱신한다.
+# - 가장 최근(mtime) grid_search_*.csv를 고르고, 파일 식별자(dev, inode)와 지금까지 읽은 바이트 위치를 기억한다.
+# - 파일이 같고 길어지기만 했으면 (grid_run이 행을 덧붙이는 중) 읽은 위치부터 완성된 줄만 읽어 집계를 더한다.
+#   읽은 위치 바로 앞 바이트가 달라졌거나 파일이 짧아졌으면 (다시 쓴 파일, 예: grid_run --resume) 처음부터 다시 읽는다.
+#   크기는 그대로인데 mtime이 바뀌었어도 (같은 길이로 다시 쓴 파일) 처음부터 다시 읽는다.
+# - 집계: 행 수, 최고 recall@5/f1, 평균 지연/비용, 만점 수, (recall@5, f1) 상위 10행 (동점이면 먼저 나온 행).
+# - etag는 (파일, 크기, mtime)에서 만들므로 바뀐 게 없으면 대시보드가 304로 가볍게 재검증할 수 있다.
+
+TOP_N = 10
+_TAIL_CHECK = 64  # 다시 쓴 파일인지 확인할 때 비교하는 바이트 수
+REQUIRED_COLUMNS = ("recall@5", "f1", "latency_ms", "cost_cents")
+STRING_COLUMNS = ("run_id",)  # 숫자로만 된 uuid 조각도 문자열로 둔다
+
+
+def _value(text: str) -> Any:
+    """pandas.read_csv와 비슷하게 정수/실수/문자열로 읽는다."""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _float(raw: List[str], i: int) -> float:
+    try:
+        return float(raw[i])
+    except (IndexError, ValueError):
+        return math.nan
+
+
+class _FileSummary:
+    def __init__(self, path: str, ident: Tuple[int, int]):
+        self.path = path
+        self.ident = ident
+        self.offset = 0          # 여기까지의 완성된 줄을 읽었다
+        self.tail = b""          # offset 바로 앞 바이트 (다시 쓴 파일 감지용)
+        self.size = 0            # 마지막으로 읽을 때 본 파일 크기와 mtime
+        self.mtime_ns = 0
+        self.columns: Optional[List[str]] = None
+        self.rows = 0
+        self.best_recall = math.nan
+        self.best_f1 = math.nan
+        self.latency_sum = 0.0
+        self.latency_n = 0
+        self.cost_sum = 0.0
+        self.cost_n = 0
+        self.perfect = 0
+        self._top: List[Tuple[float, float, int, dict]] = []  # (recall, f1, -행 번호, 행) 최소 힙
+
+    def feed(self, data: bytes):
+        reader = csv.reader(io.StringIO(data.decode("utf-8")))
+        if self.columns is None:
+            header = next(reader, None)
+            if header is None:
+                return
+            missing = [c for c in REQUIRED_COLUMNS if c not in header]
+            if missing:
+                raise KeyError(missing[0])
+            self.columns = header
+        # 집계에 필요한 네 열만 숫자로 읽고, 행 전체는 상위 목록에 들어갈 때만 만든다.
+        ri, fi, li, ci = (self.columns.index(c) for c in REQUIRED_COLUMNS)
+        top = self._top
+        for raw in reader:
+            if not raw:
+                continue
+            self.rows += 1
+            recall, f1 = _float(raw, ri), _float(raw, fi)
+            latency, cost = _float(raw, li), _float(raw, ci)
+            if recall == recall:  # NaN이 아니면
+                self.best_recall = recall if self.best_recall != self.best_recall else max(self.best_recall, recall)
+            if f1 == f1:
+                self.best_f1 = f1 if self.best_f1 != self.best_f1 else max(self.best_f1, f1)
+            if latency == latency:
+                self.latency_sum += latency
+                self.latency_n += 1
+            if cost == cost:
+                self.cost_sum += round(cost, 4)
+                self.cost_n += 1
+            if recall == 1.0 and f1 == 1.0:
+                self.perfect += 1
+            if recall != recall:
+                continue  # pandas.nlargest처럼 값이 없는 행은 상위 목록에서 뺀다
+            key = (recall, f1 if f1 == f1 else -math.inf, -self.rows)
+            if len(top) < TOP_N:
+                heapq.heappush(top, key + (self._row(raw),))
+            elif key > top[0][:3]:
+                heapq.heapreplace(top, key + (self._row(raw),))
+
+    def _row(self, raw: List[str]) -> dict:
+        row = {c: v if c in STRING_COLUMNS else _value(v) for c, v in zip(self.columns, raw)}
+        if isinstance(row.get("cost_cents"), (int, float)):
+            row["cost_dollars"] = round(row["cost_cents"], 4)
+        return row
+
+    def payload(self) -> dict:
+        def mean(total, n):
+            return total / n if n else None
+
+        def clean(x):
+            return None if isinstance(x, float) and math.isnan(x) else x
+
+        top = [item[3] for item in sorted(self._top, key=lambda t: t[:3], reverse=True)]
+        summary = {
+            "total_experiments": self.rows,
+            "best_recall": clean(self.best_recall),
+            "best_f1": clean(self.best_f1),
+            "avg_latency_ms": mean(self.latency_sum, self.latency_n),
+            "avg_cost": mean(self.cost_sum, self.cost_n),
+            "perfect_scores": self.perfect,
+        }
+        return {"summary": summary, "top_results": top}
+
+
+class ResultsSummary:
+    def __init__(self, results_dir: str, pattern: str = "grid_search_*.csv"):
+        self.results_dir = Path(results_dir)
+        self.pattern = pattern
+        self._lock = threading.Lock()
+        self._files: Dict[str, _FileSummary] = {}
+        self._listing: Tuple[Optional[int], List[Path]] = (None, [])
+        self.stats = {"full_reads": 0, "incremental_reads": 0, "cached": 0}
+
+    def _candidates(self) -> List[Path]:
+        """디렉터리가 바뀌었을 때(파일 생성/삭제)만 다시 glob한다."""
+        dir_mtime = self.results_dir.stat().st_mtime_ns
+        if self._listing[0] != dir_mtime:
+            self._listing = (dir_mtime, list(self.results_dir.glob(self.pattern)))
+        return self._listing[1]
+
+    def latest(self) -> Tuple[str, os.stat_result]:
+        best = None
+        for path in self._candidates():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            # mtime이 같으면 (체크아웃 직후 등) 이름(= 시각 접미사)이 큰 파일
+            if best is None or (st.st_mtime_ns, path.name) > (best[1].st_mtime_ns, Path(best[0]).name):
+                best = (str(path), st)
+        if best is None:
+            raise FileNotFoundError(str(self.results_dir / self.pattern))
+        return best
+
+    def get(self) -> Tuple[str, dict]:
+        """(etag, {"summary", "top_results"}) — 가장 최근 결과 파일 기준."""
+        with self._lock:
+            path, st = self.latest()
+            summary = self._refresh(path, st)
+            etag = f'"{st.st_ino:x}-{summary.offset:x}-{st.st_mtime_ns:x}"'
+            return etag, summary.payload()
+
+    def _refresh(self, path: str, st: os.stat_result) -> _FileSummary:
+        ident = (st.st_dev, st.st_ino)
+        summary = self._files.get(path)
+        if summary is not None and summary.ident == ident:
+            if (st.st_size, st.st_mtime_ns) == (summary.size, summary.mtime_ns):
+                self.stats["cached"] += 1
+                return summary
+            if st.st_size > summary.size and self._unchanged_prefix(summary):
+                self._read(summary, summary.offset, st)
+                self.stats["incremental_reads"] += 1
+                return summary
+        summary = _FileSummary(path, ident)
+        self._read(summary, 0, st)
+        self._files = {path: summary}  # 최근 파일 하나만 들고 있는다
+        self.stats["full_reads"] += 1
+        return summary
+
+    def _unchanged_prefix(self, summary: _FileSummary) -> bool:
+        if not summary.tail:
+            return summary.offset == 0
+        with open(summary.path, "rb") as f:
+            f.seek(summary.offset - len(summary.tail))
+            return f.read(len(summary.tail)) == summary.tail
+
+    def _read(self, summary: _FileSummary, offset: int, st: os.stat_result):
+        # 읽기 전에 본 크기/mtime을 남긴다 (읽는 도중 덧붙은 행은 다음 호출에서 이어 읽는다)
+        summary.size, summary.mtime_ns = st.st_size, st.st_mtime_ns
+        with open(summary.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # 쓰는 중인 마지막 줄은 다음에 읽는다
+        if end <= 0:
+            return
+        summary.feed(data[:end])
+        summary.offset = offset + end
+        summary.tail = (summary.tail + data[:end])[-_TAIL_CHECK:]
@@ -0,0 +1,153 @@
+import json
+import math
+import re
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 검색 품질 평가: 정답(질문 -> 관련 청크) 라벨로 recall@k, precision@k, hit@k, MRR@k, nDCG@k를 계산한다.
+# - 라벨 파일(JSONL): {"query": ..., "relevant_ids": [청크 id, ...]} 또는 {"query": ..., "relevant_text": [문구, ...]}
+#   relevant_text는 청크 크기가 바뀌어도 쓸 수 있도록 "이 문구가 들어간 청크가 정답"으로 푼다.
+#   청크 경계에서 문구가 잘려도 잡히도록, 긴 문구는 앞/뒤 절반만 들어 있어도 정답으로 본다.
+# - 검색은 가장 큰 k로 한 번만 하고 (faiss 결과는 점수순), 모든 k의 지표를 누적합으로 한 번에 계산한다.
+# - 인덱스 종류(flat / ivf / hnsw / sq8 / pq 또는 faiss index_factory 문자열)를 같은 라벨로 비교한다.
+
+_SPACE = re.compile(r"\s+")
+
+
+def load_labels(path: str) -> List[dict]:
+    labels = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                labels.append(json.loads(line))
+    return labels
+
+
+def _matches(chunk: str, snippet: str) -> bool:
+    if snippet in chunk:
+        return True
+    half = len(snippet) // 2
+    return half >= 8 and (snippet[:half] in chunk or snippet[half:] in chunk)
+
+
+def resolve_relevant(labels: List[dict], chunks: Sequence[str]) -> List[List[int]]:
+    """라벨마다 관련 청크 id 목록. relevant_ids가 있으면 그대로, 없으면 relevant_text로 청크를 찾는다."""
+    normalized = None
+    out = []
+    for label in labels:
+        ids = set(int(i) for i in label.get("relevant_ids", []))
+        snippets = [_SPACE.sub(" ", s).strip() for s in label.get("relevant_text", [])]
+        if snippets:
+            if normalized is None:
+                normalized = [_SPACE.sub(" ", c) for c in chunks]
+            ids.update(i for i, c in enumerate(normalized) if any(_matches(c, s) for s in snippets))
+        out.append(sorted(ids))
+    return out
+
+
+def relevance(ids: np.ndarray, relevant: List[Sequence[int]]) -> np.ndarray:
+    """검색 결과 id (nq, K)가 정답인지 (nq, K) bool. faiss의 빈 자리(-1)는 정답이 될 수 없다."""
+    width = max((len(r) for r in relevant), default=0) or 1
+    padded = np.full((len(relevant), width), -2, dtype="int64")
+    for row, rel in enumerate(relevant):
+        padded[row, :len(rel)] = rel
+    return (ids[:, :, None] == padded[:, None, :]).any(axis=2)
+
+
+def metrics(ids: np.ndarray, relevant: List[Sequence[int]], ks: Sequence[int]) -> Dict[str, np.ndarray]:
+    """질문별 지표 {"recall@k": (nq,), ...}. ids는 점수순 상위 max(ks)개. 정답이 없는 질문은 NaN."""
+    ids = np.asarray(ids, dtype="int64")
+    hits = relevance(ids, relevant)
+    n_rel = np.array([len(set(r)) for r in relevant], dtype="float64")
+    has_rel = n_rel > 0
+    K = ids.shape[1]
+    discounts = 1.0 / np.log2(np.arange(2, K + 2))
+    cum_hits = np.cumsum(hits, axis=1)
+    cum_dcg = np.cumsum(hits * discounts, axis=1)
+    ideal = np.cumsum(discounts)
+    first = np.where(hits.any(axis=1), hits.argmax(axis=1), K)  # 첫 정답 위치 (없으면 K)
+
+    out: Dict[str, np.ndarray] = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for k in ks:
+            kk = min(k, K)
+            found = cum_hits[:, kk - 1] if kk else np.zeros(len(ids))
+            idcg = ideal[np.minimum(n_rel, kk).astype(int) - 1] if kk else np.zeros(len(ids))
+            out[f"recall@{k}"] = np.where(has_rel, found / n_rel, np.nan)
+            out[f"precision@{k}"] = np.where(has_rel, found / k, np.nan)
+            out[f"hit@{k}"] = np.where(has_rel, (found > 0).astype(float), np.nan)
+            out[f"mrr@{k}"] = np.where(has_rel, np.where(first < kk, 1.0 / (first + 1), 0.0), np.nan)
+            dcg = cum_dcg[:, kk - 1] if kk else np.zeros(len(ids))
+            out[f"ndcg@{k}"] = np.where(has_rel, dcg / idcg, np.nan)
+    return out
+
+
+def summarize(per_query: Dict[str, np.ndarray]) -> Dict[str, Optional[float]]:
+    """질문 평균 (정답이 없는 질문 제외)."""
+    out = {}
+    for name, values in per_query.items():
+        valid = values[~np.isnan(values)]
+        out[name] = round(float(valid.mean()), 4) if len(valid) else None
+    return out
+
+
+# ---------- 인덱스 종류 비교 ----------
+
+def index_spec(kind: str, n: int, dim: int) -> str:
+    """별칭을 faiss index_factory 문자열로. 모르는 이름은 factory 문자열로 그대로 쓴다."""
+    nlist = max(1, min(int(4 * math.sqrt(n)), n // 39 or 1))
+    m = next(m for m in (16, 12, 8, 4, 2, 1) if dim % m == 0)
+    nbits = max(1, min(8, int(math.log2(max(n // 8, 2)))))  # 코드북(2^nbits)당 학습 벡터가 8개 이상이 되도록
+    return {
+        "flat": "Flat",
+        "ivf": f"IVF{nlist},Flat",
+        "hnsw": "HNSW32",
+        "sq8": "SQ8",
+        "pq": f"PQ{m}x{nbits}",
+        "ivfpq": f"IVF{nlist},PQ{m}x{nbits}",
+    }.get(kind, kind)
+
+
+def build_index(kind: str, vectors: np.ndarray, nprobe: int = 8, ef_search: int = 64):
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+    index = faiss.index_factory(dim, index_spec(kind, n, dim), faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = max(ef_search, 1)
+    return index
+
+
+def evaluate_index(index, queries: np.ndarray, relevant: List[Sequence[int]], ks: Sequence[int],
+                   exact_ids: Optional[np.ndarray] = None) -> dict:
+    """max(ks)로 한 번 검색해 모든 k의 지표와 검색 지연을 잰다. exact_ids(정확 검색 결과)가 있으면
+    근사 인덱스가 정확한 상위 k를 얼마나 되찾는지(ann_recall@k)도 낸다."""
+    import faiss
+
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    K = max(ks)
+    t0 = time.perf_counter()
+    _, ids = index.search(queries, K)
+    search_s = time.perf_counter() - t0
+    result = {
+        "search_ms_per_query": round(search_s * 1000 / max(len(queries), 1), 4),
+        "bytes_per_vector": round(len(faiss.serialize_index(index)) / max(index.ntotal, 1), 1),
+        "ids": ids,
+    }
+    result.update(summarize(metrics(ids, relevant, ks)))
+    if exact_ids is not None:
+        for k in ks:
+            kk = min(k, exact_ids.shape[1])
+            overlap = [len(set(a[:kk]) & set(b[:kk]) - {-1}) / kk for a, b in zip(ids, exact_ids)]
+            result[f"ann_recall@{k}"] = round(float(np.mean(overlap)), 4)
+    return result
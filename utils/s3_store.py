@@ -1,7 +1,7 @@
 import io
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import boto3
 from botocore.client import Config
 from botocore.exceptions import ClientError
@@ -51,6 +51,15 @@ class S3Store:
         obj = self.s3.get_object(Bucket=self.bucket, Key=key)
         return obj["Body"].read().decode("utf-8")
 
+    def put_bytes(self, session_id: str, name: str, data: bytes):
+        key = self._key(session_id, name)
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def get_bytes(self, session_id: str, name: str) -> bytes:
+        key = self._key(session_id, name)
+        obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+        return obj["Body"].read()
+
     def exists(self, session_id: str, name: str) -> bool:
         key = self._key(session_id, name)
         try:
@@ -59,6 +68,14 @@ class S3Store:
         except Exception:
             return False
 
+    def size(self, session_id: str, name: str) -> int:
+        """객체 크기(바이트). 없으면 0."""
+        key = self._key(session_id, name)
+        try:
+            return int(self.s3.head_object(Bucket=self.bucket, Key=key)["ContentLength"])
+        except Exception:
+            return 0
+
     def put_faiss(self, session_id: str, name: str, index: faiss.Index):
         buf = faiss.serialize_index(index)
         key = self._key(session_id, name)
@@ -68,4 +85,37 @@ class S3Store:
         key = self._key(session_id, name)
         obj = self.s3.get_object(Bucket=self.bucket, Key=key)
         data = obj["Body"].read()
-        return faiss.deserialize_index(data)
\ No newline at end of file
+        return faiss.deserialize_index(data)
+
+    def _session_prefix(self, session_id: str = "") -> str:
+        base = f"{self.prefix}sessions/" if self.prefix else "sessions/"
+        return base + (f"{session_id.strip()}/" if session_id else "")
+
+    def _iter_objects(self, prefix: str):
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+    def list_sessions(self) -> Dict[str, Tuple[float, int]]:
+        """세션 id -> (마지막 수정 시각 epoch, 총 바이트)."""
+        base = self._session_prefix()
+        sessions: Dict[str, Tuple[float, int]] = {}
+        for obj in self._iter_objects(base):
+            sid = obj["Key"][len(base):].split("/", 1)[0]
+            modified, size = sessions.get(sid, (0.0, 0))
+            sessions[sid] = (max(modified, obj["LastModified"].timestamp()), size + obj["Size"])
+        return sessions
+
+    def usage(self, session_id: str) -> int:
+        return sum(obj["Size"] for obj in self._iter_objects(self._session_prefix(session_id)))
+
+    def delete(self, session_id: str, name: str):
+        self.s3.delete_object(Bucket=self.bucket, Key=self._key(session_id, name))
+
+    def delete_session(self, session_id: str) -> int:
+        """세션 prefix 아래 객체를 모두 지우고 지운 바이트 수를 돌려준다."""
+        objects = list(self._iter_objects(self._session_prefix(session_id)))
+        for i in range(0, len(objects), 1000):
+            batch = [{"Key": obj["Key"]} for obj in objects[i:i + 1000]]
+            self.s3.delete_objects(Bucket=self.bucket, Delete={"Objects": batch, "Quiet": True})
+        return sum(obj["Size"] for obj in objects)
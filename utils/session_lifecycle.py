@@ -0,0 +1,159 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# 세션 수명 관리: 마지막 접근 시각을 추적하고, 주기적으로
+#   1) TTL보다 오래 쓰지 않은 세션을 지우고
+#   2) 전체 사용량이 전역 할당량을 넘으면 오래된 세션부터(최근에 쓴 세션은 건너뜀) 지운다.
+# 세션별 할당량은 업로드 시점에 over_quota()로 막는다.
+# 저장소(로컬 디렉터리, S3, 카탈로그)와 캐시 정리는 main.py가 콜백으로 넘겨준다 (on_sweep: 매 주기 부가 정리).
+#
+# 접근 기록은 메모리에 바로 남기고, 여러 워커가 공유하도록 persist_every초마다 한 번만 persist 콜백으로 저장한다.
+
+
+class SessionLifecycle:
+    def __init__(
+        self,
+        scan: Callable[[], Dict[str, Tuple[float, int]]],
+        usage: Callable[[str], int],
+        evict: Callable[[str], int],
+        persist: Optional[Callable[[str, float], None]] = None,
+        ttl_seconds: float = 3 * 86400,
+        session_quota_bytes: int = 100 * 1024 * 1024,
+        global_quota_bytes: int = 5 * 1024 * 1024 * 1024,
+        hot_seconds: float = 900,
+        interval_seconds: float = 300,
+        persist_every: float = 60,
+        on_sweep: Optional[Callable[[], None]] = None,
+    ):
+        self.scan = scan
+        self.usage = usage
+        self.evict = evict
+        self.persist = persist
+        self.ttl = ttl_seconds
+        self.session_quota = session_quota_bytes
+        self.global_quota = global_quota_bytes
+        self.hot = hot_seconds
+        self.interval = interval_seconds
+        self.persist_every = persist_every
+        self.on_sweep = on_sweep
+        self._last_access: Dict[str, float] = {}
+        self._persisted: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            "sessions": 0, "disk_bytes": 0, "hot_sessions": 0, "over_quota_sessions": 0,
+            "evicted_ttl": 0, "evicted_quota": 0, "bytes_reclaimed": 0,
+            "sweeps": 0, "last_sweep_at": None, "last_sweep_ms": None, "last_error": None,
+        }
+
+    # ---------- 접근 기록 ───────────────────────
+    def touch(self, session_id: Optional[str]):
+        if not session_id:
+            return
+        now = time.time()
+        with self._lock:
+            self._last_access[session_id] = now
+            due = now - self._persisted.get(session_id, 0) >= self.persist_every
+            if due:
+                self._persisted[session_id] = now
+        if due and self.persist is not None:
+            try:
+                self.persist(session_id, now)
+            except Exception as e:
+                print(f"⚠️ 세션 접근 시각 저장 실패: {e}")
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._last_access.pop(session_id, None)
+            self._persisted.pop(session_id, None)
+
+    def last_access(self, session_id: str, stored: float = 0.0) -> float:
+        with self._lock:
+            return max(stored, self._last_access.get(session_id, 0.0))
+
+    def over_quota(self, session_id: str) -> bool:
+        return self.usage(session_id) >= self.session_quota
+
+    # ---------- 정리 ───────────────────────────
+    def _evict(self, session_id: str, idle_before: float) -> Optional[int]:
+        """대기 중 다시 쓰인 세션은 건너뛴다. 지운 바이트 수 (건너뛰면 None)."""
+        if self.last_access(session_id) > idle_before:
+            return None
+        freed = self.evict(session_id)
+        self.forget(session_id)
+        return freed
+
+    def sweep(self) -> dict:
+        t0 = time.time()
+        now = t0
+        sessions = {sid: (self.last_access(sid, last), size) for sid, (last, size) in self.scan().items()}
+        evicted_ttl, evicted_quota, reclaimed = [], [], 0
+
+        for sid, (last, size) in sorted(sessions.items(), key=lambda kv: kv[1][0]):
+            if now - last > self.ttl:
+                freed = self._evict(sid, now - self.ttl)
+                if freed is not None:
+                    evicted_ttl.append(sid)
+                    reclaimed += freed
+                    del sessions[sid]
+
+        total = sum(size for _, size in sessions.values())
+        if total > self.global_quota:
+            for sid, (last, size) in sorted(sessions.items(), key=lambda kv: kv[1][0]):
+                if total <= self.global_quota:
+                    break
+                if now - last < self.hot:
+                    continue  # 최근에 쓴 세션은 할당량 때문에 지우지 않는다
+                freed = self._evict(sid, last)
+                if freed is not None:
+                    evicted_quota.append(sid)
+                    reclaimed += freed
+                    total -= size
+                    del sessions[sid]
+
+        if self.on_sweep is not None:
+            self.on_sweep()
+        elapsed_ms = (time.time() - t0) * 1000
+        self.stats.update({
+            "sessions": len(sessions),
+            "disk_bytes": total,
+            "hot_sessions": sum(1 for last, _ in sessions.values() if now - last < self.hot),
+            "over_quota_sessions": sum(1 for _, size in sessions.values() if size >= self.session_quota),
+            "evicted_ttl": self.stats["evicted_ttl"] + len(evicted_ttl),
+            "evicted_quota": self.stats["evicted_quota"] + len(evicted_quota),
+            "bytes_reclaimed": self.stats["bytes_reclaimed"] + reclaimed,
+            "sweeps": self.stats["sweeps"] + 1,
+            "last_sweep_at": now,
+            "last_sweep_ms": round(elapsed_ms, 1),
+        })
+        if evicted_ttl or evicted_quota:
+            print(f"🧹 세션 정리: TTL {len(evicted_ttl)}개, 할당량 {len(evicted_quota)}개, {reclaimed / (1024 * 1024):.1f}MB 회수")
+        return {"evicted_ttl": evicted_ttl, "evicted_quota": evicted_quota, "bytes_reclaimed": reclaimed}
+
+    # ---------- 백그라운드 실행 ───────────────────
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+                self.stats["last_error"] = None
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                print(f"⚠️ 세션 정리 실패: {e}")
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="session-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            tracked = len(self._last_access)
+        return dict(self.stats, tracked_in_memory=tracked, ttl_seconds=self.ttl,
+                    session_quota_bytes=self.session_quota, global_quota_bytes=self.global_quota)
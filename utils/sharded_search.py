@@ -0,0 +1,47 @@
+import heapq
+import time
+from concurrent.futures import Executor, Future, wait
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# 여러 세션(샤드)을 한 번에 검색한다.
+# - 샤드마다 (색인 로드 + FAISS 검색)을 스레드 풀에 올린다. FAISS 검색과 파일 읽기는 GIL을 놓으므로 실제로 병렬로 돈다.
+# - 각 샤드는 [(점수, ...)] 형태의 결과를 돌려주고, 전체 top_k는 힙(heapq.nlargest)으로 합친다.
+# - 마감 시간(timeout) 안에 끝나지 않은 샤드는 기다리지 않고 부분 결과로 응답한다 (shards에 상태가 남는다).
+
+ShardFn = Callable[[], Sequence[tuple]]
+
+
+def _timed(fn: ShardFn) -> Tuple[Sequence[tuple], float]:
+    t0 = time.perf_counter()
+    hits = fn()
+    return hits, (time.perf_counter() - t0) * 1000
+
+
+def search_shards(shards: Dict[str, ShardFn], top_k: int, pool: Executor, timeout: float,
+                  score: Callable[[tuple], float] = lambda hit: hit[1]) -> Tuple[List[Tuple[str, tuple]], Dict[str, dict]]:
+    """샤드별 검색 함수를 병렬로 실행해 점수 순 top_k [(샤드 id, 결과)]와 샤드별 상태를 반환한다.
+
+    상태: ok(결과 수, 걸린 ms) / timeout(마감까지 못 끝냄) / error(예외 메시지).
+    timeout은 팬아웃 시작부터 모든 샤드에 공통으로 적용되는 마감 시간(초)이다."""
+    started = time.perf_counter()
+    futures: Dict[Future, str] = {pool.submit(_timed, fn): shard_id for shard_id, fn in shards.items()}
+    done, not_done = wait(futures, timeout=timeout)
+
+    status: Dict[str, dict] = {}
+    merged_input: List[Tuple[str, tuple]] = []
+    for future in done:
+        shard_id = futures[future]
+        try:
+            hits, ms = future.result()
+        except Exception as e:
+            status[shard_id] = {"state": "error", "error": getattr(e, "detail", None) or str(e)}
+            continue
+        status[shard_id] = {"state": "ok", "hits": len(hits), "ms": round(ms, 2)}
+        merged_input.extend((shard_id, hit) for hit in hits)
+    waited_ms = round((time.perf_counter() - started) * 1000, 2)
+    for future in not_done:
+        future.cancel()  # 아직 시작 못 한 샤드는 취소, 이미 도는 샤드는 결과를 버린다
+        status[futures[future]] = {"state": "timeout", "ms": waited_ms}
+
+    merged = heapq.nlargest(top_k, merged_input, key=lambda item: score(item[1]))
+    return merged, status
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만 쓴다
+    fcntl = None
+
+# 말뭉치(세션) 버전 관리: 쓰기는 직렬화하고, 읽기는 잠그지 않고 항상 일관된 (인덱스, 청크) 버전을 본다.
+#
+# version.json (버전 포인터): {"version": n, "chunks": 커밋된 청크 수(= 다음 청크 id),
+#                            "text_bytes": ..., "meta_bytes": ..., "log_bytes": 벡터 로그 길이, "updated_at": ...}
+# - 쓰기 순서: 텍스트/메타/BM25/서명 append → 인덱스 교체(rename) → version.json 교체 (= 커밋 지점).
+# - 읽기: version.json을 먼저 읽고 그 버전의 청크 수만큼만 본다. 인덱스가 포인터보다 앞서 있어도
+#   커밋 전 id는 청크 범위 밖이라 검색에서 걸러진다. 텍스트는 append(또는 위치를 지키는 압축)만 하므로
+#   포인터 이후에 읽은 텍스트의 앞부분은 항상 그 버전과 같다.
+# - 쓰기 도중 죽으면 다음 쓰기가 커밋된 길이(text_bytes, meta_bytes)로 잘라내고 커밋 전 벡터를 지운다.
+# - 여러 uvicorn 워커: 쓰기는 잠금 파일(flock)로 직렬화하고, 각 워커는 버전이 바뀔 때만 스냅샷을 다시 읽는다.
+
+VERSION_FILE = "version.json"
+
+
+class FileLock:
+    """스레드 잠금 + 잠금 파일(flock). 같은 프로세스의 스레드와 다른 워커 프로세스를 모두 막는다."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if fcntl is None:
+            return
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except Exception:
+            self._close()
+            self._thread_lock.release()
+            raise
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)  # 닫으면 flock도 풀린다
+            self._fd = None
+
+    def release(self):
+        self._close()
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def parse_version(data: bytes) -> Optional[dict]:
+    if not data:
+        return None
+    try:
+        obj = json.loads(data.decode("utf-8"))
+    except ValueError:
+        return None  # 쓰다 만 포인터는 없는 것으로 본다 (교체는 rename이라 정상적으로는 생기지 않음)
+    return obj if isinstance(obj, dict) and "version" in obj else None
+
+
+def next_version(prev: Optional[dict], chunks: int, text_bytes: int, meta_bytes: int, log_bytes: int = 0) -> dict:
+    return {
+        "version": (prev or {}).get("version", 0) + 1,
+        "chunks": chunks,
+        "text_bytes": text_bytes,
+        "meta_bytes": meta_bytes,
+        "log_bytes": log_bytes,
+        "updated_at": time.time(),
+    }
+
+
+def version_bytes(version: dict) -> bytes:
+    return json.dumps(version).encode("utf-8")
+
+
+class SnapshotCache:
+    """말뭉치 키 -> (버전, 스냅샷). 버전이 같으면 디스크를 다시 읽지 않는다 (최근에 쓴 max_entries개만 유지).
+
+    스냅샷은 읽기 전용으로 공유한다. 쓰기는 항상 디스크에서 새로 읽은 객체를 고쳐 새 버전으로 올리므로
+    (copy-on-write) 이미 나간 스냅샷을 쓰는 검색은 영향을 받지 않는다."""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: Any, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] == version:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+        value = loader()  # 잠금 밖에서 읽는다 (느린 세션이 다른 세션 검색을 막지 않도록)
+        with self._lock:
+            current = self._items.get(key)
+            # 더 새 버전을 다른 스레드가 먼저 넣었으면 덮어쓰지 않는다.
+            if current is None or not _newer(current[0], version):
+                self._items[key] = (version, value)
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def invalidate_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._items if k.startswith(prefix)]:
+                del self._items[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+def _newer(a: Any, b: Any) -> bool:
+    try:
+        return a > b
+    except TypeError:
+        return False
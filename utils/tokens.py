@@ -0,0 +1,45 @@
+import config
+
+# tiktoken 인코더는 처음 쓸 때 한 번만 만든다.
+# 인코딩 파일을 내려받지 못하는 환경(오프라인 등)에서는 글자 수 기반 추정치로 대신한다.
+_encoder = None
+_encoder_failed = False
+
+
+def _get_encoder():
+    global _encoder, _encoder_failed
+    if _encoder is None and not _encoder_failed:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(config.TOKENIZER_ENCODING)
+        except Exception as e:
+            print(f"⚠️ tiktoken 인코더를 불러오지 못해 추정치를 사용합니다: {e}")
+            _encoder_failed = True
+    return _encoder
+
+
+def estimate_tokens(text: str) -> int:
+    """영문은 약 4글자당 1토큰, 한글 등 비 ASCII 문자는 글자당 1토큰으로 추정."""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoder()
+    if enc is None:
+        return estimate_tokens(text)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    enc = _get_encoder()
+    if enc is not None:
+        ids = enc.encode(text, disallowed_special=())
+        return text if len(ids) <= max_tokens else enc.decode(ids[:max_tokens])
+    # 추정 모드: 토큰 수가 예산 안에 들어올 때까지 글자 비율로 자른다.
+    cut = text
+    while cut and estimate_tokens(cut) > max_tokens:
+        cut = cut[: int(len(cut) * max_tokens / estimate_tokens(cut))]
+    return cut
@@ -0,0 +1,94 @@
+import bisect
+import json
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 세션 청크 삭제 표시(tombstone).
+# 청크 id는 text_chunks.txt 안의 위치이며 한 번 정해지면 바뀌지 않는다 (FAISS IndexIDMap2의 id와 같음).
+# 파일을 지우면 그 파일의 청크 범위를 deleted/pending에 기록만 하고, 검색 시 걸러낸다.
+# pending은 아직 FAISS/BM25 색인에 남아 있는 범위로, 압축(compaction)이 끝나면 비운다.
+#
+# 디스크 포맷 (tombstones.json): {"deleted": [[start, end], ...], "pending": [[start, end], ...]}
+
+DELETED_PLACEHOLDER = "[deleted]"  # 압축 후 text_chunks.txt에서 지운 청크 자리를 지키는 문자열
+
+Range = Tuple[int, int]
+
+
+def _merge(ranges: Iterable[Range]) -> List[Range]:
+    merged: List[Range] = []
+    for start, end in sorted(ranges):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract(ranges: List[Range], remove: List[Range]) -> List[Range]:
+    out: List[Range] = []
+    for start, end in ranges:
+        cur = start
+        for r_start, r_end in remove:
+            if r_end <= cur or r_start >= end:
+                continue
+            if r_start > cur:
+                out.append((cur, r_start))
+            cur = max(cur, r_end)
+        if cur < end:
+            out.append((cur, end))
+    return out
+
+
+def _count(ranges: List[Range]) -> int:
+    return sum(end - start for start, end in ranges)
+
+
+class Tombstones:
+    def __init__(self, deleted: Optional[Iterable[Range]] = None, pending: Optional[Iterable[Range]] = None):
+        self.deleted = _merge(deleted or [])
+        self.pending = _merge(pending or [])
+        self._starts = [s for s, _ in self.deleted]
+
+    def __contains__(self, chunk_id: int) -> bool:
+        i = bisect.bisect_right(self._starts, chunk_id) - 1
+        return i >= 0 and chunk_id < self.deleted[i][1]
+
+    def __len__(self) -> int:
+        return _count(self.deleted)
+
+    @property
+    def pending_count(self) -> int:
+        return _count(self.pending)
+
+    @property
+    def purged_count(self) -> int:
+        """색인에서 이미 빠진 청크 수 (deleted - pending)."""
+        return len(self) - self.pending_count
+
+    def add(self, start: int, end: int):
+        self.deleted = _merge(self.deleted + [(start, end)])
+        self.pending = _merge(self.pending + [(start, end)])
+        self._starts = [s for s, _ in self.deleted]
+
+    def pending_ids(self) -> np.ndarray:
+        if not self.pending:
+            return np.empty(0, dtype="int64")
+        return np.concatenate([np.arange(s, e, dtype="int64") for s, e in self.pending])
+
+    def mark_compacted(self, done: List[Range]):
+        """압축이 처리한 범위를 pending에서 뺀다 (압축 중에 새로 지운 범위는 남는다)."""
+        self.pending = _subtract(self.pending, _merge(done))
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({"deleted": self.deleted, "pending": self.pending}).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Tombstones":
+        if not data:
+            return cls()
+        obj = json.loads(data.decode("utf-8"))
+        return cls([tuple(r) for r in obj.get("deleted", [])], [tuple(r) for r in obj.get("pending", [])])
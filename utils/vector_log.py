@@ -0,0 +1,103 @@
+import os
+import struct
+import zlib
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+# 세션 인덱스의 추가 전용 벡터 로그 (index.faiss 옆의 vectors.log).
+# 업로드마다 index.faiss 전체를 다시 쓰는 대신 새 벡터만 로그 끝에 덧붙이고(O(새 벡터)),
+# 읽을 때 base(index.faiss) + 로그를 합쳐 메모리 인덱스를 만든다. 로그가 커지면 base로 병합한다.
+#
+# 레코드: MAGIC(4) | n(u32) | dim(u32) | ids(int64 × n) | vectors(float32 × n × dim) | crc32(u32, 앞 전체)
+# - 끝이 잘렸거나 crc가 맞지 않는 레코드부터는 읽지 않는다 (쓰다 멈춘 꼬리). 잘라내는 건 쓰는 쪽이 커밋된 길이로 한다.
+# - 청크 id는 계속 커지므로, base에 이미 있는 id(base 최대 id 이하)의 레코드는 건너뛴다
+#   (병합 후 로그를 지우기 전에 멈춘 경우에도 중복이 생기지 않는다).
+
+MAGIC = b"VLG1"
+_HEADER = struct.Struct("<4sII")
+_CRC = struct.Struct("<I")
+
+
+def encode(ids: np.ndarray, vectors: np.ndarray) -> bytes:
+    ids = np.ascontiguousarray(ids, dtype="<i8")
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    n, dim = vectors.shape
+    if len(ids) != n:
+        raise ValueError(f"id 수({len(ids)})와 벡터 수({n})가 다릅니다.")
+    body = _HEADER.pack(MAGIC, n, dim) + ids.tobytes() + vectors.tobytes()
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def append(path: str, ids: np.ndarray, vectors: np.ndarray) -> int:
+    """레코드 하나를 덧붙이고 새 파일 크기를 돌려준다."""
+    with open(path, "ab") as f:
+        f.write(encode(ids, vectors))
+        f.flush()
+        return f.tell()
+
+
+def read(path: str, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+    """앞에서부터 온전한 레코드만 읽는다. limit가 있으면 그 바이트까지만 본다.
+    반환: (ids, vectors, 온전한 레코드가 끝나는 바이트 위치)"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read() if limit is None else f.read(limit)
+    except FileNotFoundError:
+        return np.empty(0, dtype="int64"), np.empty((0, 0), dtype="float32"), 0
+    ids, vecs = [], []
+    pos, dim = 0, None
+    while pos + _HEADER.size <= len(data):
+        magic, n, d = _HEADER.unpack_from(data, pos)
+        end = pos + _HEADER.size + n * 8 + n * d * 4 + _CRC.size
+        if magic != MAGIC or end > len(data) or (dim is not None and d != dim):
+            break
+        body = data[pos:end - _CRC.size]
+        if _CRC.unpack_from(data, end - _CRC.size)[0] != zlib.crc32(body):
+            break
+        start = pos + _HEADER.size
+        ids.append(np.frombuffer(data, dtype="<i8", count=n, offset=start))
+        vecs.append(np.frombuffer(data, dtype="<f4", count=n * d, offset=start + n * 8).reshape(n, d))
+        dim, pos = d, end
+    if not ids:
+        return np.empty(0, dtype="int64"), np.empty((0, dim or 0), dtype="float32"), pos
+    return np.concatenate(ids).astype("int64"), np.vstack(vecs).astype("float32"), pos
+
+
+def truncate(path: str, size: int) -> bool:
+    """파일이 size보다 길면 잘라낸다 (커밋되지 않은 레코드 제거). 잘랐으면 True."""
+    try:
+        if os.path.getsize(path) <= size:
+            return False
+    except FileNotFoundError:
+        return False
+    os.truncate(path, size)
+    return True
+
+
+def index_dim(index_path: str) -> int:
+    """base 인덱스 파일 헤더의 차원. 로그에 덧붙일 때 base를 통째로 읽지 않고 차원만 확인한다.
+    FAISS는 인덱스 종류(fourcc) 바로 뒤에 차원(int32)을 쓴다 (IndexIDMap2, IndexFlat 모두)."""
+    with open(index_path, "rb") as f:
+        header = f.read(8)
+    if len(header) < 8:
+        raise ValueError(f"인덱스 파일 헤더가 잘렸습니다: {index_path}")
+    return struct.unpack_from("<i", header, 4)[0]
+
+
+def apply(index: faiss.IndexIDMap2, path: str, limit: Optional[int] = None) -> int:
+    """로그의 벡터를 base 인덱스에 더한다. base에 이미 있는 id는 건너뛴다. 더한 벡터 수를 돌려준다."""
+    ids, vectors, _ = read(path, limit)
+    if not len(ids):
+        return 0
+    if index.ntotal:
+        ids_in_base = faiss.vector_to_array(index.id_map)
+        fresh = ids > ids_in_base.max()
+        ids, vectors = ids[fresh], vectors[fresh]
+    if not len(ids):
+        return 0
+    if vectors.shape[1] != index.d:
+        raise ValueError(f"벡터 로그 차원({vectors.shape[1]})이 인덱스 차원({index.d})과 다릅니다.")
+    index.add_with_ids(vectors, ids)
+    return len(ids)